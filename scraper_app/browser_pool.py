@@ -0,0 +1,190 @@
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class BrowserPoolExhausted(Exception):
+    """
+    Raised when no driver could be leased before the timeout.
+    """
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    """
+    Per-process pool of pre-launched Chrome drivers.
+
+    Drivers are launched by `factory`, parked on `warm_url` so the portal bundle
+    is already loaded, health-checked on every lease and return, and recycled
+    after `max_uses` leases. At most `max_size` drivers exist at once.
+    """
+
+    def __init__(self, factory, max_size: int = 2, max_uses: int = 20, warm_url: str | None = None):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.max_uses = max(1, max_uses)
+        self.warm_url = warm_url
+        self._idle: list[_PooledDriver] = []
+        self._leased: dict[int, _PooledDriver] = {}
+        self._launching = 0
+        self._cond = threading.Condition()
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def _launch(self) -> _PooledDriver:
+        driver = self.factory()
+        if self.warm_url:
+            driver.get(self.warm_url)
+        return _PooledDriver(driver)
+
+    @staticmethod
+    def _quit(entry: _PooledDriver) -> None:
+        try:
+            entry.driver.quit()
+        except Exception:
+            traceback.print_exc()
+
+    @staticmethod
+    def is_healthy(driver) -> bool:
+        try:
+            return driver.execute_script("return document.readyState") in ("interactive", "complete")
+        except Exception:
+            return False
+
+    def _reset(self, entry: _PooledDriver) -> bool:
+        """
+        Drop the previous run's session so the next lease starts logged out.
+        """
+        try:
+            entry.driver.delete_all_cookies()
+            entry.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            if self.warm_url:
+                entry.driver.get(self.warm_url)
+            return self.is_healthy(entry.driver)
+        except Exception:
+            return False
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._leased) + self._launching
+
+    def warm(self, count: int) -> None:
+        """
+        Launch drivers until `count` are idle (bounded by max_size).
+        """
+        while True:
+            with self._cond:
+                if len(self._idle) >= count or self._size() >= self.max_size:
+                    return
+                self._launching += 1
+            try:
+                entry = self._launch()
+            except Exception:
+                traceback.print_exc()
+                with self._cond:
+                    self._launching -= 1
+                    self._cond.notify()
+                return
+            with self._cond:
+                self._launching -= 1
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._quit(entry)
+
+    # -- lease / return ------------------------------------------------------
+
+    def acquire(self, timeout: float | None = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size() >= self.max_size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise BrowserPoolExhausted(f"No browser available within {timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    entry = None
+                    self._launching += 1
+
+            if entry is None:
+                try:
+                    entry = self._launch()
+                finally:
+                    with self._cond:
+                        self._launching -= 1
+                        # A failed launch frees its slot; wake a waiter to use it
+                        self._cond.notify()
+            elif not self.is_healthy(entry.driver):
+                self._quit(entry)
+                with self._cond:
+                    self._cond.notify()
+                continue
+
+            entry.uses += 1
+            with self._cond:
+                self._leased[id(entry.driver)] = entry
+            return entry.driver
+
+    def release(self, driver, discard: bool = False) -> None:
+        with self._cond:
+            entry = self._leased.pop(id(driver), None)
+        if entry is None:
+            return
+        keep = not discard and entry.uses < self.max_uses and self._reset(entry)
+        if not keep:
+            self._quit(entry)
+        with self._cond:
+            if keep:
+                self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout: float | None = None):
+        driver = self.acquire(timeout)
+        discard = False
+        try:
+            yield driver
+        except BaseException:
+            discard = not self.is_healthy(driver)
+            raise
+        finally:
+            self.release(driver, discard=discard)
+
+
+_pool: BrowserPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """
+    Process-wide pool built from settings. Forked workers get their own instance
+    because the pool is created lazily, after the fork.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from .scraper import _driver_from_config
+
+            _pool = BrowserPool(
+                _driver_from_config,
+                # Sharded runs lease one driver per concurrent shard
+                max_size=max(settings.SCRAPER_BROWSER_POOL_SIZE, settings.SCRAPER_SHARD_CONCURRENCY),
+                max_uses=settings.SCRAPER_BROWSER_MAX_USES,
+                warm_url=settings.SCRAPER_PORTAL_URL,
+            )
+        return _pool
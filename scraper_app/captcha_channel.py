@@ -0,0 +1,152 @@
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CaptchaAnswer
+
+CHANNEL_BACKEND = getattr(settings, "SCRAPER_CAPTCHA_CHANNEL", "db")
+POLL_SECONDS = int(getattr(settings, "SCRAPER_CAPTCHA_POLL_MS", 250)) / 1000
+# Answers nobody picked up are dropped after this long
+ANSWER_TTL_SECONDS = int(getattr(settings, "SCRAPER_CAPTCHA_ANSWER_TTL_SECONDS", 600))
+
+
+def _safe_key(captcha_key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "", str(captcha_key))[:50]
+
+
+class CaptchaChannel(ABC):
+    """
+    Hands operator CAPTCHA answers from the web process to the scraper waiting on them,
+    across processes and containers. publish() is called by the view that receives an
+    answer; wait() blocks the scraper until that answer arrives or the timeout passes.
+    """
+
+    @abstractmethod
+    def publish(self, run_id: int | None, captcha_key: str, value: str) -> None:
+        ...
+
+    @abstractmethod
+    def wait(self, run_id: int, captcha_key: str, timeout: float) -> str | None:
+        ...
+
+
+class DatabaseChannel(CaptchaChannel):
+    """
+    Answers are CaptchaAnswer rows; the waiter polls its unique key every SCRAPER_CAPTCHA_POLL_MS.
+    Works wherever the database is shared, with nothing else to run.
+    """
+
+    def publish(self, run_id, captcha_key, value):
+        CaptchaAnswer.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=ANSWER_TTL_SECONDS)).delete()
+        CaptchaAnswer.objects.update_or_create(
+            captcha_key=_safe_key(captcha_key),
+            defaults={"run_id": run_id, "value": value, "created_at": timezone.now()},
+        )
+
+    def wait(self, run_id, captcha_key, timeout):
+        key = _safe_key(captcha_key)
+        deadline = time.monotonic() + timeout
+        while True:
+            answer = CaptchaAnswer.objects.filter(captcha_key=key).first()
+            if answer is not None:
+                # Consume it so a retry never reuses a stale value
+                CaptchaAnswer.objects.filter(id=answer.id).delete()
+                return answer.value
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_SECONDS)
+
+
+class FileChannel(CaptchaChannel):
+    """
+    One small file per answer in SCRAPER_CAPTCHA_CHANNEL_DIR, which must be shared
+    (e.g. a volume) between the web and worker containers.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        self.directory = Path(directory or settings.SCRAPER_CAPTCHA_CHANNEL_DIR)
+
+    def _path(self, captcha_key: str) -> Path:
+        return self.directory / f"{_safe_key(captcha_key)}.answer"
+
+    def publish(self, run_id, captcha_key, value):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, suffix=".tmp", delete=False) as tmp:
+            tmp.write(value)
+        # The waiter only ever sees a complete file
+        os.replace(tmp.name, self._path(captcha_key))
+
+    def wait(self, run_id, captcha_key, timeout):
+        path = self._path(captcha_key)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                value = path.read_text()
+                path.unlink(missing_ok=True)
+                return value
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_SECONDS)
+
+
+class RedisChannel(CaptchaChannel):
+    """
+    Answers are pushed onto a per-key Redis list; the waiter blocks in BLPOP and wakes
+    the moment the operator submits. Needs the redis package and SCRAPER_CAPTCHA_REDIS_URL
+    (defaults to REDIS_URL).
+    """
+
+    KEY = "captcha:answer:{captcha_key}"
+
+    def __init__(self, url: str | None = None):
+        import redis
+
+        self.client = redis.Redis.from_url(url or settings.SCRAPER_CAPTCHA_REDIS_URL)
+
+    def publish(self, run_id, captcha_key, value):
+        key = self.KEY.format(captcha_key=_safe_key(captcha_key))
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.rpush(key, value)
+        pipe.expire(key, ANSWER_TTL_SECONDS)
+        pipe.execute()
+
+    def wait(self, run_id, captcha_key, timeout):
+        # BLPOP takes whole seconds; 0 would block forever
+        item = self.client.blpop(self.KEY.format(captcha_key=_safe_key(captcha_key)), timeout=max(1, math.ceil(timeout)))
+        return item[1].decode() if item else None
+
+
+CHANNELS = {
+    "db": DatabaseChannel,
+    "file": FileChannel,
+    "redis": RedisChannel,
+}
+
+_channel: CaptchaChannel | None = None
+_channel_lock = threading.Lock()
+
+
+def get_channel() -> CaptchaChannel:
+    """
+    Process-wide channel for settings.SCRAPER_CAPTCHA_CHANNEL ("db", "file" or "redis").
+    """
+    global _channel
+    with _channel_lock:
+        if _channel is None:
+            try:
+                _channel = CHANNELS[CHANNEL_BACKEND]()
+            except KeyError:
+                raise ValueError(f"Unknown SCRAPER_CAPTCHA_CHANNEL {CHANNEL_BACKEND!r}; expected one of {', '.join(CHANNELS)}")
+        return _channel
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .captcha_channel import get_channel
+from .models import ScrapingJob, ScrapingStatus
+from .status_feed import captcha_url
+
+# How long a scraper waits on a prompt; the prompt's deadline
+CAPTCHA_WAIT_SECONDS = int(getattr(settings, "CAPTCHA_WAIT_SECONDS", 180))
+
+
+class CaptchaSubmitError(ValueError):
+    """
+    Raised for a CAPTCHA answer that cannot be delivered; http_status says why.
+    """
+
+    def __init__(self, message: str, http_status: int = 409):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+def _job(run) -> ScrapingJob | None:
+    # Shards have no job of their own; they run under their parent's
+    return getattr(run.parent if run.parent_id else run, "job", None)
+
+
+def deadline(status: ScrapingStatus):
+    return status.created_at + timedelta(seconds=CAPTCHA_WAIT_SECONDS)
+
+
+def pending_prompts(now=None) -> list[ScrapingStatus]:
+    """
+    Unanswered CAPTCHA prompts of running jobs whose scraper is still waiting, at most
+    one per run (its newest). Higher job priority first, then the soonest deadline.
+    """
+    now = now or timezone.now()
+    statuses = (
+        ScrapingStatus.objects.filter(
+            answered_at__isnull=True,
+            captcha_key__isnull=False,
+            created_at__gt=now - timedelta(seconds=CAPTCHA_WAIT_SECONDS),
+        )
+        .exclude(captcha_key="")
+        .filter(Q(run__job__state=ScrapingJob.RUNNING) | Q(run__parent__job__state=ScrapingJob.RUNNING))
+        .select_related("run__job", "run__parent__job")
+        .order_by("-created_at")
+    )
+    newest = {}
+    for status in statuses:
+        newest.setdefault(status.run_id, status)
+    return sorted(newest.values(), key=lambda status: (-_job(status.run).priority, deadline(status)))
+
+
+def serialize_prompt(status: ScrapingStatus, now=None) -> dict:
+    now = now or timezone.now()
+    run = status.run
+    job = _job(run)
+    return {
+        "captcha_key": status.captcha_key,
+        "run_id": status.run_id,
+        "parent_run_id": run.parent_id or run.id,
+        "message": status.message,
+        "captcha_url": captcha_url(status),
+        "created_at": status.created_at.isoformat(),
+        "deadline": deadline(status).isoformat(),
+        "seconds_left": max(0, int((deadline(status) - now).total_seconds())),
+        "priority": job.priority if job else 0,
+        "district": (job.params.get("district") or "") if job else "",
+    }
+
+
+def submit_answer(captcha_key: str, value: str) -> ScrapingStatus:
+    """
+    Deliver an operator's answer to the scraper waiting on `captcha_key`. Each prompt
+    takes one answer; late, repeated or unknown answers raise CaptchaSubmitError.
+    """
+    captcha_key = (captcha_key or "").strip()
+    value = (value or "").strip()
+    if not value:
+        raise CaptchaSubmitError("Enter the characters shown.", http_status=400)
+    status = ScrapingStatus.objects.filter(captcha_key=captcha_key).order_by("-created_at").first() if captcha_key else None
+    if status is None:
+        raise CaptchaSubmitError("Unknown CAPTCHA.", http_status=404)
+    now = timezone.now()
+    if deadline(status) <= now:
+        raise CaptchaSubmitError("This CAPTCHA has expired; the run has moved on.")
+    # Conditional update, so two operators answering at once cannot both win
+    if not ScrapingStatus.objects.filter(id=status.id, answered_at__isnull=True).update(answered_at=now):
+        raise CaptchaSubmitError("This CAPTCHA was already answered.")
+    get_channel().publish(status.run_id, captcha_key, value)
+    status.answered_at = now
+    return status
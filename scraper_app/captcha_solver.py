@@ -0,0 +1,274 @@
+import io
+import threading
+import traceback
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .models import CaptchaSample
+
+# "template" reads CAPTCHAs with the offline model below; "none" always asks the operator
+SOLVER_BACKEND = getattr(settings, "SCRAPER_CAPTCHA_SOLVER", "template")
+SOLVER_MODEL_PATH = Path(getattr(settings, "SCRAPER_CAPTCHA_MODEL_PATH", settings.BASE_DIR / "captcha_model.npz"))
+# Readings below this confidence go to the operator instead
+SOLVER_CONFIDENCE = float(getattr(settings, "SCRAPER_CAPTCHA_SOLVER_CONFIDENCE", 0.85))
+GLYPH_SIZE = 20
+# A glyph whose best match beats every other character by less than this is doubtful
+MIN_MARGIN = 0.05
+# Most recent templates kept per character when training
+MAX_TEMPLATES_PER_CHAR = 60
+
+
+def _ink_mask(image: bytes) -> np.ndarray:
+    """
+    Boolean mask of text pixels: grayscale, Otsu threshold, and whichever side of the
+    threshold is the minority taken as ink (works for dark-on-light and light-on-dark).
+    """
+    gray = np.asarray(Image.open(io.BytesIO(image)).convert("L"), dtype=np.uint8)
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    m0 = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = np.nan_to_num((m0[-1] * w0 / w0[-1] - m0) ** 2 / (w0 * w1))
+    dark = gray <= int(np.argmax(between))
+    ink = dark if dark.mean() <= 0.5 else ~dark
+    # Drop speckle: ink pixels with no inked neighbour
+    padded = np.pad(ink, 1)
+    neighbours = sum(
+        padded[1 + dy:padded.shape[0] - 1 + dy, 1 + dx:padded.shape[1] - 1 + dx].astype(np.uint8)
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx
+    )
+    return ink & (neighbours > 0)
+
+
+def _column_runs(ink: np.ndarray) -> list[tuple[int, int]]:
+    columns = ink.any(axis=0)
+    runs, start = [], None
+    for x, filled in enumerate(columns):
+        if filled and start is None:
+            start = x
+        elif not filled and start is not None:
+            runs.append((start, x))
+            start = None
+    if start is not None:
+        runs.append((start, len(columns)))
+    return [(a, b) for a, b in runs if b - a >= 2]
+
+
+def _fit_runs(runs: list[tuple[int, int]], count: int) -> list[tuple[int, int]]:
+    """
+    Merge the narrowest runs (broken characters) into their nearest neighbour, or split
+    the widest (touching characters), until there are `count` of them.
+    """
+    runs = list(runs)
+    while len(runs) > count:
+        i = min(range(len(runs)), key=lambda j: runs[j][1] - runs[j][0])
+        if i == 0:
+            j = 1
+        elif i == len(runs) - 1:
+            j = i - 1
+        else:
+            j = i - 1 if runs[i][0] - runs[i - 1][1] <= runs[i + 1][0] - runs[i][1] else i + 1
+        a, b = min(i, j), max(i, j)
+        runs[a:b + 1] = [(runs[a][0], runs[b][1])]
+    while runs and len(runs) < count:
+        i = max(range(len(runs)), key=lambda j: runs[j][1] - runs[j][0])
+        a, b = runs[i]
+        if b - a < 4:
+            break
+        runs[i:i + 1] = [(a, (a + b) // 2), ((a + b) // 2, b)]
+    return runs
+
+
+def _glyph_vector(ink: np.ndarray, a: int, b: int) -> np.ndarray:
+    """
+    One character as a zero-mean, unit-length GLYPH_SIZE x GLYPH_SIZE vector, so a dot
+    product of two glyphs is their correlation.
+    """
+    part = ink[:, a:b]
+    rows = np.flatnonzero(part.any(axis=1))
+    part = part[rows[0]:rows[-1] + 1] if rows.size else part
+    height, width = part.shape
+    side = max(height, width)
+    square = np.zeros((side, side), dtype=np.uint8)
+    square[(side - height) // 2:(side - height) // 2 + height, (side - width) // 2:(side - width) // 2 + width] = part * 255
+    vector = np.asarray(Image.fromarray(square).resize((GLYPH_SIZE, GLYPH_SIZE), Image.BILINEAR), dtype=np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def glyph_vectors(image: bytes, count: int | None = None) -> list[np.ndarray]:
+    """
+    Segment a CAPTCHA into per-character vectors, left to right. With `count`, segments
+    are merged or split towards that many (there may still be fewer).
+    """
+    ink = _ink_mask(image)
+    runs = _column_runs(ink)
+    if count:
+        runs = _fit_runs(runs, count)
+    return [_glyph_vector(ink, a, b) for a, b in runs]
+
+
+class TemplateModel:
+    """
+    Nearest-template classifier: every glyph is matched against labelled glyphs from
+    accepted CAPTCHAs. A glyph's confidence is its best correlation, scaled down when
+    another character comes within MIN_MARGIN; the reading's is its weakest glyph's.
+    """
+
+    def __init__(self, glyphs: np.ndarray, labels: np.ndarray, lengths: np.ndarray):
+        self.glyphs = glyphs
+        self.labels = labels
+        self.lengths = lengths
+
+    @classmethod
+    def load(cls, path: Path) -> "TemplateModel":
+        with np.load(path) as data:
+            return cls(data["glyphs"], data["labels"], data["lengths"])
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # np.savez adds .npz to names without it, so write through a file object
+        with open(path, "wb") as fileobj:
+            np.savez_compressed(fileobj, glyphs=self.glyphs, labels=self.labels, lengths=self.lengths)
+
+    def read(self, image: bytes) -> tuple[str, float] | None:
+        count = int(self.lengths[0]) if len(self.lengths) == 1 else None
+        vectors = glyph_vectors(image, count)
+        if not vectors or len(vectors) not in self.lengths:
+            return None
+        scores = np.stack(vectors) @ self.glyphs.T
+        text, confidence = "", 1.0
+        for row in scores:
+            best = int(row.argmax())
+            label = self.labels[best]
+            others = row[self.labels != label]
+            margin = row[best] - others.max() if others.size else 1.0
+            text += str(label)
+            confidence = min(confidence, float(row[best]) * min(1.0, margin / MIN_MARGIN))
+        return text, max(0.0, confidence)
+
+
+def train_template_model(samples) -> tuple[TemplateModel | None, int]:
+    """
+    Build a TemplateModel from (image bytes, answer) pairs. Samples whose segmentation
+    does not give one glyph per answer character are skipped. Returns (model, samples used);
+    the model is None when nothing was usable.
+    """
+    by_char = defaultdict(list)
+    lengths = Counter()
+    used = 0
+    for image, answer in samples:
+        answer = (answer or "").strip()
+        if not answer:
+            continue
+        try:
+            vectors = glyph_vectors(bytes(image), len(answer))
+        except (OSError, ValueError):
+            continue
+        if len(vectors) != len(answer):
+            continue
+        for char, vector in zip(answer, vectors):
+            by_char[char].append(vector)
+        lengths[len(answer)] += 1
+        used += 1
+    if not used:
+        return None, 0
+    glyphs, labels = [], []
+    for char, vectors in by_char.items():
+        for vector in vectors[-MAX_TEMPLATES_PER_CHAR:]:
+            glyphs.append(vector)
+            labels.append(char)
+    return TemplateModel(np.stack(glyphs), np.array(labels), np.array(sorted(lengths))), used
+
+
+class CaptchaSolver(ABC):
+    """
+    Reads a CAPTCHA image without the operator. solve() returns (text, confidence in
+    [0, 1]) or None when it cannot produce a reading at all.
+    """
+
+    @abstractmethod
+    def solve(self, image: bytes) -> tuple[str, float] | None:
+        ...
+
+
+class NoSolver(CaptchaSolver):
+    def solve(self, image):
+        return None
+
+
+class TemplateSolver(CaptchaSolver):
+    """
+    Offline, CPU-only solver backed by the TemplateModel at SCRAPER_CAPTCHA_MODEL_PATH
+    (built by the train_captcha_solver command). Reloads the file when it changes.
+    """
+
+    def __init__(self, model_path: Path | None = None):
+        self.model_path = Path(model_path or SOLVER_MODEL_PATH)
+        self._model = None
+        self._mtime = None
+
+    def _current_model(self) -> TemplateModel | None:
+        try:
+            mtime = self.model_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime != self._mtime:
+            self._model = TemplateModel.load(self.model_path)
+            self._mtime = mtime
+        return self._model
+
+    def solve(self, image):
+        try:
+            model = self._current_model()
+            return model.read(image) if model is not None else None
+        except OSError:
+            # Not an image PIL can decode
+            return None
+        except Exception:
+            print("Exception occurred:")
+            traceback.print_exc()
+            return None
+
+
+SOLVERS = {
+    "template": TemplateSolver,
+    "none": NoSolver,
+}
+
+_solver: CaptchaSolver | None = None
+_solver_lock = threading.Lock()
+
+
+def get_solver() -> CaptchaSolver:
+    """
+    Process-wide solver for settings.SCRAPER_CAPTCHA_SOLVER ("template" or "none").
+    """
+    global _solver
+    with _solver_lock:
+        if _solver is None:
+            try:
+                _solver = SOLVERS[SOLVER_BACKEND]()
+            except KeyError:
+                raise ValueError(f"Unknown SCRAPER_CAPTCHA_SOLVER {SOLVER_BACKEND!r}; expected one of {', '.join(SOLVERS)}")
+        return _solver
+
+
+def record_sample(image: tuple[bytes, str], answer: str, solved_by: str) -> None:
+    """
+    Keep a CAPTCHA the portal accepted, with its answer, as training data.
+    """
+    try:
+        data, content_type = image
+        CaptchaSample.objects.create(image=data, content_type=content_type, answer=answer.strip(), solved_by=solved_by)
+    except Exception:
+        print("Exception occurred:")
+        traceback.print_exc()
@@ -0,0 +1,42 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Cache alias holding prompt images; must be shared by the web and worker processes
+CAPTCHA_CACHE_ALIAS = getattr(settings, "SCRAPER_CAPTCHA_CACHE_ALIAS", "captchas")
+CAPTCHA_IMAGE_TTL_SECONDS = int(getattr(settings, "SCRAPER_CAPTCHA_IMAGE_TTL_SECONDS", 900))
+CAPTCHA_IMAGE_KEY = "captcha:image:{captcha_key}"
+
+
+def _cache():
+    return caches[CAPTCHA_CACHE_ALIAS]
+
+
+def image_from_data_uri(src: str | None) -> tuple[bytes, str] | None:
+    """
+    (bytes, content type) of a base64 data: URI, or None for anything else
+    (a plain URL would serve a fresh CAPTCHA if fetched again).
+    """
+    if not src or not src.startswith("data:"):
+        return None
+    header, _, payload = src.partition(",")
+    if not header.endswith(";base64"):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data, header[len("data:"):-len(";base64")] or "image/png"
+
+
+def store_image(captcha_key: str, data: bytes, content_type: str = "image/png") -> None:
+    _cache().set(CAPTCHA_IMAGE_KEY.format(captcha_key=captcha_key), (data, content_type), timeout=CAPTCHA_IMAGE_TTL_SECONDS)
+
+
+def load_image(captcha_key: str) -> tuple[bytes, str] | None:
+    """
+    (bytes, content type) of a prompt image, or None once it has expired.
+    """
+    return _cache().get(CAPTCHA_IMAGE_KEY.format(captcha_key=captcha_key))
@@ -0,0 +1,164 @@
+import base64
+import json
+import re
+import traceback
+
+from django.conf import settings
+
+# ScrapedRecord field order; matches the modal fieldsets
+SECTION_FIELDS = (
+    "registration_details",
+    "seller_details",
+    "buyer_details",
+    "property_details",
+    "khasra_details",
+)
+
+
+def enable_performance_log(chrome_options) -> None:
+    """
+    Ask chromedriver to record DevTools network events, read back with get_log("performance").
+    """
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def _dig(payload, path: str):
+    """
+    Follow a dotted path ("data.items.0") through dicts and lists; None when it breaks.
+    """
+    node = payload
+    for part in filter(None, (path or "").split(".")):
+        if isinstance(node, list) and part.isdigit():
+            index = int(part)
+            node = node[index] if index < len(node) else None
+        elif isinstance(node, dict):
+            node = node.get(part)
+        else:
+            return None
+    return node
+
+
+def _humanize(key: str) -> str:
+    words = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(key)).replace("_", " ").split()
+    return " ".join(w[:1].upper() + w[1:] for w in words)
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value).strip()
+
+
+def section_from_value(value, headings: dict | None = None) -> tuple[list[str], list[str]]:
+    """
+    Turn one JSON section (an object, or a list of row objects) into the
+    (headings, data_texts) pair the modal tables produce: one heading per key of
+    the first row, then every row's cells flattened in order.
+    """
+    headings = headings or {}
+    rows = value if isinstance(value, list) else [value]
+    rows = [row for row in rows if isinstance(row, dict)]
+    if not rows:
+        return [], []
+    keys = list(rows[0].keys())
+    return (
+        [headings.get(key) or _humanize(key) for key in keys],
+        [_text(row.get(key)) for row in rows for key in keys],
+    )
+
+
+def sections_from_payload(payload: dict, section_paths: dict | None = None, headings: dict | None = None) -> list[tuple[list[str], list[str]]]:
+    """
+    Map one record's JSON into the five (headings, data_texts) sections, in SECTION_FIELDS order.
+    """
+    section_paths = section_paths or settings.SCRAPER_CAPTURE_SECTIONS
+    headings = headings if headings is not None else getattr(settings, "SCRAPER_CAPTURE_HEADINGS", {})
+    return [section_from_value(_dig(payload, section_paths.get(field, "")), headings) for field in SECTION_FIELDS]
+
+
+def records_from_payload(payload, records_path: str = "", section_paths: dict | None = None) -> list[dict]:
+    """
+    Record objects in a response: the list at records_path for listing responses,
+    or the payload itself when it carries any of the section keys.
+    """
+    section_paths = section_paths or settings.SCRAPER_CAPTURE_SECTIONS
+    if records_path:
+        items = _dig(payload, records_path)
+        if isinstance(items, list):
+            return [item for item in items if isinstance(item, dict)]
+    if isinstance(payload, dict) and any(_dig(payload, path) is not None for path in section_paths.values()):
+        return [payload]
+    return []
+
+
+def responses_from_log(entries, url_pattern: str, fetch_body, pending: dict | None = None):
+    """
+    Yield (url, parsed_json) for every finished response in the DevTools performance
+    log whose URL matches url_pattern. `fetch_body(request_id, url)` returns the raw
+    body; `pending` carries requests seen but not yet finished across calls.
+    """
+    pattern = re.compile(url_pattern)
+    pending = {} if pending is None else pending
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params") or {}
+        if method == "Network.responseReceived":
+            response = params.get("response") or {}
+            url = response.get("url", "")
+            if pattern.search(url) and "json" in (response.get("mimeType") or ""):
+                pending[params.get("requestId")] = url
+        elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+            request_id = params["requestId"]
+            url = pending.pop(request_id)
+            try:
+                yield url, json.loads(fetch_body(request_id, url))
+            except Exception:
+                print("Exception occurred:")
+                traceback.print_exc()
+
+
+class NetworkCapture:
+    """
+    Reads record JSON the portal fetched over XHR from the driver's performance log.
+    """
+
+    def __init__(self, driver, url_pattern: str | None = None, records_path: str | None = None):
+        self.driver = driver
+        self.url_pattern = url_pattern or settings.SCRAPER_CAPTURE_URL_PATTERN
+        self.records_path = settings.SCRAPER_CAPTURE_RECORDS_PATH if records_path is None else records_path
+        self._pending: dict[str, str] = {}
+
+    def _fetch_body(self, request_id: str, url: str) -> bytes:
+        body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        if body.get("base64Encoded"):
+            return base64.b64decode(body["body"])
+        return body["body"].encode()
+
+    def poll(self) -> list[list[tuple[list[str], list[str]]]]:
+        """
+        Sections for every record in responses finished since the last poll.
+        """
+        entries = self.driver.get_log("performance")
+        records = []
+        for _url, payload in responses_from_log(entries, self.url_pattern, self._fetch_body, self._pending):
+            records.extend(sections_from_payload(item) for item in records_from_payload(payload, self.records_path))
+        return records
+
+    def drain(self) -> None:
+        """
+        Discard everything logged so far, e.g. before clicking the next record.
+        """
+        self.driver.get_log("performance")
+        self._pending.clear()
+
+    def next_records(self, driver=None):
+        """
+        WebDriverWait condition: the records from the next matching response(s), or False.
+        """
+        return self.poll() or False
@@ -0,0 +1,333 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.shortcuts import get_object_or_404
+from openpyxl import Workbook
+
+from .capture import SECTION_FIELDS
+from .models import ScrapedRecord, ScrapingRun, SectionHeading
+
+EXPORT_CHUNK_SIZE = int(getattr(settings, "SCRAPER_EXPORT_CHUNK_SIZE", 2000))
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_CONTENT_TYPE = "text/csv; charset=utf-8"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+EXPORT_CACHE_DIR = Path(getattr(settings, "SCRAPER_EXPORT_CACHE_DIR", settings.BASE_DIR / "export_cache"))
+# Cached export files older than this are removed when another export is published
+EXPORT_CACHE_MAX_AGE_HOURS = int(getattr(settings, "SCRAPER_EXPORT_CACHE_MAX_AGE_HOURS", 24))
+# Sentinel export_run() returns for ?run=all
+ALL_RUNS = "all"
+
+
+class ExportFilterError(ValueError):
+    """
+    Raised for export query parameters that cannot be applied.
+    """
+
+
+def _filter_date(value: str | None, name: str):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ExportFilterError(f"Invalid {name}. Expected YYYY-MM-DD.")
+
+
+def export_run(params):
+    """
+    The run an export covers: ?run=<id>, the latest run by default (None when there is
+    none yet), or ALL_RUNS for ?run=all.
+    """
+    run_id = (params.get("run") or "").strip()
+    if run_id == ALL_RUNS:
+        return ALL_RUNS
+    if run_id:
+        return get_object_or_404(ScrapingRun, id=run_id if run_id.isdigit() else 0, parent__isnull=True)
+    return ScrapingRun.objects.filter(parent__isnull=True).order_by("-started_at").first()
+
+
+def records_for_export(params, run=None):
+    """
+    Records selected by the export query parameters, in id order:
+    run=<id> (default: the latest run) or run=all, and date_from / date_to
+    (YYYY-MM-DD, inclusive) on the registration date.
+    """
+    run = run or export_run(params)
+    if run == ALL_RUNS:
+        records = ScrapedRecord.objects.all()
+    elif run is None:
+        return ScrapedRecord.objects.none()
+    else:
+        records = ScrapedRecord.objects.filter(run=run)
+
+    date_from = _filter_date(params.get("date_from"), "date_from")
+    date_to = _filter_date(params.get("date_to"), "date_to")
+    if date_from:
+        records = records.filter(registration_date__gte=date_from)
+    if date_to:
+        records = records.filter(registration_date__lte=date_to)
+    return records.order_by("id")
+
+
+def export_columns(run) -> list[tuple[str, str]]:
+    """
+    (section field, heading) for every column: the run's SectionHeading catalog in
+    section order, then first-seen order. ALL_RUNS merges every run's catalog.
+    """
+    if run is None:
+        return []
+    if run == ALL_RUNS:
+        pairs = (
+            SectionHeading.objects.values("section", "heading")
+            .annotate(first_seen=Min("id"))
+            .order_by("first_seen")
+            .values_list("section", "heading")
+        )
+    else:
+        pairs = SectionHeading.objects.filter(run=run).order_by("id").values_list("section", "heading")
+    order = {field: i for i, field in enumerate(SECTION_FIELDS)}
+    return sorted(pairs, key=lambda pair: order.get(pair[0], len(order)))
+
+
+def iter_records(records):
+    """
+    Stream the records' sections in chunks instead of loading the whole queryset.
+    """
+    return records.only("id", *SECTION_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def column_keys(columns: list[tuple[str, str]]) -> list[str]:
+    """
+    Unique "section.heading" names for formats that key values by column (NDJSON, Parquet).
+    The Excel and CSV header rows use the bare headings.
+    """
+    return [f"{field}.{heading}" for field, heading in columns]
+
+
+def record_row(record, columns: list[tuple[str, str]]) -> list:
+    """
+    One record's values in column order; a heading the record lacks gives "".
+    """
+    sections = {field: getattr(record, field) or {} for field in SECTION_FIELDS}
+    return [sections[field].get(heading, "") for field, heading in columns]
+
+
+def write_xlsx(records, columns: list[tuple[str, str]], fileobj) -> None:
+    """
+    Write the records to `fileobj` as an xlsx workbook. The write-only workbook
+    spools rows to disk, so memory does not grow with the number of records.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    if columns:
+        ws.append([heading for _field, heading in columns])
+        for record in iter_records(records):
+            ws.append(record_row(record, columns))
+    else:
+        ws.append(["No data"])
+    wb.save(fileobj)
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back, so csv.writer can feed a generator.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records, columns: list[tuple[str, str]]):
+    """
+    CSV lines with the same header and rows as the Excel export.
+    """
+    writer = csv.writer(_Echo())
+    if not columns:
+        return
+    yield writer.writerow([heading for _field, heading in columns])
+    for record in iter_records(records):
+        yield writer.writerow(record_row(record, columns))
+
+
+def iter_ndjson(records, columns: list[tuple[str, str]]):
+    """
+    One JSON object per line, keyed by column_keys().
+    """
+    keys = column_keys(columns)
+    for record in iter_records(records):
+        yield json.dumps(dict(zip(keys, record_row(record, columns))), ensure_ascii=False) + "\n"
+
+
+def write_parquet(records, columns: list[tuple[str, str]], fileobj) -> None:
+    """
+    Write the records to `fileobj` as Parquet, one string column per column_keys()
+    entry, one row group per EXPORT_CHUNK_SIZE records. Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    keys = column_keys(columns)
+    schema = pa.schema([(key, pa.string()) for key in keys])
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        batch = []
+        for record in iter_records(records):
+            batch.append(record_row(record, columns))
+            if len(batch) >= EXPORT_CHUNK_SIZE:
+                writer.write_table(_parquet_table(pa, schema, keys, batch))
+                batch = []
+        if batch or not keys:
+            writer.write_table(_parquet_table(pa, schema, keys, batch))
+
+
+def _parquet_table(pa, schema, keys: list[str], rows: list[list]):
+    values = [[None if row[i] is None else str(row[i]) for row in rows] for i in range(len(keys))]
+    return pa.Table.from_arrays(values, schema=schema)
+
+
+def write_csv(records, columns: list[tuple[str, str]], fileobj) -> None:
+    for line in iter_csv(records, columns):
+        fileobj.write(line.encode())
+
+
+def write_ndjson(records, columns: list[tuple[str, str]], fileobj) -> None:
+    for line in iter_ndjson(records, columns):
+        fileobj.write(line.encode())
+
+
+# format -> (file extension, writer)
+EXPORT_WRITERS = {
+    "xlsx": (".xlsx", write_xlsx),
+    "csv": (".csv", write_csv),
+    "ndjson": (".ndjson", write_ndjson),
+    "parquet": (".parquet", write_parquet),
+}
+# Line formats are streamed to the client while the cache file is written
+EXPORT_LINE_ITERATORS = {
+    "csv": iter_csv,
+    "ndjson": iter_ndjson,
+}
+
+
+def export_version(params) -> tuple[str, datetime | None]:
+    """
+    (version, last_modified) of the data an export request selects. The version
+    changes whenever the run's records change, so it doubles as the ETag. Only the
+    runs table is read: ingest and retention keep records_changed_at current, and
+    for run=all the run count and newest id also catch pruned runs.
+    """
+    run = export_run(params)
+    date_from = _filter_date(params.get("date_from"), "date_from")
+    date_to = _filter_date(params.get("date_to"), "date_to")
+    if run == ALL_RUNS:
+        runs = ScrapingRun.objects.aggregate(changed=Max("records_changed_at"), count=Count("id"), last=Max("id"))
+        changed = runs["changed"]
+        state = f"{runs['count']}:{runs['last']}"
+    else:
+        changed = run and (run.records_changed_at or run.started_at)
+        state = ""
+    key = "|".join([
+        str(run.id) if isinstance(run, ScrapingRun) else str(run),
+        str(date_from or ""),
+        str(date_to or ""),
+        state,
+        changed.isoformat() if changed else "",
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()[:20], changed
+
+
+def _export_scope(params, run) -> str:
+    # One cache slot per run and date filter, so filtered requests never evict each other
+    base = f"run{run.id}" if isinstance(run, ScrapingRun) else str(run)
+    date_from = _filter_date(params.get("date_from"), "date_from")
+    date_to = _filter_date(params.get("date_to"), "date_to")
+    return f"{base}-{date_from or 'start'}-{date_to or 'end'}"
+
+
+def _publish(tmp_name: str, path: Path, scope: str, fmt: str) -> None:
+    """
+    Move a finished export into place, then drop older versions of the same slot and
+    any file past SCRAPER_EXPORT_CACHE_MAX_AGE_HOURS. Requests already reading a
+    removed file keep their open handle.
+    """
+    # Readers only ever see complete files
+    os.replace(tmp_name, path)
+    for stale in EXPORT_CACHE_DIR.glob(f"{scope}-{fmt}-*"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    cutoff = time.time() - EXPORT_CACHE_MAX_AGE_HOURS * 3600
+    for old in EXPORT_CACHE_DIR.iterdir():
+        try:
+            if old != path and old.stat().st_mtime < cutoff:
+                old.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _tee_to_cache(lines, path: Path, scope: str, fmt: str):
+    """
+    Yield the encoded lines while writing them to a temp file that is published as the
+    cache file once the last line is out. A client that disconnects leaves no file.
+    """
+    EXPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(dir=EXPORT_CACHE_DIR, suffix=".tmp", delete=False)
+    try:
+        for line in lines:
+            data = line.encode()
+            tmp.write(data)
+            yield data
+        tmp.close()
+    except BaseException:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+    _publish(tmp.name, path, scope, fmt)
+
+
+def cached_export(params, fmt: str):
+    """
+    Content of the export for these parameters: the cached file, opened, when its
+    version is already on disk. Otherwise CSV and NDJSON are streamed while the cache
+    file is written alongside, and XLSX and Parquet are built first, then opened.
+    Returns an open binary file or an iterator of bytes.
+    """
+    extension, writer = EXPORT_WRITERS[fmt]
+    run = export_run(params)
+    version, _changed = export_version(params)
+    scope = _export_scope(params, run)
+    path = EXPORT_CACHE_DIR / f"{scope}-{fmt}-{version}{extension}"
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        pass
+
+    records = records_for_export(params, run)
+    if fmt in EXPORT_LINE_ITERATORS:
+        return _tee_to_cache(EXPORT_LINE_ITERATORS[fmt](records, export_columns(run)), path, scope, fmt)
+
+    EXPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=EXPORT_CACHE_DIR, suffix=".tmp", delete=False) as tmp:
+        try:
+            writer(records, export_columns(run), tmp)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    # Opened before publishing, so a concurrent rebuild cannot remove it first
+    content = open(tmp.name, "rb")
+    _publish(tmp.name, path, scope, fmt)
+    return content
+
+
+def drop_cached_exports(run_id: int) -> None:
+    for path in EXPORT_CACHE_DIR.glob(f"run{run_id}-*"):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,228 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Place
+
+# Smallest trigram (Dice) similarity accepted as a fuzzy match
+MATCH_THRESHOLD = float(getattr(settings, "SCRAPER_GAZETTEER_MATCH_THRESHOLD", 0.75))
+# How often a process checks whether the places table changed and rebuilds its index
+REFRESH_SECONDS = int(getattr(settings, "SCRAPER_GAZETTEER_REFRESH_SECONDS", 300))
+# Shortest capture matched by prefix, so "Nar" does not pick a district
+MIN_PREFIX = 4
+
+# The 55 districts of Madhya Pradesh, seeded by migration 0026
+MP_DISTRICTS = (
+    "Agar Malwa", "Alirajpur", "Anuppur", "Ashoknagar", "Balaghat", "Barwani", "Betul",
+    "Bhind", "Bhopal", "Burhanpur", "Chhatarpur", "Chhindwara", "Damoh", "Datia", "Dewas",
+    "Dhar", "Dindori", "Guna", "Gwalior", "Harda", "Indore", "Jabalpur", "Jhabua", "Katni",
+    "Khandwa", "Khargone", "Maihar", "Mandla", "Mandsaur", "Mauganj", "Morena",
+    "Narmadapuram", "Narsinghpur", "Neemuch", "Niwari", "Pandhurna", "Panna", "Raisen",
+    "Rajgarh", "Ratlam", "Rewa", "Sagar", "Satna", "Sehore", "Seoni", "Shahdol",
+    "Shajapur", "Sheopur", "Shivpuri", "Sidhi", "Singrauli", "Tikamgarh", "Ujjain",
+    "Umaria", "Vidisha",
+)
+# Former and alternative district names -> canonical name
+DISTRICT_ALIASES = {
+    "Hoshangabad": "Narmadapuram",
+    "East Nimar": "Khandwa",
+    "West Nimar": "Khargone",
+    "Agar": "Agar Malwa",
+}
+# Words that say what a place is rather than which one
+GENERIC_WORDS = {"district", "distt", "dist", "zila", "jila", "tehsil", "tahsil", "teh", "village", "gram", "gaon"}
+# Words the portal appends to a place name ("Indore Urban"); only these may follow a
+# name matched as the start of a capture, so "Sagarpur" is not taken for Sagar
+QUALIFIER_WORDS = ("urban", "rural", "city", "cantt", "cantonment", "nagarnigam")
+# Common romanisation variants folded together (applied in order)
+TRANSLITERATIONS = (("aa", "a"), ("ee", "i"), ("oo", "u"), ("w", "v"), ("ph", "f"), ("z", "j"), ("q", "k"))
+
+
+def place_key(name) -> str:
+    """
+    Matching key of a place name: ASCII, lowercase, generic words dropped, letters only,
+    transliteration variants folded. "Hoshangābād  Distt." and "hoshangabad" share a key.
+    """
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode().lower()
+    words = [w for w in re.findall(r"[a-z]+", text) if w not in GENERIC_WORDS]
+    key = "".join(words)
+    for variant, canonical in TRANSLITERATIONS:
+        key = key.replace(variant, canonical)
+    return key
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Scope:
+    """
+    The places one lookup chooses between (e.g. the tehsils of one district):
+    exact keys, a sorted key list for prefix lookups and a trigram index.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.trigrams = defaultdict(set)
+        self.gram_counts = {}
+        self.sorted_keys = []
+
+    def add(self, key: str, place_id: int) -> None:
+        if not key:
+            return
+        # A key shared by two places in one scope is ambiguous
+        self.exact[key] = None if self.exact.get(key, place_id) != place_id else place_id
+        grams = _trigrams(key)
+        self.gram_counts[key] = len(grams)
+        for gram in grams:
+            self.trigrams[gram].add(key)
+
+    def freeze(self) -> None:
+        self.sorted_keys = sorted(self.exact)
+
+    def lookup(self, key: str) -> int | None:
+        if key in self.exact:
+            return self.exact[key]
+        return self._prefix(key) or self._fuzzy(key)
+
+    def _prefix(self, key: str) -> int | None:
+        if len(key) < MIN_PREFIX:
+            return None
+        # The capture is the start of exactly one name ("narmadapur" -> "narmadapuram")
+        i = bisect_left(self.sorted_keys, key)
+        starts = []
+        while i < len(self.sorted_keys) and self.sorted_keys[i].startswith(key) and len(starts) < 2:
+            starts.append(self.sorted_keys[i])
+            i += 1
+        if len(starts) == 1:
+            return self.exact[starts[0]]
+        # Or a name followed by a qualifier ("indoreurban" -> "indore"); the longest wins
+        for end in range(len(key) - 1, MIN_PREFIX - 1, -1):
+            if key[:end] in self.exact and key[end:] in QUALIFIER_WORDS:
+                return self.exact[key[:end]]
+        return None
+
+    def _fuzzy(self, key: str) -> int | None:
+        grams = _trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                shared[candidate] += 1
+        scores = defaultdict(float)
+        for candidate, count in shared.items():
+            place_id = self.exact[candidate]
+            if place_id:
+                scores[place_id] = max(scores[place_id], 2 * count / (len(grams) + self.gram_counts[candidate]))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:2]
+        if not ranked or ranked[0][1] < MATCH_THRESHOLD:
+            return None
+        # Two places equally close is no match
+        if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+            return None
+        return ranked[0][0]
+
+
+class GazetteerIndex:
+    """
+    In-memory index of the Place table. Districts are looked up among all districts,
+    tehsils within their district, villages within their tehsil, then their district,
+    then everywhere; each step tries an exact key, a unique prefix, then trigrams.
+    """
+
+    def __init__(self, places):
+        self.scopes = defaultdict(_Scope)
+        self._memo = {}
+        places = [(place_id, kind, place_key(name), parent_id) for place_id, kind, name, parent_id in places]
+        parents = {place_id: parent_id for place_id, _kind, _key, parent_id in places}
+        for place_id, kind, key, parent_id in places:
+            self.scopes[(kind, None)].add(key, place_id)
+            if parent_id:
+                self.scopes[(kind, parent_id)].add(key, place_id)
+            if kind == Place.VILLAGE and parents.get(parent_id):
+                # Villages are also found by district when the tehsil is missing or unknown
+                self.scopes[(kind, "district", parents[parent_id])].add(key, place_id)
+        districts = self.scopes[(Place.DISTRICT, None)]
+        for alias, name in DISTRICT_ALIASES.items():
+            canonical = districts.exact.get(place_key(name))
+            if canonical:
+                districts.add(place_key(alias), canonical)
+        for scope in self.scopes.values():
+            scope.freeze()
+
+    @classmethod
+    def from_db(cls) -> "GazetteerIndex":
+        # Keys are recomputed from names, so a change to place_key() needs no data migration
+        return cls(Place.objects.values_list("id", "kind", "name", "parent_id").iterator(chunk_size=5000))
+
+    def _find(self, scopes, name) -> int | None:
+        key = place_key(name)
+        if not key:
+            return None
+        for scope in scopes:
+            if scope in self.scopes:
+                found = self.scopes[scope].lookup(key)
+                if found:
+                    return found
+        return None
+
+    def resolve(self, district: str, tehsil: str = "", village: str = "") -> dict:
+        """
+        Place ids for one record's district, tehsil and village captures (None where
+        nothing matched), as ScrapedRecord *_place_id fields.
+        """
+        memo_key = (district, tehsil, village)
+        if memo_key in self._memo:
+            return dict(self._memo[memo_key])
+        district_id = self._find([(Place.DISTRICT, None)], district)
+        tehsil_id = self._find([(Place.TEHSIL, district_id) if district_id else (Place.TEHSIL, None)], tehsil)
+        village_scopes = []
+        if tehsil_id:
+            village_scopes.append((Place.VILLAGE, tehsil_id))
+        if district_id:
+            village_scopes.append((Place.VILLAGE, "district", district_id))
+        else:
+            village_scopes.append((Place.VILLAGE, None))
+        village_id = self._find(village_scopes, village)
+        resolved = {"district_place_id": district_id, "tehsil_place_id": tehsil_id, "village_place_id": village_id}
+        if len(self._memo) < 100000:
+            self._memo[memo_key] = resolved
+        return dict(resolved)
+
+
+_index: GazetteerIndex | None = None
+_index_version = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_index() -> GazetteerIndex:
+    """
+    Process-wide GazetteerIndex, rebuilt when the Place table has changed (checked at
+    most every SCRAPER_GAZETTEER_REFRESH_SECONDS).
+    """
+    global _index, _index_version, _checked_at
+    with _index_lock:
+        if _index is None or time.monotonic() - _checked_at >= REFRESH_SECONDS:
+            version = tuple(Place.objects.aggregate(count=Count("id"), last=Max("id")).values())
+            if _index is None or version != _index_version:
+                _index = GazetteerIndex.from_db()
+                _index_version = version
+            _checked_at = time.monotonic()
+        return _index
+
+
+def reset_index() -> None:
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def resolve_places(district: str, tehsil: str = "", village: str = "") -> dict:
+    return get_index().resolve(district, tehsil, village)
@@ -0,0 +1,320 @@
+import csv
+import hashlib
+import json
+import logging
+import re
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.utils import timezone
+
+from .capture import SECTION_FIELDS
+from .models import ScrapedRecord, ScrapingRun, SectionHeading
+from .normalize import NORMALIZED_FIELDS, typed_fields
+
+INGEST_BATCH_SIZE = int(getattr(settings, "SCRAPER_INGEST_BATCH_SIZE", 50))
+# Use COPY into a temp table on PostgreSQL instead of a multi-row INSERT
+INGEST_COPY = getattr(settings, "SCRAPER_INGEST_COPY", True)
+# Further attempts at a batch that failed because the database was locked
+INGEST_RETRIES = int(getattr(settings, "SCRAPER_INGEST_RETRIES", 3))
+INGEST_RETRY_DELAY = 0.5
+
+logger = logging.getLogger(__name__)
+
+# Registration Details headings (lowercased, letters only) that carry the registration number
+REGISTRATION_NO_HEADINGS = (
+    "registrationno",
+    "registrationnumber",
+    "regno",
+    "documentno",
+    "documentnumber",
+)
+
+
+class IngestError(Exception):
+    """
+    Raised when a batch of records could not be written; the batch is not saved.
+    """
+
+
+def _is_lock_error(error: Exception) -> bool:
+    # SQLite "database is locked" / "database table is locked", PostgreSQL deadlocks
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and ("locked" in message or "deadlock" in message)
+
+
+def normalize_registration_no(value) -> str | None:
+    """
+    Canonical form of a registration number: whitespace removed, upper-cased. None when empty.
+    """
+    value = re.sub(r"\s+", "", str(value or "")).upper()
+    return value[:100] or None
+
+
+def registration_no_from(registration_details: dict | None) -> str | None:
+    for heading, value in (registration_details or {}).items():
+        if re.sub(r"[^a-z]", "", heading.lower()) in REGISTRATION_NO_HEADINGS:
+            return normalize_registration_no(value)
+    return None
+
+
+def record_fields(all_sections) -> dict:
+    """
+    The five ScrapedRecord JSON fields from (headings, data_texts) sections.
+    """
+    return {field: dict(zip(headings, data_texts)) for field, (headings, data_texts) in zip(SECTION_FIELDS, all_sections)}
+
+
+def content_hash(fields: dict) -> str:
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _copy_value(value):
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def known_registration_numbers(values) -> set[str]:
+    """
+    The registration numbers among `values` that are already stored, normalized.
+    """
+    wanted = {n for n in map(normalize_registration_no, values) if n}
+    if not wanted:
+        return set()
+    return set(ScrapedRecord.objects.filter(registration_no__in=wanted).values_list("registration_no", flat=True))
+
+
+class RecordWriter:
+    """
+    Buffers scraped records and writes them in batches, one transaction per batch.
+
+    Records are keyed on the registration number: new ones are inserted, changed
+    ones are rewritten under `run`, unchanged ones are only moved under `run`, so a
+    record always belongs to the newest run that saw it. The buffer is
+    flushed every `batch_size` records, on flush() (the scraper calls it at the
+    end of each results page) and when the `with` block exits, even on error.
+    """
+
+    def __init__(self, run: ScrapingRun | None, batch_size: int | None = None):
+        self.run = run
+        self.batch_size = max(1, batch_size or INGEST_BATCH_SIZE)
+        self.using = router.db_for_write(ScrapedRecord)
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self._buffer: list[ScrapedRecord] = []
+        # (section, heading) pairs already in the run's SectionHeading catalog
+        self._catalogued: set[tuple[str, str]] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    @property
+    def saved(self) -> int:
+        """
+        Records created or updated so far (flushed ones only).
+        """
+        return self.created + self.updated
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def add(self, all_sections) -> bool:
+        """
+        Buffer one record's (headings, data_texts) sections. Returns True when this
+        filled the batch and it reached the database; raises IngestError when it did not.
+        """
+        fields = record_fields(all_sections)
+        self._buffer.append(ScrapedRecord(
+            run=self.run,
+            registration_no=registration_no_from(fields["registration_details"]),
+            content_hash=content_hash(fields),
+            **fields,
+            **typed_fields(fields),
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> int:
+        """
+        Write everything buffered in one transaction. Returns the number of records
+        created or updated. A batch that fails because the database is locked is retried
+        up to SCRAPER_INGEST_RETRIES times; when it still fails, IngestError is raised.
+        """
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        return self._retrying(lambda: self._write(batch), len(batch))
+
+    def adopt(self, registration_numbers) -> int:
+        """
+        Move the stored records with these registration numbers under `run`. The scraper
+        calls it for rows it skips as already stored, so they stay in this run's exports
+        and are not pruned with the older run that first saved them. Returns the number moved.
+        """
+        numbers = {n for n in map(normalize_registration_no, registration_numbers) if n}
+        if self.run is None or not numbers:
+            return 0
+        return self._retrying(lambda: self._adopt(numbers), len(numbers))
+
+    def _retrying(self, write, count: int) -> int:
+        for attempt in range(INGEST_RETRIES + 1):
+            try:
+                return write()
+            except Exception as e:
+                # The catalog rows of this batch were rolled back with it
+                self._catalogued.clear()
+                if not _is_lock_error(e) or attempt == INGEST_RETRIES:
+                    logger.exception("Writing a batch of %d record(s) failed", count)
+                    raise IngestError(f"Could not save {count} record(s): {e}") from e
+                logger.warning("Database locked writing %d record(s); retrying (%d/%d)", count, attempt + 1, INGEST_RETRIES)
+                time.sleep(INGEST_RETRY_DELAY * (attempt + 1))
+
+    def _move_to_run(self, records: list[ScrapedRecord], previous_runs: set) -> None:
+        # Both the runs losing records and this run have stale exports afterwards
+        ScrapedRecord.objects.using(self.using).filter(registration_no__in=[r.registration_no for r in records]).update(run=self.run)
+        touched = (set(previous_runs) | {self.run.id}) - {None}
+        ScrapingRun.objects.using(self.using).filter(id__in=touched).update(records_changed_at=timezone.now())
+        self._catalog_headings(records)
+
+    def _adopt(self, numbers: set[str]) -> int:
+        with transaction.atomic(using=self.using):
+            records = list(
+                ScrapedRecord.objects.using(self.using)
+                .filter(registration_no__in=numbers)
+                .exclude(run=self.run)
+                .only("registration_no", "run_id", *SECTION_FIELDS)
+            )
+            if records:
+                self._move_to_run(records, {r.run_id for r in records})
+        return len(records)
+
+    def _write(self, batch: list[ScrapedRecord]) -> int:
+        keyed: dict[str, ScrapedRecord] = {}
+        unkeyed = []
+        for record in batch:
+            # A retried batch may carry ids assigned by the rolled-back attempt
+            record.pk = None
+            if record.registration_no:
+                # The later copy wins within a batch
+                keyed[record.registration_no] = record
+            else:
+                unkeyed.append(record)
+        with transaction.atomic(using=self.using):
+            stored = {
+                registration_no: (digest, run_id)
+                for registration_no, digest, run_id in ScrapedRecord.objects.using(self.using)
+                .filter(registration_no__in=list(keyed))
+                .values_list("registration_no", "content_hash", "run_id")
+            }
+            changed = [r for key, r in keyed.items() if stored.get(key, (None,))[0] != r.content_hash]
+            # Unchanged records another run saved
+            moved = [
+                r for key, r in keyed.items()
+                if key in stored and stored[key][0] == r.content_hash and self.run and stored[key][1] != self.run.id
+            ]
+            if moved:
+                self._move_to_run(moved, {stored[r.registration_no][1] for r in moved})
+            if INGEST_COPY and connections[self.using].vendor == "postgresql":
+                self._copy_upsert(unkeyed + changed)
+            else:
+                self._bulk_upsert(unkeyed, changed)
+            # Updated records leave their old run, so its exports are stale too
+            touched = {stored[r.registration_no][1] for r in changed if r.registration_no in stored}
+            if unkeyed or changed:
+                touched.add(self.run.id if self.run else None)
+            touched.discard(None)
+            if touched:
+                ScrapingRun.objects.using(self.using).filter(id__in=touched).update(records_changed_at=timezone.now())
+            self._catalog_headings(unkeyed + changed)
+
+        updated = sum(1 for r in changed if r.registration_no in stored)
+        self.created += len(unkeyed) + len(changed) - updated
+        self.updated += updated
+        self.unchanged += len(keyed) - len(changed)
+        return len(unkeyed) + len(changed)
+
+    def _catalog_headings(self, records: list[ScrapedRecord]) -> None:
+        """
+        Add headings first seen in this batch to the run's catalog, in the order they appear.
+        """
+        if self.run is None:
+            return
+        new = []
+        for record in records:
+            for field in SECTION_FIELDS:
+                for heading in getattr(record, field) or {}:
+                    pair = (field, str(heading)[:255])
+                    if pair not in self._catalogued:
+                        self._catalogued.add(pair)
+                        new.append(SectionHeading(run=self.run, section=field, heading=pair[1]))
+        if new:
+            SectionHeading.objects.using(self.using).bulk_create(new, ignore_conflicts=True)
+
+    def _bulk_upsert(self, unkeyed: list[ScrapedRecord], keyed: list[ScrapedRecord]) -> None:
+        manager = ScrapedRecord.objects.using(self.using)
+        manager.bulk_create(unkeyed, batch_size=self.batch_size)
+        # ON CONFLICT also covers a record another shard stored since the lookup
+        manager.bulk_create(
+            keyed,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["registration_no"],
+            update_fields=["run", "content_hash", *SECTION_FIELDS, *NORMALIZED_FIELDS],
+        )
+
+    def _copy_upsert(self, records: list[ScrapedRecord]) -> None:
+        """
+        PostgreSQL fast path: COPY the batch into a temp table, then upsert from it
+        with a single INSERT ... SELECT ... ON CONFLICT.
+        """
+        if not records:
+            return
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        table = quote(ScrapedRecord._meta.db_table)
+        columns = ", ".join(quote(c) for c in ("run_id", "registration_no", "content_hash", *SECTION_FIELDS, *NORMALIZED_FIELDS, "created_at"))
+        updates = ", ".join(f"{quote(c)} = EXCLUDED.{quote(c)}" for c in ("run_id", "content_hash", *SECTION_FIELDS, *NORMALIZED_FIELDS))
+        # Unquoted empty fields are NULL in CSV COPY; these text columns are NOT NULL
+        not_null = ", ".join(
+            quote(f.column) for f in ScrapedRecord._meta.concrete_fields
+            if f.name in ("content_hash", *NORMALIZED_FIELDS) and not f.null
+        )
+        now = timezone.now()
+        rows = [
+            (
+                r.run_id, r.registration_no, r.content_hash,
+                *(json.dumps(getattr(r, f), ensure_ascii=False) for f in SECTION_FIELDS),
+                *(_copy_value(getattr(r, f)) for f in NORMALIZED_FIELDS),
+                now.isoformat(),
+            )
+            for r in records
+        ]
+        buffer = StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE ingest_records ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+            copy_sql = f"COPY ingest_records ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({not_null}))"
+            raw = cursor.cursor
+            if hasattr(raw, "copy_expert"):  # psycopg2
+                raw.copy_expert(copy_sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM ingest_records "
+                f"ON CONFLICT (registration_no) DO UPDATE SET {updates} "
+                f"WHERE {table}.content_hash <> EXCLUDED.content_hash"
+            )
+            cursor.execute("DROP TABLE ingest_records")
@@ -0,0 +1,215 @@
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ScrapingJob, ScrapingRun
+from .portal_session import decrypt_secret, encrypt_secret
+from .scraper import ScrapeError, _create_status, run_scrape
+from .sharding import run_sharded, shard_days_for
+
+# Fields that must not stay in the job row once a worker has it
+SENSITIVE_PARAMS = ("password", "password_encrypted")
+MAX_ATTEMPTS = int(getattr(settings, "SCRAPER_JOB_MAX_ATTEMPTS", 3))
+HEARTBEAT_SECONDS = int(getattr(settings, "SCRAPER_JOB_HEARTBEAT_SECONDS", 30))
+LEASE_SECONDS = int(getattr(settings, "SCRAPER_JOB_LEASE_SECONDS", 300))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _seal(params: dict) -> dict:
+    """
+    Job params as stored while queued: the password encrypted like saved portal sessions.
+    """
+    sealed = {k: v for k, v in params.items() if k not in SENSITIVE_PARAMS}
+    if params.get("password"):
+        sealed["password_encrypted"] = encrypt_secret(params["password"])
+    return sealed
+
+
+def _unseal(params: dict) -> dict:
+    # Jobs queued before passwords were encrypted still carry it in plain text
+    unsealed = {k: v for k, v in params.items() if k not in SENSITIVE_PARAMS}
+    if params.get("password_encrypted"):
+        unsealed["password"] = decrypt_secret(params["password_encrypted"])
+    elif params.get("password"):
+        unsealed["password"] = params["password"]
+    return unsealed
+
+
+def enqueue_scrape(params: dict, priority: int = 0) -> ScrapingJob:
+    """
+    Create a run plus its queued job. Returns immediately; a worker picks it up.
+    The password is stored encrypted and removed from the row once a worker claims it.
+    """
+    with transaction.atomic():
+        run = ScrapingRun.objects.create()
+        job = ScrapingJob.objects.create(run=run, params=_seal(params), priority=priority)
+    _create_status(run, "Scrape queued; waiting for a free worker.")
+    return job
+
+
+def claim_next_job(worker: str) -> ScrapingJob | None:
+    """
+    Atomically move the highest-priority, then oldest, queued job to RUNNING for this worker.
+    Uses a conditional UPDATE so it is safe on SQLite and PostgreSQL alike. The returned
+    job's params hold the decrypted password; the row no longer holds it at all.
+    """
+    candidates = (
+        ScrapingJob.objects.filter(state=ScrapingJob.QUEUED)
+        .order_by("-priority", "created_at")
+        .values_list("id", flat=True)[:10]
+    )
+    for job_id in candidates:
+        now = timezone.now()
+        claimed = ScrapingJob.objects.filter(id=job_id, state=ScrapingJob.QUEUED).update(
+            state=ScrapingJob.RUNNING,
+            worker=worker,
+            claimed_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            job = ScrapingJob.objects.select_related("run").get(id=job_id)
+            ScrapingJob.objects.filter(id=job_id).update(params={k: v for k, v in job.params.items() if k not in SENSITIVE_PARAMS})
+            job.params = _unseal(job.params)
+            return job
+    return None
+
+
+def _finish_job(job: ScrapingJob, state: str, result: str) -> None:
+    now = timezone.now()
+    params = {k: v for k, v in job.params.items() if k not in SENSITIVE_PARAMS}
+    ScrapingJob.objects.filter(id=job.id).update(state=state, result=result, finished_at=now, params=params)
+    ScrapingRun.objects.filter(id=job.run_id).update(finished_at=now)
+
+
+class Heartbeat:
+    """
+    Context manager that refreshes a running job's heartbeat_at from a background thread
+    every SCRAPER_JOB_HEARTBEAT_SECONDS, so any worker can tell the job's worker is alive.
+    """
+
+    def __init__(self, job_id: int, interval: float = HEARTBEAT_SECONDS):
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _beat(self) -> None:
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    ScrapingJob.objects.filter(id=self.job_id, state=ScrapingJob.RUNNING).update(heartbeat_at=timezone.now())
+                except Exception:
+                    print("Exception occurred:")
+                    traceback.print_exc()
+        finally:
+            # This thread's own DB connection
+            connection.close()
+
+
+def run_job(job: ScrapingJob) -> None:
+    """
+    Execute a claimed job and record its outcome. Never raises.
+    """
+    runner = run_sharded if shard_days_for(job.params) else run_scrape
+    try:
+        with Heartbeat(job.id):
+            message = runner(job.run, job.params)
+    except ScrapeError as e:
+        _finish_job(job, ScrapingJob.FAILED, str(e))
+    except Exception as e:
+        print("Exception occurred:")
+        traceback.print_exc()
+        _create_status(job.run, "Scraping failed due to an error. Please check logs and try again.")
+        _finish_job(job, ScrapingJob.FAILED, f"Scraping failed: {e}")
+    else:
+        _finish_job(job, ScrapingJob.DONE, message)
+    finally:
+        close_old_connections()
+
+
+class ResumeError(Exception):
+    """
+    Raised when a run cannot be resumed; the message is shown to the operator.
+    """
+
+
+def resume_run(run: ScrapingRun, password: str = "") -> ScrapingJob:
+    """
+    Re-queue a finished or failed run so a worker continues it from its checkpoint.
+    The password is not kept once a worker has claimed the job, so it is supplied
+    again here; a saved portal session (see portal_session) can make it unnecessary.
+    """
+    job = ScrapingJob.objects.filter(run=run).first()
+    if job is None:
+        raise ResumeError(f"Run #{run.id} has no job to resume.")
+    if job.state in (ScrapingJob.QUEUED, ScrapingJob.RUNNING):
+        raise ResumeError(f"Run #{run.id} is already {job.state}.")
+    checkpoint = run.checkpoint or {}
+    params = {**job.params, **checkpoint.get("params", {}), "resume": True, "password": password}
+    ScrapingJob.objects.filter(id=job.id).update(state=ScrapingJob.QUEUED, params=_seal(params), result="", finished_at=None)
+    ScrapingRun.objects.filter(id=run.id).update(finished_at=None)
+    _create_status(run, "Resume queued; continuing from the last checkpoint.")
+    job.refresh_from_db()
+    return job
+
+
+def orphaned_jobs(now=None):
+    """
+    RUNNING jobs whose worker has not sent a heartbeat for SCRAPER_JOB_LEASE_SECONDS,
+    on any host (a recreated container comes back under a new hostname).
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=LEASE_SECONDS)
+    return ScrapingJob.objects.filter(state=ScrapingJob.RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff)
+        # Claimed before heartbeats existed
+        | Q(heartbeat_at__isnull=True, claimed_at__lt=cutoff)
+        | Q(heartbeat_at__isnull=True, claimed_at__isnull=True)
+    )
+
+
+def recover_orphaned_jobs(now=None) -> int:
+    """
+    Handle RUNNING jobs whose worker has gone (see orphaned_jobs). Called when the pool
+    starts and periodically by the first worker. Jobs are re-queued to resume from their
+    checkpoint until they reach SCRAPER_JOB_MAX_ATTEMPTS, then failed.
+    """
+    count = 0
+    for job in orphaned_jobs(now).select_related("run"):
+        # Conditional, so a job that beat meanwhile or that another worker recovered is left alone
+        if job.attempts < MAX_ATTEMPTS:
+            # The password went with the worker; a saved portal session logs the resume in
+            params = {**job.params, "resume": True}
+            if not orphaned_jobs(now).filter(id=job.id).update(state=ScrapingJob.QUEUED, params=params):
+                continue
+            _create_status(
+                job.run,
+                "Worker restarted while this run was in progress; resuming from the last checkpoint. "
+                "If the portal session has expired, resume the run again with the password.",
+            )
+        else:
+            if not orphaned_jobs(now).filter(id=job.id).update(state=ScrapingJob.FAILED):
+                continue
+            _create_status(job.run, "Worker restarted while this run was in progress.")
+            _finish_job(job, ScrapingJob.FAILED, "Worker restarted while this run was in progress.")
+        count += 1
+    return count
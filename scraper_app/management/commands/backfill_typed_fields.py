@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from scraper_app.capture import SECTION_FIELDS
+from scraper_app.models import ScrapedRecord
+from scraper_app.normalize import NORMALIZED_FIELDS, typed_fields
+
+
+class Command(BaseCommand):
+    help = "Fill the typed ScrapedRecord columns (dates, amounts, district, ...) from the JSON sections."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Records read and updated per transaction.",
+        )
+        parser.add_argument(
+            "--from-id",
+            type=int,
+            default=0,
+            help="Start at this record id, e.g. to continue an interrupted backfill.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        last_id = options["from_id"] - 1
+        updated = 0
+        while True:
+            # Keyset pagination keeps every batch an index range scan
+            batch = list(
+                ScrapedRecord.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("id", *SECTION_FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            for record in batch:
+                for field, value in typed_fields({f: getattr(record, f) for f in SECTION_FIELDS}).items():
+                    setattr(record, field, value)
+            with transaction.atomic():
+                ScrapedRecord.objects.bulk_update(batch, NORMALIZED_FIELDS)
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Backfilled {updated} record(s), up to id {last_id}.")
+        self.stdout.write(f"Done: {updated} record(s) backfilled.")
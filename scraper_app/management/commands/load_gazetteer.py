@@ -0,0 +1,86 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from scraper_app.gazetteer import GazetteerIndex, place_key, reset_index
+from scraper_app.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        "Load tehsils and villages into the gazetteer from a CSV with district, tehsil and "
+        "village columns (optional: tehsil_code, village_code). Districts must already exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file, UTF-8, with a header row.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Villages inserted per statement.",
+        )
+
+    def _rows(self, path):
+        try:
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+                if "district" not in fields or "tehsil" not in fields:
+                    raise CommandError("The CSV needs at least district and tehsil columns.")
+                for row in reader:
+                    yield {key: (row.get(name) or "").strip() for key, name in fields.items()}
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        batch_size = max(1, options["batch_size"])
+        districts = GazetteerIndex(Place.objects.filter(kind=Place.DISTRICT).values_list("id", "kind", "name", "parent_id"))
+
+        # Pass 1: tehsils, so villages can be attached to their ids
+        tehsils, unknown = {}, set()
+        for row in self._rows(path):
+            district_id = districts.resolve(row["district"])["district_place_id"]
+            if not district_id:
+                unknown.add(row["district"])
+                continue
+            key = place_key(row["tehsil"])
+            if key:
+                tehsils.setdefault((district_id, key), (row["tehsil"], row.get("tehsil_code", "")))
+        with transaction.atomic():
+            Place.objects.bulk_create(
+                [
+                    Place(kind=Place.TEHSIL, name=name, key=key, parent_id=district_id, code=code[:20])
+                    for (district_id, key), (name, code) in tehsils.items()
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+        tehsil_ids = {
+            (parent_id, key): place_id
+            for place_id, parent_id, key in Place.objects.filter(kind=Place.TEHSIL).values_list("id", "parent_id", "key")
+        }
+
+        # Pass 2: villages, in batches
+        villages, seen = [], set()
+        for row in self._rows(path):
+            district_id = districts.resolve(row["district"])["district_place_id"]
+            tehsil_id = tehsil_ids.get((district_id, place_key(row["tehsil"])))
+            key = place_key(row.get("village", ""))
+            if not tehsil_id or not key or (tehsil_id, key) in seen:
+                continue
+            seen.add((tehsil_id, key))
+            villages.append(Place(kind=Place.VILLAGE, name=row["village"], key=key, parent_id=tehsil_id, code=row.get("village_code", "")[:20]))
+            if len(villages) >= batch_size:
+                Place.objects.bulk_create(villages, ignore_conflicts=True)
+                villages = []
+        if villages:
+            Place.objects.bulk_create(villages, ignore_conflicts=True)
+
+        reset_index()
+        self.stdout.write(f"Loaded {len(tehsils)} tehsil(s) and {len(seen)} village(s) from {path}.")
+        if unknown:
+            self.stdout.write(f"Skipped rows for {len(unknown)} unknown district(s): {', '.join(sorted(unknown)[:20])}")
+        self.stdout.write("Run backfill_typed_fields to link records scraped before this load.")
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scraper_app.retention import prune_runs
+
+
+class Command(BaseCommand):
+    help = "Delete scrape runs older than the retention window, with their records and statuses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SCRAPER_RUN_RETENTION_DAYS,
+            help="Keep runs started within this many days (0 keeps everything).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.SCRAPER_PRUNE_CHUNK_SIZE,
+            help="Rows deleted per statement.",
+        )
+
+    def handle(self, *args, **options):
+        counts = prune_runs(days=options["days"], chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"Pruned {counts['runs']} run(s), {counts['records']} record(s) and {counts['statuses']} status(es)."
+        )
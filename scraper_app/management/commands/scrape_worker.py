@@ -0,0 +1,140 @@
+import multiprocessing
+import signal
+import time
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from scraper_app.browser_pool import get_pool
+from scraper_app.jobs import LEASE_SECONDS, claim_next_job, recover_orphaned_jobs, run_job, worker_name
+from scraper_app.retention import prune_runs
+
+
+def _prune(index: int) -> None:
+    """
+    Retention housekeeping; only the first worker runs it, between jobs.
+    """
+    if index != 0:
+        return
+    try:
+        counts = prune_runs()
+        if counts["runs"]:
+            print(f"Pruned {counts['runs']} old run(s) and {counts['records']} record(s).")
+    except Exception:
+        print("Exception occurred:")
+        traceback.print_exc()
+
+
+def _recover(index: int) -> None:
+    """
+    Re-queue jobs whose worker stopped sending heartbeats, on this host or any other;
+    only the first worker runs it, between jobs.
+    """
+    if index != 0:
+        return
+    try:
+        recovered = recover_orphaned_jobs()
+        if recovered:
+            print(f"Recovered {recovered} orphaned job(s).")
+    except Exception:
+        print("Exception occurred:")
+        traceback.print_exc()
+
+
+def _worker_loop(index: int, poll_interval: float, once: bool) -> None:
+    """
+    Child process body: claim and run jobs one at a time until told to stop.
+    A SIGTERM lets the current job finish before the process exits.
+    """
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    name = worker_name()
+    pool = get_pool()
+    # Stagger browser launches so a pool restart does not spike CPU
+    time.sleep(index * settings.SCRAPER_BROWSER_WARM_STAGGER_SECONDS)
+    pool.warm(settings.SCRAPER_BROWSER_POOL_WARM)
+    prune_interval = settings.SCRAPER_PRUNE_INTERVAL_MINUTES * 60
+    last_prune = None
+    last_recovery = time.monotonic()
+    while not stopping:
+        if last_prune is None or time.monotonic() - last_prune >= prune_interval:
+            _prune(index)
+            last_prune = time.monotonic()
+        if time.monotonic() - last_recovery >= LEASE_SECONDS:
+            _recover(index)
+            last_recovery = time.monotonic()
+        job = claim_next_job(name)
+        if job is None:
+            if once:
+                break
+            # Refill drivers recycled or discarded by the last job
+            pool.warm(settings.SCRAPER_BROWSER_POOL_WARM)
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+    pool.close()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run a pool of scrape worker processes that claim queued ScrapingJob rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.SCRAPER_WORKER_PROCESSES,
+            help="Number of worker processes (each runs one scrape at a time).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.SCRAPER_WORKER_POLL_SECONDS,
+            help="Seconds an idle worker waits before looking for new jobs.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of waiting for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        orphaned = recover_orphaned_jobs()
+        if orphaned:
+            self.stdout.write(f"Recovered {orphaned} orphaned job(s).")
+
+        # Children must open their own DB connections
+        connections.close_all()
+        # fork keeps the configured Django app registry in every child
+        context = multiprocessing.get_context("fork")
+        children = [
+            context.Process(
+                target=_worker_loop,
+                args=(i, options["poll_interval"], options["once"]),
+                name=f"scrape-worker-{i}",
+            )
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {processes} scrape worker(s).")
+
+        def _forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, _forward)
+        signal.signal(signal.SIGINT, _forward)
+        for child in children:
+            child.join()
+        self.stdout.write("Scrape workers stopped.")
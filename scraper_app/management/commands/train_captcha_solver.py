@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper_app.captcha_solver import SOLVER_CONFIDENCE, SOLVER_MODEL_PATH, train_template_model
+from scraper_app.models import CaptchaSample
+
+
+class Command(BaseCommand):
+    help = "Train the offline CAPTCHA solver from the CAPTCHAs the portal accepted (CaptchaSample)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=str(SOLVER_MODEL_PATH),
+            help="Where to write the model (default: SCRAPER_CAPTCHA_MODEL_PATH).",
+        )
+        parser.add_argument(
+            "--holdout",
+            type=float,
+            default=0.2,
+            help="Fraction of the newest samples kept out of training to measure accuracy.",
+        )
+
+    def handle(self, *args, **options):
+        samples = list(CaptchaSample.objects.order_by("id").values_list("image", "answer"))
+        if not samples:
+            raise CommandError("No CAPTCHA samples yet; they are recorded as runs log in and search.")
+        holdout = int(len(samples) * min(max(options["holdout"], 0.0), 0.9))
+        train, test = samples[:len(samples) - holdout], samples[len(samples) - holdout:]
+
+        model, used = train_template_model(train)
+        if model is None:
+            raise CommandError("None of the samples could be segmented into one glyph per character.")
+        self.stdout.write(f"Trained on {used} of {len(train)} sample(s): {len(model.labels)} glyph template(s).")
+
+        if test:
+            accepted = correct = 0
+            for image, answer in test:
+                reading = model.read(bytes(image))
+                if reading and reading[1] >= SOLVER_CONFIDENCE:
+                    accepted += 1
+                    correct += reading[0] == answer.strip()
+            self.stdout.write(
+                f"Holdout: {len(test)} sample(s), {accepted} read at confidence >= {SOLVER_CONFIDENCE}, "
+                f"{correct} of those correct."
+            )
+
+        # Train on everything for the model that is actually used
+        if test:
+            model, used = train_template_model(samples)
+        output = Path(options["output"])
+        model.save(output)
+        self.stdout.write(f"Model written to {output}.")
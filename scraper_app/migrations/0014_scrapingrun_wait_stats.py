@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0013_scrapingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='wait_stats',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
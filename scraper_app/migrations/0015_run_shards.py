@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0014_scrapingrun_wait_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='records', to='scraper_app.scrapingrun'),
+        ),
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='date_from',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='date_to',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='scraper_app.scrapingrun'),
+        ),
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='records_found',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
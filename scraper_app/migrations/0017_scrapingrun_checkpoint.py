@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0016_portalsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='checkpoint',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
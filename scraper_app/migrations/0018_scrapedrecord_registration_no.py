@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:04
+
+import hashlib
+import json
+import re
+
+from django.db import migrations, models
+
+SECTION_FIELDS = ("registration_details", "seller_details", "buyer_details", "property_details", "khasra_details")
+REGISTRATION_NO_HEADINGS = ("registrationno", "registrationnumber", "regno", "documentno", "documentnumber")
+
+
+def backfill_registration_no(apps, schema_editor):
+    # Same rules as scraper_app.ingest at the time of writing; later duplicates stay null
+    ScrapedRecord = apps.get_model("scraper_app", "ScrapedRecord")
+    seen = set()
+    for record in ScrapedRecord.objects.order_by("id").iterator():
+        fields = {field: getattr(record, field) or {} for field in SECTION_FIELDS}
+        record.content_hash = hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        for heading, value in fields["registration_details"].items():
+            if re.sub(r"[^a-z]", "", heading.lower()) in REGISTRATION_NO_HEADINGS:
+                number = re.sub(r"\s+", "", str(value or "")).upper()[:100] or None
+                if number and number not in seen:
+                    seen.add(number)
+                    record.registration_no = number
+                break
+        record.save(update_fields=["registration_no", "content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0017_scrapingrun_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='registration_no',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_registration_no, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0018_scrapedrecord_registration_no'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='consideration',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='deed_type',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='district',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='market_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='registration_date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='tehsil',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='village',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='scrapedrecord',
+            index=models.Index(fields=['district', 'registration_date'], name='scraper_app_distric_96189e_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0019_scrapedrecord_typed_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapingrun',
+            name='records_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
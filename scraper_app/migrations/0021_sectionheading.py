@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SECTION_FIELDS = ("registration_details", "seller_details", "buyer_details", "property_details", "khasra_details")
+
+
+def build_catalog(apps, schema_editor):
+    # One pass over existing records; only the heading pairs are held in memory
+    ScrapedRecord = apps.get_model("scraper_app", "ScrapedRecord")
+    SectionHeading = apps.get_model("scraper_app", "SectionHeading")
+    seen = set()
+    new = []
+    records = ScrapedRecord.objects.filter(run__isnull=False).order_by("id").only("run_id", *SECTION_FIELDS)
+    for record in records.iterator(chunk_size=2000):
+        for field in SECTION_FIELDS:
+            for heading in getattr(record, field) or {}:
+                key = (record.run_id, field, str(heading)[:255])
+                if key not in seen:
+                    seen.add(key)
+                    new.append(SectionHeading(run_id=record.run_id, section=field, heading=key[2]))
+    SectionHeading.objects.bulk_create(new, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0020_scrapingrun_records_changed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectionHeading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(max_length=32)),
+                ('heading', models.CharField(max_length=255)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='headings', to='scraper_app.scrapingrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'section', 'heading'), name='unique_run_section_heading')],
+            },
+        ),
+        migrations.RunPython(build_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0021_sectionheading'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scrapingstatus',
+            index=models.Index(fields=['run', 'created_at'], name='scraper_app_run_id_a2eea6_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0022_scrapingstatus_run_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaptchaAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('captcha_key', models.CharField(max_length=50, unique=True)),
+                ('value', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='captcha_answers', to='scraper_app.scrapingrun')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0023_captchaanswer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaptchaSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.BinaryField()),
+                ('content_type', models.CharField(default='image/png', max_length=50)),
+                ('answer', models.CharField(max_length=20)),
+                ('solved_by', models.CharField(choices=[('operator', 'Operator'), ('solver', 'Solver')], default='operator', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
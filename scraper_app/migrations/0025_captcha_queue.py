@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0024_captchasample'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapingjob',
+            name='priority',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='scrapingstatus',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
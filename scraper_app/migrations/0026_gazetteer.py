@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:25
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MP_DISTRICTS = (
+    "Agar Malwa", "Alirajpur", "Anuppur", "Ashoknagar", "Balaghat", "Barwani", "Betul",
+    "Bhind", "Bhopal", "Burhanpur", "Chhatarpur", "Chhindwara", "Damoh", "Datia", "Dewas",
+    "Dhar", "Dindori", "Guna", "Gwalior", "Harda", "Indore", "Jabalpur", "Jhabua", "Katni",
+    "Khandwa", "Khargone", "Maihar", "Mandla", "Mandsaur", "Mauganj", "Morena",
+    "Narmadapuram", "Narsinghpur", "Neemuch", "Niwari", "Pandhurna", "Panna", "Raisen",
+    "Rajgarh", "Ratlam", "Rewa", "Sagar", "Satna", "Sehore", "Seoni", "Shahdol",
+    "Shajapur", "Sheopur", "Shivpuri", "Sidhi", "Singrauli", "Tikamgarh", "Ujjain",
+    "Umaria", "Vidisha",
+)
+GENERIC_WORDS = {"district", "distt", "dist", "zila", "jila", "tehsil", "tahsil", "teh", "village", "gram", "gaon"}
+TRANSLITERATIONS = (("aa", "a"), ("ee", "i"), ("oo", "u"), ("w", "v"), ("ph", "f"), ("z", "j"), ("q", "k"))
+
+
+def place_key(name):
+    # Same as gazetteer.place_key() when this migration was written
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode().lower()
+    key = "".join(w for w in re.findall(r"[a-z]+", text) if w not in GENERIC_WORDS)
+    for variant, canonical in TRANSLITERATIONS:
+        key = key.replace(variant, canonical)
+    return key
+
+
+def seed_districts(apps, schema_editor):
+    Place = apps.get_model("scraper_app", "Place")
+    Place.objects.bulk_create([Place(kind="district", name=name, key=place_key(name)) for name in MP_DISTRICTS])
+
+
+def drop_districts(apps, schema_editor):
+    apps.get_model("scraper_app", "Place").objects.filter(kind="district", parent__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraper_app', '0025_captcha_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('district', 'District'), ('tehsil', 'Tehsil'), ('village', 'Village')], db_index=True, max_length=10)),
+                ('name', models.CharField(max_length=150)),
+                ('key', models.CharField(db_index=True, max_length=150)),
+                ('code', models.CharField(blank=True, default='', max_length=20)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='scraper_app.place')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='district_place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='district_records', to='scraper_app.place'),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='tehsil_place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tehsil_records', to='scraper_app.place'),
+        ),
+        migrations.AddField(
+            model_name='scrapedrecord',
+            name='village_place',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='village_records', to='scraper_app.place'),
+        ),
+        migrations.AddConstraint(
+            model_name='place',
+            constraint=models.UniqueConstraint(fields=('kind', 'parent', 'key'), name='unique_place_kind_parent_key'),
+        ),
+        migrations.RunPython(seed_districts, drop_districts),
+    ]
@@ -4,6 +4,24 @@ from django.utils import timezone
 class ScrapingRun(models.Model):
     started_at = models.DateTimeField(default=timezone.now)
     finished_at = models.DateTimeField(null=True, blank=True)
+    # Shard runs point at the run the operator started; their records are saved under it
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        related_name="shards",
+        null=True,
+        blank=True,
+    )
+    date_from = models.DateField(null=True, blank=True)
+    date_to = models.DateField(null=True, blank=True)
+    records_found = models.PositiveIntegerField(null=True, blank=True)
+    # Last time records were written to (or moved out of) this run; versions cached exports
+    records_changed_at = models.DateTimeField(null=True, blank=True)
+    # Resume point, saved after every record:
+    # {"params": {search params, no password}, "page": 0-based page, "record": last saved index on that page}
+    checkpoint = models.JSONField(null=True, blank=True)
+    # Per-step wait telemetry: {step: {count, total, avg, max, timeouts}} in seconds
+    wait_stats = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"Run {self.id} - {self.started_at.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -20,16 +38,180 @@ class ScrapingStatus(models.Model):
     message = models.CharField(max_length=255, default="No Message")
     created_at = models.DateTimeField(default=timezone.now)
     captcha_key = models.CharField(max_length=50, null=True, blank=True)
+    # Only older statuses have a file here; prompt images now live in the "captchas" cache
     captcha_image = models.ImageField(upload_to="captchas/", null=True, blank=True)  
+    # Set when an operator answers this CAPTCHA prompt; unanswered prompts make up the CAPTCHA queue
+    answered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Per-run status polling: since-cursors and the latest CAPTCHA prompt
+            models.Index(fields=["run", "created_at"]),
+        ]
     
 class ScrapedRecord(models.Model):
+    run = models.ForeignKey(
+        ScrapingRun,
+        on_delete=models.CASCADE,
+        related_name="records",
+        null=True,
+        blank=True,
+    )
+    # Portal registration number, the record's natural key; null when the portal gave none
+    registration_no = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    # sha256 of the five sections, to tell a changed re-scrape from an unchanged one
+    content_hash = models.CharField(max_length=64, blank=True, default="")
     # You can store each section as JSON to keep it flexible
     registration_details = models.JSONField(blank=True, null=True)
     seller_details = models.JSONField(blank=True, null=True)
     buyer_details = models.JSONField(blank=True, null=True)
     property_details = models.JSONField(blank=True, null=True)
     khasra_details = models.JSONField(blank=True, null=True)
+    # Typed copies of key values, filled at ingest by normalize.typed_fields
+    registration_date = models.DateField(null=True, blank=True, db_index=True)
+    market_value = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True)
+    consideration = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True, db_index=True)
+    deed_type = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    district = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    tehsil = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    village = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    # The same three resolved against the gazetteer (see gazetteer.py); None when unmatched
+    district_place = models.ForeignKey("Place", on_delete=models.SET_NULL, null=True, blank=True, related_name="district_records")
+    tehsil_place = models.ForeignKey("Place", on_delete=models.SET_NULL, null=True, blank=True, related_name="tehsil_records")
+    village_place = models.ForeignKey("Place", on_delete=models.SET_NULL, null=True, blank=True, related_name="village_records")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["district", "registration_date"]),
+        ]
+
     def __str__(self):
         return f"Record {self.id} - {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+class ScrapingJob(models.Model):
+    """
+    Queued unit of work for the scrape worker pool, one per ScrapingRun.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATE_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    run = models.OneToOneField(ScrapingRun, on_delete=models.CASCADE, related_name="job")
+    params = models.JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=QUEUED, db_index=True)
+    # Higher runs first: claimed earlier by workers and listed first in the CAPTCHA queue
+    priority = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; a stale one means the worker is gone
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.id} ({self.state}) for run {self.run_id}"
+
+
+class PortalSession(models.Model):
+    """
+    Encrypted portal cookies + web storage from the last successful login, per username.
+    """
+    username = models.CharField(max_length=150, unique=True)
+    payload = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Session for {self.username} ({self.updated_at:%Y-%m-%d %H:%M})"
+
+
+class SectionHeading(models.Model):
+    """
+    Catalog of the headings seen per section of a run's records, in first-seen (id) order.
+    Kept up to date at ingest so exports know every column without scanning the records.
+    """
+    run = models.ForeignKey(ScrapingRun, on_delete=models.CASCADE, related_name="headings")
+    section = models.CharField(max_length=32)
+    heading = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["run", "section", "heading"], name="unique_run_section_heading"),
+        ]
+
+    def __str__(self):
+        return f"{self.section}: {self.heading} (run {self.run_id})"
+
+
+class CaptchaAnswer(models.Model):
+    """
+    Operator answer waiting to be picked up by the scraper; used by the "db" CAPTCHA channel.
+    """
+    captcha_key = models.CharField(max_length=50, unique=True)
+    run = models.ForeignKey(ScrapingRun, on_delete=models.CASCADE, related_name="captcha_answers", null=True, blank=True)
+    value = models.CharField(max_length=100)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Answer for {self.captcha_key} (run {self.run_id})"
+
+
+class CaptchaSample(models.Model):
+    """
+    A CAPTCHA image with the answer the portal accepted; training data for the offline solver.
+    """
+    OPERATOR = "operator"
+    SOLVER = "solver"
+    SOLVED_BY_CHOICES = [
+        (OPERATOR, "Operator"),
+        (SOLVER, "Solver"),
+    ]
+
+    image = models.BinaryField()
+    content_type = models.CharField(max_length=50, default="image/png")
+    answer = models.CharField(max_length=20)
+    solved_by = models.CharField(max_length=10, choices=SOLVED_BY_CHOICES, default=OPERATOR)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"CAPTCHA sample {self.id} ({self.answer}, {self.solved_by})"
+
+
+class Place(models.Model):
+    """
+    Gazetteer entry: a Madhya Pradesh district, tehsil (parent: district) or village
+    (parent: tehsil) under its canonical name.
+    """
+    DISTRICT = "district"
+    TEHSIL = "tehsil"
+    VILLAGE = "village"
+    KIND_CHOICES = [
+        (DISTRICT, "District"),
+        (TEHSIL, "Tehsil"),
+        (VILLAGE, "Village"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, db_index=True)
+    name = models.CharField(max_length=150)
+    # gazetteer.place_key(name): what scraped spellings are matched against
+    key = models.CharField(max_length=150, db_index=True)
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="children")
+    code = models.CharField(max_length=20, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "parent", "key"], name="unique_place_kind_parent_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.kind})"
@@ -0,0 +1,106 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from .gazetteer import resolve_places
+
+# ScrapedRecord columns filled by typed_fields()
+NORMALIZED_FIELDS = (
+    "registration_date",
+    "market_value",
+    "consideration",
+    "deed_type",
+    "district",
+    "tehsil",
+    "village",
+    "district_place_id",
+    "tehsil_place_id",
+    "village_place_id",
+)
+
+# Headings (lowercased, letters only) each typed value is read from; a heading
+# matches when it starts with one of these, so "Market Value (Rs.)" counts
+HEADING_ALIASES = {
+    "registration_date": ("registrationdate", "dateofregistration", "regdate", "registereddate"),
+    "market_value": ("marketvalue", "guidelinevalue"),
+    "consideration": ("consideration",),
+    "deed_type": ("deedtype", "instrumenttype", "deedcategory"),
+}
+
+# Keys parse_address() adds to Property Details
+ADDRESS_KEYS = {
+    "district": "District",
+    "tehsil": "Tehsil/Locality",
+    "village": "Village",
+}
+
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%b-%Y", "%d %b %Y", "%d.%m.%Y")
+AMOUNT_MAX = Decimal("1e14")
+
+
+def _heading_key(heading: str) -> str:
+    return re.sub(r"[^a-z]", "", str(heading).lower())
+
+
+def parse_date(value) -> date | None:
+    """
+    A portal date ("05-01-2024", "05/01/2024 11:30 AM", "2024-01-05"), or None.
+    """
+    text = str(value or "").strip()
+    if not text:
+        return None
+    for candidate in (text, text.split()[0]):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                continue
+    return None
+
+
+def parse_amount(value) -> Decimal | None:
+    """
+    A rupee amount ("₹ 12,50,000/-", "Rs. 1250000.00") as a Decimal, or None.
+    """
+    match = re.search(r"\d+(?:\.\d+)?", str(value or "").replace(",", ""))
+    if not match:
+        return None
+    try:
+        amount = Decimal(match.group(0)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None
+    return amount if amount < AMOUNT_MAX else None
+
+
+def _clean_text(value, max_length: int = 100) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip()[:max_length]
+
+
+def _find(sections: list[dict], aliases: tuple[str, ...]):
+    for section in sections:
+        for heading, value in section.items():
+            key = _heading_key(heading)
+            if value not in (None, "") and any(key.startswith(alias) for alias in aliases):
+                return value
+    return None
+
+
+def typed_fields(fields: dict) -> dict:
+    """
+    NORMALIZED_FIELDS values for one record, from its five JSON sections as stored
+    (Property Details already split by parse_address).
+    """
+    registration = fields.get("registration_details") or {}
+    prop = fields.get("property_details") or {}
+    # Registration Details first, then the rest in page order
+    sections = [registration, prop, fields.get("khasra_details") or {}]
+    typed = {
+        "registration_date": parse_date(_find(sections, HEADING_ALIASES["registration_date"])),
+        "market_value": parse_amount(_find(sections, HEADING_ALIASES["market_value"])),
+        "consideration": parse_amount(_find(sections, HEADING_ALIASES["consideration"])),
+        "deed_type": _clean_text(_find(sections, HEADING_ALIASES["deed_type"])),
+    }
+    for field, key in ADDRESS_KEYS.items():
+        typed[field] = _clean_text(prop.get(key))
+    typed.update(resolve_places(typed["district"], typed["tehsil"], typed["village"]))
+    return typed
@@ -0,0 +1,199 @@
+import math
+import re
+
+from django.conf import settings
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from .waits import WaitPolicy, rows_changed, rows_signature
+
+# Rows per results page to ask for: the largest size the paginator offers up to this (0 = the largest)
+PAGE_SIZE = int(getattr(settings, "SCRAPER_PAGE_SIZE", 0))
+
+RANGE_LABEL_CSS = ".mat-paginator-range-label"
+PAGE_SIZE_SELECT_CSS = ".mat-paginator-page-size mat-select"
+PAGE_SIZE_VALUE_CSS = ".mat-paginator-page-size .mat-select-value"
+PAGE_SIZE_OPTION_CSS = ".mat-select-panel mat-option"
+NAVIGATION_CSS = {
+    "first": "button.mat-paginator-navigation-first",
+    "previous": "button.mat-paginator-navigation-previous",
+    "next": "button.mat-paginator-navigation-next",
+    "last": "button.mat-paginator-navigation-last",
+}
+
+# Sets the MatPaginator's page index directly when the app exposes Angular's debug API
+# (window.ng); returns false in production builds, where the buttons are used instead
+JUMP_TO_PAGE_JS = """
+var el = document.querySelector('mat-paginator');
+if (!el || !window.ng || !window.ng.getComponent) { return false; }
+var paginator = window.ng.getComponent(el);
+if (!paginator || !paginator.page) { return false; }
+var previous = paginator.pageIndex;
+paginator.pageIndex = arguments[0];
+paginator.page.emit({pageIndex: arguments[0], previousPageIndex: previous, pageSize: paginator.pageSize, length: paginator.length});
+if (window.ng.applyChanges) { window.ng.applyChanges(el); }
+return true;
+"""
+
+
+class PageOutOfRange(IndexError):
+    """
+    Raised by ResultsPaginator.goto() for a page past the end of the results.
+    """
+
+
+def rebase(page: int, record: int, old_size: int | None, new_size: int | None) -> tuple[int, int]:
+    """
+    The same position, a (page, last record done there) pair, at another page size, so
+    a checkpoint taken with one size resumes correctly at another.
+    """
+    if not old_size or not new_size or old_size == new_size:
+        return page, record
+    done = page * old_size + record + 1
+    return done // new_size, done % new_size - 1
+
+
+class ResultsPaginator:
+    """
+    The mat-paginator under the search results: page size, result count and moving
+    between pages. Every move waits for the rows to change instead of a fixed sleep.
+    """
+
+    def __init__(self, driver, waits: WaitPolicy):
+        self.driver = driver
+        self.waits = waits
+        self.page_size = None
+
+    def _range(self) -> tuple[int, int, int] | None:
+        # "51 – 100 of 253" -> (51, 100, 253); "0 of 0" -> (0, 0, 0)
+        labels = self.driver.find_elements(By.CSS_SELECTOR, RANGE_LABEL_CSS)
+        if not labels:
+            return None
+        text = labels[0].text
+        match = re.search(r"(\d+)\s*\D\s*(\d+)\s+of\s+(\d+)", text)
+        if match:
+            return tuple(int(n) for n in match.groups())
+        match = re.search(r"of\s+(\d+)", text)
+        return (0, 0, int(match.group(1))) if match else None
+
+    def total(self) -> int | None:
+        """
+        Total number of search results, read from the paginator label ("1 – 10 of 253").
+        """
+        shown = self._range()
+        return shown[2] if shown else None
+
+    def selected_size(self) -> int | None:
+        """
+        The page size the paginator is set to, or None without a paginator.
+        """
+        values = self.driver.find_elements(By.CSS_SELECTOR, PAGE_SIZE_VALUE_CSS)
+        if values and values[0].text.strip().isdigit():
+            return int(values[0].text.strip())
+        shown = self._range()
+        if shown and shown[0]:
+            return shown[1] - shown[0] + 1
+        return None
+
+    def page_count(self) -> int | None:
+        total = self.total()
+        if total is None or not self.page_size:
+            return None
+        return max(1, math.ceil(total / self.page_size))
+
+    def current_page(self) -> int:
+        shown = self._range()
+        if not shown or not shown[0] or not self.page_size:
+            return 0
+        return (shown[0] - 1) // self.page_size
+
+    def _button(self, name: str):
+        # The navigation button, or None when it is not rendered or disabled
+        buttons = self.driver.find_elements(By.CSS_SELECTOR, NAVIGATION_CSS[name])
+        if not buttons or buttons[0].get_attribute("disabled") or "disabled" in (buttons[0].get_attribute("class") or ""):
+            return None
+        return buttons[0]
+
+    def _click(self, element) -> None:
+        before = rows_signature(self.driver)
+        self.driver.execute_script("arguments[0].click();", element)
+        self.waits.until("pagination", rows_changed(before))
+
+    def maximize_page_size(self, limit: int = PAGE_SIZE) -> int | None:
+        """
+        Switch to the largest page size the paginator offers (at most `limit` when set)
+        and return the page size in effect. Call it on the first page.
+        """
+        self.page_size = self.selected_size()
+        selects = self.driver.find_elements(By.CSS_SELECTOR, PAGE_SIZE_SELECT_CSS)
+        if not selects:
+            return self.page_size
+        self.driver.execute_script("arguments[0].click();", selects[0])
+        sizes = []
+        for option in self.waits.elements("pagination", PAGE_SIZE_OPTION_CSS):
+            text = option.text.strip()
+            if text.isdigit():
+                sizes.append((int(text), option))
+        # Within the limit, or the smallest offered when every size exceeds it
+        allowed = [(size, option) for size, option in sizes if not limit or size <= limit] or sorted(sizes, key=lambda item: item[0])[:1]
+        size, option = max(allowed, key=lambda item: item[0]) if allowed else (None, None)
+        total = self.total()
+        # Nothing would change on screen (and rows_changed would never fire) when the
+        # size is already set or every result already fits on this page
+        if option is None or size == self.page_size or (total is not None and self.page_size and total <= self.page_size):
+            self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+            return self.page_size
+        self._click(option)
+        self.page_size = size
+        return size
+
+    def next(self) -> bool:
+        """
+        Move to the next page; False when this is the last one.
+        """
+        button = self._button("next")
+        if button is None:
+            return False
+        self._click(button)
+        return True
+
+    def _step_to(self, page: int) -> None:
+        current = self.current_page()
+        while current != page:
+            button = self._button("next" if page > current else "previous")
+            if button is None:
+                raise PageOutOfRange(f"Results have fewer than {page + 1} pages.")
+            self._click(button)
+            current = self.current_page()
+
+    def goto(self, page: int) -> None:
+        """
+        Show the 0-based `page`: directly through the paginator when Angular's debug API
+        is available, otherwise from whichever of the first page, the current page and
+        the last page needs the fewest clicks. Raises PageOutOfRange past the end.
+        """
+        count = self.page_count()
+        if count is not None and page >= count:
+            raise PageOutOfRange(f"Results have {count} page(s); page {page + 1} does not exist.")
+        current = self.current_page()
+        if page == current:
+            return
+        before = rows_signature(self.driver)
+        if self.driver.execute_script(JUMP_TO_PAGE_JS, page):
+            try:
+                self.waits.until("pagination", rows_changed(before))
+            except TimeoutException:
+                pass
+            current = self.current_page()
+            if current == page:
+                return
+        routes = [(abs(page - current), None)]
+        if self._button("first") is not None:
+            routes.append((1 + page, "first"))
+        if count is not None and self._button("last") is not None:
+            routes.append((1 + count - 1 - page, "last"))
+        _clicks, start = min(routes, key=lambda route: route[0])
+        if start:
+            self._click(self._button(start))
+        self._step_to(page)
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+import traceback
+from datetime import timedelta
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.utils import timezone
+from selenium.common.exceptions import TimeoutException
+
+from .models import PortalSession
+
+SESSION_MAX_AGE_HOURS = int(getattr(settings, "SCRAPER_SESSION_MAX_AGE_HOURS", 12))
+
+STORAGE_DUMP_JS = """
+function dump(store) {
+    var out = {};
+    for (var i = 0; i < store.length; i++) { var k = store.key(i); out[k] = store.getItem(k); }
+    return out;
+}
+return {local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+STORAGE_LOAD_JS = """
+var data = arguments[0];
+Object.keys(data.local || {}).forEach(function (k) { window.localStorage.setItem(k, data.local[k]); });
+Object.keys(data.session || {}).forEach(function (k) { window.sessionStorage.setItem(k, data.session[k]); });
+"""
+
+# Cookie keys Selenium's add_cookie accepts
+COOKIE_FIELDS = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")
+
+
+def _fernet() -> Fernet:
+    secret = getattr(settings, "SCRAPER_SESSION_KEY", "") or settings.SECRET_KEY
+    key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest())
+    return Fernet(key)
+
+
+def encrypt_secret(value: str) -> str:
+    return _fernet().encrypt(value.encode()).decode()
+
+
+def decrypt_secret(token: str) -> str:
+    """
+    The plaintext of an encrypt_secret() token; "" when it cannot be decrypted
+    (for example after SCRAPER_SESSION_KEY changed).
+    """
+    try:
+        return _fernet().decrypt(token.encode()).decode()
+    except (InvalidToken, ValueError):
+        return ""
+
+
+def capture(driver) -> dict:
+    storage = driver.execute_script(STORAGE_DUMP_JS) or {}
+    return {
+        "url": driver.current_url,
+        "cookies": driver.get_cookies(),
+        "local": storage.get("local") or {},
+        "session": storage.get("session") or {},
+    }
+
+
+def save_session(username: str, driver) -> None:
+    """
+    Store the logged-in cookies and web storage for `username`, encrypted.
+    """
+    try:
+        payload = _fernet().encrypt(json.dumps(capture(driver)).encode())
+        PortalSession.objects.update_or_create(username=username, defaults={"payload": payload.decode()})
+    except Exception:
+        print("Exception occurred:")
+        traceback.print_exc()
+
+
+def load_session(username: str) -> dict | None:
+    cutoff = timezone.now() - timedelta(hours=SESSION_MAX_AGE_HOURS)
+    stored = PortalSession.objects.filter(username=username, updated_at__gte=cutoff).first()
+    if stored is None:
+        return None
+    try:
+        return json.loads(_fernet().decrypt(stored.payload.encode()))
+    except (InvalidToken, ValueError):
+        forget_session(username)
+        return None
+
+
+def forget_session(username: str) -> None:
+    PortalSession.objects.filter(username=username).delete()
+
+
+def restore_session(driver, username: str, portal_url: str, waits) -> bool:
+    """
+    Replay a saved session into `driver` and check the portal accepts it.
+    Returns False (and drops the stale session) when a fresh login is needed.
+    """
+    data = load_session(username)
+    if not data:
+        return False
+    try:
+        # Cookies and storage can only be set for the origin currently loaded
+        if not driver.current_url.startswith(portal_url):
+            driver.get(portal_url)
+        for cookie in data.get("cookies", []):
+            driver.add_cookie({k: v for k, v in cookie.items() if k in COOKIE_FIELDS})
+        driver.execute_script(STORAGE_LOAD_JS, data)
+        driver.get(data.get("url") or portal_url)
+        waits.elements("session_check", "h5.my-0")
+        return True
+    except TimeoutException:
+        pass
+    except Exception:
+        print("Exception occurred:")
+        traceback.print_exc()
+
+    forget_session(username)
+    driver.delete_all_cookies()
+    driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    driver.get(portal_url)
+    return False
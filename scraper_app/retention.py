@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import drop_cached_exports
+from .models import ScrapedRecord, ScrapingJob, ScrapingRun, ScrapingStatus
+
+# 0 keeps everything; pruning deletes records, so it only runs when this is set
+RETENTION_DAYS = int(getattr(settings, "SCRAPER_RUN_RETENTION_DAYS", 0))
+PRUNE_CHUNK_SIZE = int(getattr(settings, "SCRAPER_PRUNE_CHUNK_SIZE", 1000))
+
+
+def _delete_in_chunks(queryset, chunk_size: int, before_delete=None) -> int:
+    """
+    Delete the rows of `queryset` at most chunk_size at a time, each chunk in its own
+    autocommit statement so a large prune never holds the write lock for long.
+    """
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        chunk = queryset.model.objects.filter(id__in=ids)
+        if before_delete:
+            before_delete(chunk)
+        chunk.delete()
+        deleted += len(ids)
+
+
+def _delete_captcha_files(statuses) -> None:
+    for name in statuses.exclude(Q(captcha_image="") | Q(captcha_image__isnull=True)).values_list("captcha_image", flat=True):
+        default_storage.delete(name)
+
+
+def prunable_runs(days: int):
+    """
+    Top-level runs started more than `days` days ago whose job is not queued or running.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    return (
+        ScrapingRun.objects.filter(parent__isnull=True, started_at__lt=cutoff)
+        .exclude(job__state__in=[ScrapingJob.QUEUED, ScrapingJob.RUNNING])
+        .order_by("started_at")
+    )
+
+
+def prune_runs(days: int | None = None, chunk_size: int | None = None) -> dict:
+    """
+    Delete runs older than the retention window with their shards, statuses, CAPTCHA
+    images and records. A record belongs to the newest run that saw it (RecordWriter
+    moves skipped and unchanged ones), so only records no later run found are removed.
+    Returns counts of what was removed. days=0 (the default setting) keeps everything.
+    """
+    days = RETENTION_DAYS if days is None else days
+    chunk_size = max(1, chunk_size or PRUNE_CHUNK_SIZE)
+    counts = {"runs": 0, "records": 0, "statuses": 0}
+    if days <= 0:
+        return counts
+    for run_id in list(prunable_runs(days).values_list("id", flat=True)):
+        counts["records"] += _delete_in_chunks(ScrapedRecord.objects.filter(run_id=run_id), chunk_size)
+        counts["statuses"] += _delete_in_chunks(
+            ScrapingStatus.objects.filter(Q(run_id=run_id) | Q(run__parent_id=run_id)),
+            chunk_size,
+            before_delete=_delete_captcha_files,
+        )
+        # What is left is small: the run, its shards and its job
+        ScrapingRun.objects.filter(id=run_id).delete()
+        drop_cached_exports(run_id)
+        counts["runs"] += 1
+    return counts
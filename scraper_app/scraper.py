@@ -0,0 +1,568 @@
+import os
+import re
+import uuid
+from datetime import date, datetime
+import traceback
+
+from django.conf import settings
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select
+from .address import parse_address
+from .browser_pool import get_pool
+from .captcha_channel import get_channel
+from .captcha_solver import SOLVER_CONFIDENCE, get_solver, record_sample
+from .captcha_store import image_from_data_uri, store_image
+from .capture import NetworkCapture, enable_performance_log
+from .ingest import IngestError, RecordWriter, known_registration_numbers, normalize_registration_no
+from .models import CaptchaSample, ScrapingRun, ScrapingStatus
+from .paginator import PageOutOfRange, ResultsPaginator, rebase
+from .portal_session import restore_session, save_session
+from .status_feed import mark_status
+from .waits import WaitPolicy, element_absent, fieldsets_ready
+
+
+# Configurable constants
+CAPTCHA_WAIT_SECONDS = int(getattr(settings, "CAPTCHA_WAIT_SECONDS", 180))
+# Login attempts that try the offline solver before every CAPTCHA goes to the operator
+SOLVER_ATTEMPTS = int(getattr(settings, "SCRAPER_CAPTCHA_SOLVER_ATTEMPTS", 3))
+PORTAL_URL = getattr(settings, "SCRAPER_PORTAL_URL", "https://sampada.mpigr.gov.in/#/clogin")
+BROWSER_LEASE_TIMEOUT = int(getattr(settings, "SCRAPER_BROWSER_LEASE_TIMEOUT", 600))
+# "dom" reads each record modal, "network" reads the portal's JSON responses
+EXTRACTION_MODE = getattr(settings, "SCRAPER_EXTRACTION_MODE", "dom")
+SKIP_KNOWN_RECORDS = getattr(settings, "SCRAPER_SKIP_KNOWN_RECORDS", True)
+
+RECORD_LINK_CSS = "td.mat-cell>span.link"
+# Messages the portal pops up when it rejects a search (wrong CAPTCHA, bad filters)
+SEARCH_ERROR_CSS = ".mat-snack-bar-container, .swal2-popup, .alert-danger, .toast-error"
+RECORD_LINK_TEXTS_JS = "return Array.prototype.map.call(document.querySelectorAll(arguments[0]), function (el) { return el.innerText; });"
+# Search parameters kept in ScrapingRun.checkpoint; never the password
+CHECKPOINT_PARAMS = ("username", "district", "deed_type", "date_from", "date_to", "shard_days")
+
+# Legends of the fieldsets in the record detail modal, in ScrapedRecord field order
+SECTION_LEGENDS = (
+    "Registration Details",
+    "Party From",
+    "Party To",
+    "Property Details",
+    "Khasra/Building/Plot Details",
+)
+
+# For each legend, the th/td texts of every matching fieldset's table, same as
+# //fieldset[legend[contains(text(), L)]]/div/table/(thead|tbody)/tr/(th|td)
+MODAL_SECTIONS_JS = """
+function ownText(el) {
+    var text = '';
+    for (var i = 0; i < el.childNodes.length; i++) {
+        if (el.childNodes[i].nodeType === Node.TEXT_NODE) { text += el.childNodes[i].nodeValue; }
+    }
+    return text;
+}
+function cells(fieldset, part, tag) {
+    var out = [];
+    fieldset.querySelectorAll(':scope > div > table > ' + part + ' > tr > ' + tag).forEach(function (cell) {
+        out.push(cell.innerText);
+    });
+    return out;
+}
+var fieldsets = Array.prototype.slice.call(document.querySelectorAll('fieldset'));
+return arguments[0].map(function (legend) {
+    var section = {headings: [], cells: []};
+    fieldsets.forEach(function (fs) {
+        var matched = Array.prototype.some.call(fs.children, function (child) {
+            return child.tagName === 'LEGEND' && ownText(child).indexOf(legend) !== -1;
+        });
+        if (matched) {
+            section.headings = section.headings.concat(cells(fs, 'thead', 'th'));
+            section.cells = section.cells.concat(cells(fs, 'tbody', 'td'));
+        }
+    });
+    return section;
+});
+"""
+
+
+class ScrapeError(Exception):
+    """
+    Raised when the scrape flow cannot continue; the message is shown to the operator.
+    """
+
+
+def _create_status(run: ScrapingRun, message: str, image: tuple[bytes, str] | None = None, captcha_key: str | None = None) -> ScrapingStatus:
+    """
+    Create a ScrapingStatus row. A CAPTCHA prompt passes its captcha_key, which ties
+    the UI input to the right wait, and its (bytes, content type) image, which goes
+    to the CAPTCHA image store rather than to media.
+    """
+    if image is not None and captcha_key:
+        # Stored before the row, so status streams never see a CAPTCHA status without its image
+        store_image(captcha_key, *image)
+    status = ScrapingStatus.objects.create(run=run, message=message, captcha_key=captcha_key)
+    mark_status(status)
+    return status
+
+
+def _driver_from_config():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.binary_location = os.environ.get("CHROME_BIN")
+    if EXTRACTION_MODE == "network":
+        enable_performance_log(chrome_options)
+    service = Service(os.environ.get("CHROMEDRIVER_PATH"))
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def _captcha_image(element) -> tuple[bytes, str]:
+    """
+    (bytes, content type) of a CAPTCHA <img>: decoded from its src when that is a
+    data: URI, otherwise a screenshot of just the element.
+    """
+    image = image_from_data_uri(element.get_attribute("src"))
+    if image is not None:
+        return image
+    return element.screenshot_as_png, "image/png"
+
+
+def _wait_for_captcha_value(run_id: int, captcha_key: str, timeout: int = CAPTCHA_WAIT_SECONDS) -> str | None:
+    """
+    Block until the operator's answer for this CAPTCHA arrives on the CAPTCHA channel
+    (see captcha_channel.py), or return None after `timeout` seconds.
+    """
+    return get_channel().wait(run_id, captcha_key, timeout)
+
+
+def _answer_captcha(run: ScrapingRun, number: int, image: tuple[bytes, str], use_solver: bool = True) -> tuple[str | None, str]:
+    """
+    Answer for CAPTCHA #number: the offline solver's reading when it is confident
+    enough, otherwise the operator's, prompted in the UI. Returns (answer, or None
+    when the operator did not answer in time; CaptchaSample.SOLVER or OPERATOR).
+    """
+    if use_solver:
+        reading = get_solver().solve(image[0])
+        if reading and reading[1] >= SOLVER_CONFIDENCE:
+            _create_status(run, f"CAPTCHA #{number} read automatically (confidence {reading[1]:.2f}).")
+            return reading[0], CaptchaSample.SOLVER
+    captcha_key = f"c{number}-{uuid.uuid4().hex[:8]}"
+    _create_status(run, f"Please solve CAPTCHA #{number} in the UI", image=image, captcha_key=captcha_key)
+    return _wait_for_captcha_value(run.id, captcha_key, timeout=CAPTCHA_WAIT_SECONDS), CaptchaSample.OPERATOR
+
+
+def _save_wait_stats(run: ScrapingRun, waits: WaitPolicy) -> None:
+    ScrapingRun.objects.filter(id=run.id).update(wait_stats=waits.telemetry.as_dict())
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _login(driver: webdriver.Chrome, run: ScrapingRun, waits: WaitPolicy, username: str, password: str) -> None:
+    """
+    Switch the portal to English and log in, asking the operator for CAPTCHA #1.
+    A saved session for the username is tried first and skips the form entirely.
+    """
+    if restore_session(driver, username, PORTAL_URL, waits):
+        _create_status(run, "Reused saved portal session; skipped login.")
+        return
+
+    # Pooled drivers are already parked on the login page; only navigate if not
+    if not driver.current_url.startswith(PORTAL_URL):
+        driver.get(PORTAL_URL)
+    english_to = waits.elements("page_load", "div.ng-star-inserted>a", count=3)
+    english_to[2].click()
+    _create_status(run, "CLICKED ON ENGLISH")
+    # Login loop with CAPTCHA #1
+    max_attempts = 10
+    _create_status(run, "Filling Username And Password To login")
+    for attempt in range(max_attempts):
+        try:
+            driver.refresh()
+            username_input = waits.elements("page_load", "input#username")[0]
+            username_input.send_keys(username)
+
+            password_input = driver.find_element(By.CSS_SELECTOR, "input#password")
+            password_input.send_keys(password)
+
+            # CAPTCHA image
+            elem = waits.until("page_load", EC.visibility_of_element_located((By.CSS_SELECTOR, "div.input-group>img")))
+
+            # Capture it; the solver reads it or the user solves it
+            captcha_img_1 = _captcha_image(elem)
+            captcha_value, solved_by = _answer_captcha(run, 1, captcha_img_1, use_solver=attempt < SOLVER_ATTEMPTS)
+            if not captcha_value:
+                _create_status(run, "CAPTCHA #1 timed out waiting for input. Retrying...")
+                continue
+
+            captcha_inputs = driver.find_elements(By.CSS_SELECTOR, "div.input-group>input")
+            if len(captcha_inputs) < 3:
+                raise RuntimeError("CAPTCHA input box not found for login form.")
+
+            captcha_inputs[2].click()
+            captcha_inputs[2].send_keys(captcha_value)
+
+            # Click login and wait for navigation
+            login_button = driver.find_elements(By.CSS_SELECTOR, "button.mat-focus-indicator")
+            before_url = driver.current_url
+            if len(login_button) >= 2:
+                driver.execute_script("arguments[0].click();", login_button[1])
+            else:
+                raise RuntimeError("Login button not found.")
+
+            waits.until("login", EC.url_changes(before_url))
+            waits.settle()
+            after_url = driver.current_url
+            if after_url != before_url:
+                _create_status(run, "Captcha #1 solved successfully; logged in.")
+                record_sample(captcha_img_1, captcha_value, solved_by)
+                save_session(username, driver)
+                return
+        except Exception as e:
+            print("Exception occurred:")
+            traceback.print_exc()
+            continue
+
+    _create_status(run, "Login CAPTCHA solving failed after multiple attempts. Try again.")
+    raise ScrapeError("Login CAPTCHA solving failed after multiple attempts.")
+
+
+def _search_outcome(seen_errors: set):
+    """
+    Wait condition for a submitted search: ("results", "") once result rows render,
+    ("empty", "") for a results paginator showing 0 of 0, ("rejected", message) for a
+    portal error that was not already on screen (ids in seen_errors) before submitting.
+    """
+    def _condition(driver):
+        if driver.find_elements(By.CSS_SELECTOR, RECORD_LINK_CSS):
+            return "results", ""
+        for error in driver.find_elements(By.CSS_SELECTOR, SEARCH_ERROR_CSS):
+            if error.id not in seen_errors and error.is_displayed() and error.text.strip():
+                return "rejected", error.text.strip()
+        labels = driver.find_elements(By.CSS_SELECTOR, ".mat-paginator-range-label")
+        if labels and re.search(r"\bof\s+0\b", labels[0].text):
+            return "empty", ""
+        return False
+    return _condition
+
+
+def _submit_search(driver: webdriver.Chrome, run: ScrapingRun, waits: WaitPolicy, params: dict, date_from: date, date_to: date) -> None:
+    """
+    Open the certified-copy search, fill the filters for date_from..date_to and submit it
+    with CAPTCHA #2. A rejected search is retried with a fresh reading; once the solver's
+    reading has been rejected, the operator answers the rest.
+    """
+    district = params.get("district") or ""
+    deed_type = params.get("deed_type") or ""
+    date_from_fmt = date_from.strftime("%d-%m-%Y")
+    date_to_fmt = date_to.strftime("%d-%m-%Y")
+
+    # Navigate to search
+    search_certified = waits.elements("page_load", "li.ng-star-inserted>a", count=3)
+    driver.execute_script("arguments[0].click();", search_certified[2])
+    waits.settle()
+
+    driver.refresh()
+    try:
+        other_details = waits.elements("form_load", "div.apex-item-option", count=3)
+    except TimeoutException:
+        raise ScrapeError("Scraping failed: Other details elements not found.")
+    other_details[2].click()
+
+    period_from = waits.elements("form_load", "input#P2000_FROM_DATE")[0]
+    period_from.click()
+    period_from.send_keys(date_from_fmt)
+    period_to= driver.find_element(By.CSS_SELECTOR,"input#P2000_TO_DATE")
+    period_to.send_keys(date_to_fmt)
+    element = waits.elements("form_field", "select#P2000_DISTRICT")[0]
+    select_districts = Select(element)
+    # Wait until options are actually populated (more than 1 option means loaded)
+    waits.until("form_field", lambda d: len(select_districts.options) > 1)
+    select_districts.select_by_visible_text(district)
+    waits.settle("form_field")
+
+    input_box = waits.until("form_field", EC.element_to_be_clickable((By.XPATH, "//input[@aria-autocomplete='list']")))
+    input_box.send_keys(deed_type)
+    waits.settle("form_field")
+    input_box.send_keys(Keys.ENTER)
+
+    # Search loop with CAPTCHA #2
+    max_attempts = 5
+    use_solver = True
+    for attempt in range(max_attempts):
+        captcha_imgs = waits.elements("form_field", "div.input-group>img", count=2)
+        captcha_img_2 = _captcha_image(captcha_imgs[1])
+        captcha_value_2, solved_by = _answer_captcha(run, 2, captcha_img_2, use_solver=use_solver and attempt < SOLVER_ATTEMPTS)
+        if not captcha_value_2:
+            _create_status(run, "CAPTCHA #2 timed out waiting for input. Retrying...")
+            continue
+        captcha_inputs = driver.find_elements(By.CSS_SELECTOR, "div.input-group>input")
+        if len(captcha_inputs) < 2:
+            raise RuntimeError("CAPTCHA #2 input not found.")
+        captcha_inputs[1].click()
+        captcha_inputs[1].clear()
+        captcha_inputs[1].send_keys(captcha_value_2)
+        _create_status(run, "captcha has been filld",)
+        # Errors still on screen from an earlier attempt are not this search's outcome
+        seen_errors = {error.id for error in driver.find_elements(By.CSS_SELECTOR, SEARCH_ERROR_CSS)}
+        search_button = driver.find_elements(By.CSS_SELECTOR,'div>button.btn')
+        search_button[4].click()
+        _create_status(run, "search button clicked")
+        try:
+            outcome, message = waits.until("search_results", _search_outcome(seen_errors))
+        except TimeoutException:
+            outcome, message = "rejected", "no results table appeared"
+        if outcome != "rejected":
+            _create_status(run, "CAPTCHA #2 solved successfully." if outcome == "results" else "CAPTCHA #2 solved; the search found no records.")
+            record_sample(captcha_img_2, captcha_value_2, solved_by)
+            return
+        if solved_by == CaptchaSample.SOLVER:
+            # The solver misread it; the operator answers from here on
+            use_solver = False
+        _create_status(run, f"Search rejected ({message}). Retrying CAPTCHA #2...")
+
+    _create_status(run, "Search CAPTCHA solving failed after multiple attempts. Try again.")
+    raise ScrapeError("Search CAPTCHA solving failed after multiple attempts.")
+
+
+def _extract_modal_sections(driver: webdriver.Chrome) -> list[tuple[list[str], list[str]]]:
+    """
+    Read the heading and cell texts of the five fieldset tables in the open record modal
+    with one execute_script call instead of a WebDriver round trip per cell.
+    """
+    raw = driver.execute_script(MODAL_SECTIONS_JS, list(SECTION_LEGENDS)) or []
+    all_sections = []
+    for section in raw:
+        section = section or {}
+        all_sections.append(([str(h).strip() for h in section.get("headings") or []], [str(c).strip() for c in section.get("cells") or []]))
+    # Always hand the RecordWriter five sections, even if the script came back short
+    all_sections += [([], [])] * (len(SECTION_LEGENDS) - len(all_sections))
+    return all_sections
+
+
+def _with_parsed_address(all_sections: list) -> list:
+    """
+    Replace address cells of the Property Details section with the parse_address() parts.
+    """
+    headings_4, data_texts_4 = all_sections[3]
+    final_data_texts_4 = []
+    for heading_100, data in zip(headings_4, data_texts_4):
+        if "address" in heading_100.lower():
+            parsed_addr = parse_address(data)
+            for k, v in parsed_addr.items():
+                final_data_texts_4.append((k, v))
+        else:
+            final_data_texts_4.append((heading_100, data))
+
+    headings_4_parsed = [h for h, v in final_data_texts_4]
+    data_texts_4_parsed = [v for h, v in final_data_texts_4]
+    return [*all_sections[:3], (headings_4_parsed, data_texts_4_parsed), *all_sections[4:]]
+
+
+def _close_modal(driver: webdriver.Chrome, waits: WaitPolicy) -> None:
+    try:
+        data_elements_200 = waits.elements("modal_close", "button.colsebtn")
+        if len(data_elements_200) > 1:
+            data_elements_200[1].click()
+        else:
+            data_elements_200[0].click()
+        waits.until("modal_close", element_absent((By.CSS_SELECTOR, "button.colsebtn")))
+    except:
+        print("Close button not found")
+
+
+def save_checkpoint(run: ScrapingRun, params: dict, page: int, record: int, **extra) -> None:
+    checkpoint = {
+        "params": {k: params.get(k) for k in CHECKPOINT_PARAMS if params.get(k) is not None},
+        "page": page,
+        "record": record,
+        **extra,
+    }
+    ScrapingRun.objects.filter(id=run.id).update(checkpoint=checkpoint)
+
+
+def _scrape_pages(driver: webdriver.Chrome, run: ScrapingRun, waits: WaitPolicy, writer: RecordWriter, params: dict, start_page: int = 0, skip_through: int = -1, saved: int = 0, paginator: ResultsPaginator | None = None) -> int:
+    """
+    Walk every results page and hand each record to `writer`, which is flushed at the
+    end of every page. The run is checkpointed whenever a batch reaches the database.
+    Resumes at start_page (jumping straight there), skipping records up to skip_through.
+    Rows whose registration number is already stored are not opened at all.
+    Returns the number saved, counting from `saved` (records saved before a resume).
+    """
+    capture = NetworkCapture(driver) if EXTRACTION_MODE == "network" else None
+    paginator = paginator or ResultsPaginator(driver, waits)
+    page = start_page
+    if page:
+        _create_status(run, f"Resuming at page {page + 1}, after record {skip_through + 1}.")
+        try:
+            paginator.goto(page)
+        except PageOutOfRange as e:
+            raise ScrapeError(f"Cannot resume: {e}")
+    while True:  # Keep looping through all pages until no next button
+        _create_status(run, "Fetch all record links on current page")
+        try:
+            data_elements_2 = waits.elements("results_rows", RECORD_LINK_CSS)
+            print(f"Found {len(data_elements_2)} records --------------")
+        except TimeoutException:
+            print("No records found on this page. Moving on...")
+            data_elements_2 = []
+
+        if capture:
+            # A listing response may already carry every record on the page
+            page_records = capture.poll()
+            for i, all_sections in enumerate(page_records):
+                if page == start_page and i <= skip_through:
+                    continue
+                writer.add(_with_parsed_address(all_sections))
+            if page_records:
+                writer.flush()
+                save_checkpoint(run, params, page, len(page_records) - 1, saved=saved + writer.saved, page_size=paginator.page_size)
+                data_elements_2 = []
+
+        # One lookup per page for the registration numbers shown as record links
+        link_texts, known = [], set()
+        if data_elements_2 and SKIP_KNOWN_RECORDS:
+            link_texts = driver.execute_script(RECORD_LINK_TEXTS_JS, RECORD_LINK_CSS) or []
+            known = known_registration_numbers(link_texts)
+            writer.adopt(known)
+            if known:
+                _create_status(run, f"Skipping {len(known)} record(s) on page {page + 1} already stored.")
+
+        for i in range(len(data_elements_2)):
+            # Re-fetch elements each time (important after navigation/closing modal)
+            data_elements_2 = driver.find_elements(By.CSS_SELECTOR, RECORD_LINK_CSS)
+
+            if i >= len(data_elements_2):
+                break
+            if page == start_page and i <= skip_through:
+                continue
+            if i < len(link_texts) and normalize_registration_no(link_texts[i]) in known:
+                continue
+            span = data_elements_2[i]
+            if capture:
+                capture.drain()
+            driver.execute_script("arguments[0].click();", span)  # safer than normal click
+
+            all_sections = None
+            if capture:
+                try:
+                    all_sections = waits.until("capture_response", capture.next_records)[0]
+                except TimeoutException:
+                    print("No detail response captured; reading the modal instead")
+            if all_sections is None:
+                try:
+                    waits.until("record_modal", fieldsets_ready(SECTION_LEGENDS))
+                except TimeoutException:
+                    print("Record modal not fully rendered; extracting what is present")
+                all_sections = _extract_modal_sections(driver)
+            all_sections = _with_parsed_address(all_sections)
+
+            # Save to Excel
+            if writer.add(all_sections):
+                # Only checkpoint past records that are in the database
+                save_checkpoint(run, params, page, i, saved=saved + writer.saved, page_size=paginator.page_size)
+
+            _close_modal(driver, waits)
+
+        writer.flush()
+        # --- Pagination Part ---
+        # Only a missing next button ends the results; a page turn that fails must fail
+        # the run, so it is resumed from its checkpoint instead of reported complete
+        try:
+            if not paginator.next():
+                break
+        except (TimeoutException, WebDriverException) as e:
+            _create_status(run, f"Could not move past page {page + 1}; resume the run to continue.")
+            raise ScrapeError(f"Scraping failed turning page {page + 1}: {e}") from e
+        finally:
+            _save_wait_stats(run, waits)
+        page += 1
+        save_checkpoint(run, params, page, -1, saved=saved + writer.saved, page_size=paginator.page_size)
+
+    return saved + writer.saved
+
+
+def scrape_range(run: ScrapingRun, params: dict, date_from: date, date_to: date, record_run: ScrapingRun | None = None, split_above: int | None = None, checkpoint: dict | None = None) -> int | None:
+    """
+    Lease a browser, log in and scrape one date window, saving records under record_run
+    (defaults to run). With a checkpoint, re-applies the search and continues from its
+    page and record. Results are read at the largest page size the portal offers, so
+    fewer page turns are needed. Returns the number of records saved, or None when the
+    window has more than split_above results and should be split by the caller instead.
+    """
+    record_run = record_run or run
+    checkpoint = checkpoint or {}
+    pool = get_pool()
+    driver = pool.acquire(timeout=BROWSER_LEASE_TIMEOUT)
+    discard_driver = False
+    waits = WaitPolicy(driver)
+    writer = RecordWriter(record_run)
+    try:
+        _login(driver, run, waits, params.get("username") or "", params.get("password") or "")
+        _submit_search(driver, run, waits, params, date_from, date_to)
+        paginator = ResultsPaginator(driver, waits)
+        if split_above and date_from < date_to and not checkpoint:
+            total = paginator.total()
+            if total is not None and total > split_above:
+                _create_status(run, f"{total} results exceed the shard limit of {split_above}; splitting the window.")
+                return None
+        # Checkpoints from before page sizes were recorded were taken at the default size
+        checkpoint_size = checkpoint.get("page_size") or paginator.selected_size()
+        page_size = paginator.maximize_page_size()
+        if page_size and page_size != checkpoint_size:
+            _create_status(run, f"Reading {page_size} results per page.")
+        start_page, skip_through = rebase(checkpoint.get("page", 0), checkpoint.get("record", -1), checkpoint_size, page_size)
+        return _scrape_pages(
+            driver, run, waits, writer, params,
+            start_page=start_page,
+            skip_through=skip_through,
+            saved=checkpoint.get("saved", 0),
+            paginator=paginator,
+        )
+
+    except ScrapeError:
+        raise
+    except IngestError as e:
+        # The checkpoint stops before the unsaved batch, so a resume scrapes it again
+        _create_status(run, "Saving records failed; the run stopped at its last saved record. Resume it to continue.")
+        raise ScrapeError(f"Scraping failed: {e}") from e
+    except Exception as e:
+        print("Exception occurred:")
+        traceback.print_exc()
+        discard_driver = True
+        _create_status(run, "Scraping failed due to an error. Please check logs and try again.")
+        raise ScrapeError(f"Scraping failed: {e}") from e
+    finally:
+        # Records buffered when the scrape stopped still get written
+        try:
+            writer.flush()
+        except IngestError:
+            # Already logged; the checkpoint does not cover these records
+            pass
+        _save_wait_stats(run, waits)
+        pool.release(driver, discard=discard_driver)
+
+
+def run_scrape(new_run: ScrapingRun, params: dict) -> str:
+    """
+    Drive the portal for one run. Called from the job worker, never from a request.
+    Returns the completion message, raises ScrapeError when the flow cannot continue.
+    """
+    date_from = _parse_date(params["date_from"])
+    date_to = _parse_date(params["date_to"])
+    ScrapingRun.objects.filter(id=new_run.id).update(date_from=date_from, date_to=date_to)
+    checkpoint = None
+    if params.get("resume"):
+        checkpoint = ScrapingRun.objects.values_list("checkpoint", flat=True).get(id=new_run.id)
+    else:
+        save_checkpoint(new_run, params, 0, -1)
+    scrape_range(new_run, params, date_from, date_to, checkpoint=checkpoint)
+    ScrapingRun.objects.filter(id=new_run.id).update(records_found=new_run.records.count())
+    _create_status(new_run,f"Scraping completed successfully! Go to /get-status/ to review and download from /download/?run={new_run.id}",)
+    return "Scraping completed successfully!"
@@ -0,0 +1,132 @@
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import ScrapingRun
+from .scraper import ScrapeError, _create_status, _parse_date, save_checkpoint, scrape_range
+
+SHARD_DAYS = int(getattr(settings, "SCRAPER_SHARD_DAYS", 0))
+SHARD_CONCURRENCY = int(getattr(settings, "SCRAPER_SHARD_CONCURRENCY", 2))
+SHARD_MAX_RESULTS = int(getattr(settings, "SCRAPER_SHARD_MAX_RESULTS", 0))
+
+
+def shard_days_for(params: dict) -> int:
+    """
+    Shard size requested for a job: the form value if given, else the setting. 0 disables sharding.
+    """
+    try:
+        return max(0, int(params.get("shard_days") or SHARD_DAYS))
+    except (TypeError, ValueError):
+        return SHARD_DAYS
+
+
+def split_date_range(date_from: date, date_to: date, days: int) -> list[tuple[date, date]]:
+    """
+    Split the inclusive window date_from..date_to into consecutive windows of at most `days` days.
+    """
+    days = max(1, days)
+    ranges = []
+    start = date_from
+    while start <= date_to:
+        end = min(date_to, start + timedelta(days=days - 1))
+        ranges.append((start, end))
+        start = end + timedelta(days=1)
+    return ranges
+
+
+def halve_date_range(date_from: date, date_to: date) -> list[tuple[date, date]]:
+    middle = date_from + timedelta(days=(date_to - date_from).days // 2)
+    return [(date_from, middle), (middle + timedelta(days=1), date_to)]
+
+
+def _run_shard(parent: ScrapingRun, params: dict, shard: ScrapingRun, resume: bool = False) -> int | None:
+    """
+    Scrape one shard in the calling thread. Records go to the parent run; progress
+    messages and the checkpoint go to the shard's own run.
+    """
+    try:
+        checkpoint = shard.checkpoint if resume else None
+        verb = "resumed" if checkpoint else "started"
+        _create_status(shard, f"Shard {shard.date_from:%d-%m-%Y} to {shard.date_to:%d-%m-%Y} {verb}.")
+        saved = scrape_range(
+            shard, params, shard.date_from, shard.date_to,
+            record_run=parent, split_above=SHARD_MAX_RESULTS or None, checkpoint=checkpoint,
+        )
+        if saved is None:
+            # Split shards are replaced by their halves and never resumed themselves
+            ScrapingRun.objects.filter(id=shard.id).update(finished_at=timezone.now(), checkpoint={"split": True})
+        else:
+            _create_status(shard, f"Shard finished with {saved} record(s).")
+            ScrapingRun.objects.filter(id=shard.id).update(finished_at=timezone.now(), records_found=saved)
+        return saved
+    except Exception:
+        ScrapingRun.objects.filter(id=shard.id).update(finished_at=timezone.now())
+        raise
+    finally:
+        # Each executor thread holds its own connection
+        connections.close_all()
+
+
+def _unfinished_shards(run: ScrapingRun) -> list[ScrapingRun]:
+    return [
+        shard for shard in run.shards.filter(records_found__isnull=True).order_by("date_from")
+        if not (shard.checkpoint or {}).get("split")
+    ]
+
+
+def run_sharded(run: ScrapingRun, params: dict) -> str:
+    """
+    Scrape the job's window as parallel date shards, each in its own browser session.
+    At most SCRAPER_SHARD_CONCURRENCY shards run at once; a shard whose search returns
+    more than SCRAPER_SHARD_MAX_RESULTS results is split in half and re-queued.
+    On resume only unfinished shards run again, each from its own checkpoint.
+    """
+    date_from = _parse_date(params["date_from"])
+    date_to = _parse_date(params["date_to"])
+    ScrapingRun.objects.filter(id=run.id).update(date_from=date_from, date_to=date_to)
+    save_checkpoint(run, params, 0, -1, sharded=True)
+    resume = bool(params.get("resume")) and run.shards.exists()
+    if resume:
+        shards = _unfinished_shards(run)
+        _create_status(run, f"Resuming {len(shards)} unfinished shard(s).")
+    else:
+        ranges = split_date_range(date_from, date_to, shard_days_for(params))
+        shards = [ScrapingRun(parent=run, date_from=a, date_to=b) for a, b in ranges]
+        ScrapingRun.objects.bulk_create(shards)
+        _create_status(run, f"Split {date_from:%d-%m-%Y} to {date_to:%d-%m-%Y} into {len(ranges)} shard(s).")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, SHARD_CONCURRENCY), thread_name_prefix=f"shard-{run.id}") as executor:
+        pending = {executor.submit(_run_shard, run, params, shard, resume): shard for shard in shards}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = pending.pop(future)
+                window = f"{shard.date_from:%d-%m-%Y} to {shard.date_to:%d-%m-%Y}"
+                try:
+                    saved = future.result()
+                except ScrapeError as e:
+                    failed.append(window)
+                    _create_status(run, f"Shard {window} failed: {e}"[:255])
+                    continue
+                except Exception:
+                    print("Exception occurred:")
+                    traceback.print_exc()
+                    failed.append(window)
+                    continue
+                if saved is None:
+                    for a, b in halve_date_range(shard.date_from, shard.date_to):
+                        half = ScrapingRun.objects.create(parent=run, date_from=a, date_to=b)
+                        pending[executor.submit(_run_shard, run, params, half)] = half
+
+    total = run.records.count()
+    ScrapingRun.objects.filter(id=run.id).update(records_found=total)
+    if failed:
+        _create_status(run, f"{len(failed)} shard(s) failed: {', '.join(failed)}. Resume the run to retry them."[:255])
+        raise ScrapeError(f"Sharded scrape saved {total} record(s); {len(failed)} shard(s) failed.")
+    _create_status(run, f"Sharded scrape completed with {total} record(s). Download from /download/?run={run.id}")
+    return f"Scraping completed successfully! {total} record(s) saved."
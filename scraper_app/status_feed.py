@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ScrapingRun, ScrapingStatus
+
+# Id of the newest status of a top-level run (shards included); lets streams skip the DB when unchanged
+STATUS_MARKER_KEY = "status:run:{run_id}:last"
+SSE_POLL_SECONDS = float(getattr(settings, "SCRAPER_SSE_POLL_SECONDS", 1))
+SSE_KEEPALIVE_SECONDS = int(getattr(settings, "SCRAPER_SSE_KEEPALIVE_SECONDS", 15))
+# Streams end after this long; EventSource reconnects with Last-Event-ID
+SSE_MAX_SECONDS = int(getattr(settings, "SCRAPER_SSE_MAX_SECONDS", 300))
+SSE_BATCH_SIZE = 200
+# Streams one web process serves at once; each holds a worker thread for up to SSE_MAX_SECONDS
+SSE_MAX_STREAMS = int(getattr(settings, "SCRAPER_SSE_MAX_STREAMS", 4))
+STATUS_API_LIMIT = int(getattr(settings, "SCRAPER_STATUS_API_LIMIT", 200))
+
+
+class CursorError(ValueError):
+    """
+    Raised for a `since` cursor that is neither a status id nor an ISO timestamp.
+    """
+
+
+def run_statuses(run: ScrapingRun):
+    """
+    Statuses of a top-level run and of its shards. Filters on run ids rather than
+    joining the shards, so the (run, created_at) index serves every lookup.
+    """
+    return ScrapingStatus.objects.filter(run_id__in=[run.id, *run.shards.values_list("id", flat=True)])
+
+
+def mark_status(status: ScrapingStatus) -> None:
+    """
+    Record the newest status id for the status's top-level run. Called after the
+    status (and its CAPTCHA image) is saved.
+    """
+    run = status.run
+    if run is None:
+        return
+    cache.set(STATUS_MARKER_KEY.format(run_id=run.parent_id or run.id), status.id, timeout=SSE_MAX_SECONDS * 2)
+
+
+def captcha_url(status: ScrapingStatus) -> str:
+    """
+    Where the UI loads a status's CAPTCHA image from; "" for statuses without a prompt.
+    """
+    return reverse("captcha_image", args=[status.captcha_key]) if status.captcha_key else ""
+
+
+def serialize_status(status: ScrapingStatus) -> dict:
+    return {
+        "id": status.id,
+        "run_id": status.run_id,
+        "message": status.message,
+        "created_at": status.created_at.isoformat(),
+        "time": timezone.localtime(status.created_at).strftime("%H:%M:%S"),
+        "captcha_key": status.captcha_key or "",
+        "captcha_url": captcha_url(status),
+    }
+
+
+_stream_slots = threading.BoundedSemaphore(max(1, SSE_MAX_STREAMS))
+
+
+def live_streams_enabled() -> bool:
+    """
+    Whether status_events may stream. The status marker lives in the default cache,
+    which must be shared with the worker processes; with a per-process cache every
+    stream would hit the DB each tick, so pages poll the status API instead.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND", "")
+    return SSE_MAX_STREAMS > 0 and not backend.endswith(("LocMemCache", "DummyCache"))
+
+
+class _HeldStream:
+    """
+    A status stream holding one of the SSE_MAX_STREAMS slots. The response closes it
+    when the client goes away, which frees the slot even if it was never iterated.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._held = True
+
+    def __iter__(self):
+        return self._stream
+
+    def close(self) -> None:
+        if self._held:
+            self._held = False
+            _stream_slots.release()
+        self._stream.close()
+
+
+def open_status_stream(run: ScrapingRun, last_id: int = 0):
+    """
+    status_event_stream() for a response body, or None when live streams are off or
+    this process already serves SSE_MAX_STREAMS of them.
+    """
+    if not live_streams_enabled() or not _stream_slots.acquire(blocking=False):
+        return None
+    return _HeldStream(status_event_stream(run, last_id))
+
+
+def _event(event_id: int, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def status_event_stream(run: ScrapingRun, last_id: int = 0):
+    """
+    Server-Sent Events for statuses of `run` newer than last_id: "status" events,
+    or "captcha" for statuses that carry a CAPTCHA prompt. The DB is only queried
+    when the run's status marker moved (or every tick when the cache has none).
+    """
+    started = time.monotonic()
+    last_write = started
+    seen_marker = None
+    marker_key = STATUS_MARKER_KEY.format(run_id=run.id)
+    yield f"retry: {int(SSE_POLL_SECONDS * 1000) or 1000}\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        marker = cache.get(marker_key)
+        if marker is None or marker != seen_marker:
+            batch = list(run_statuses(run).filter(id__gt=last_id).order_by("id")[:SSE_BATCH_SIZE])
+            for status in batch:
+                data = serialize_status(status)
+                yield _event(status.id, "captcha" if data["captcha_url"] else "status", data)
+                last_id = status.id
+            if batch:
+                last_write = time.monotonic()
+            if len(batch) < SSE_BATCH_SIZE:
+                seen_marker = marker
+        if time.monotonic() - last_write >= SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_write = time.monotonic()
+        time.sleep(SSE_POLL_SECONDS)
+
+
+def statuses_since(run: ScrapingRun, since: str | None):
+    """
+    The run's statuses after `since`: a status id, or an ISO timestamp matched against created_at.
+    """
+    statuses = run_statuses(run)
+    since = (since or "").strip()
+    if not since:
+        return statuses.order_by("id")
+    if since.isdigit():
+        return statuses.filter(id__gt=int(since)).order_by("id")
+    moment = parse_datetime(since.replace(" ", "+"))
+    if moment is None:
+        raise CursorError("Invalid since. Expected a status id or an ISO timestamp.")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return statuses.filter(created_at__gt=moment).order_by("created_at", "id")
+
+
+def latest_captcha(run: ScrapingRun) -> ScrapingStatus | None:
+    return (
+        run_statuses(run).exclude(captcha_key="").filter(captcha_key__isnull=False)
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def status_version(run: ScrapingRun, since: str | None) -> str:
+    """
+    Changes whenever a poll with this cursor would see something new: a new status
+    or a change in the run's job state.
+    """
+    newest = run_statuses(run).aggregate(newest=Max("id"))["newest"] or 0
+    state = getattr(getattr(run, "job", None), "state", "")
+    return f"{run.id}-{newest}-{state}-{run.finished_at.timestamp() if run.finished_at else ''}-{(since or '').strip()}"
+
+
+def status_snapshot(run: ScrapingRun, since: str | None, limit: int | None = None) -> dict:
+    """
+    JSON body for the status API: statuses after `since` (at most `limit`), the
+    current CAPTCHA prompt, and the cursor to pass as `since` next time.
+    """
+    limit = max(1, limit or STATUS_API_LIMIT)
+    batch = list(statuses_since(run, since)[:limit + 1])
+    more = len(batch) > limit
+    batch = batch[:limit]
+    captcha = latest_captcha(run)
+    job = getattr(run, "job", None)
+    return {
+        "run": {
+            "id": run.id,
+            "state": job.state if job else "",
+            "started_at": run.started_at.isoformat(),
+            "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+            "records_found": run.records_found,
+        },
+        "statuses": [serialize_status(status) for status in batch],
+        "captcha": serialize_status(captcha) if captcha else None,
+        "cursor": str(batch[-1].id) if batch else (since or "").strip(),
+        "more": more,
+    }
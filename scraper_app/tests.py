@@ -1,3 +1,1183 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from urllib.request import urlopen
 
-# Create your tests here.
+import pandas as pd
+import pyarrow.parquet as pq
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image, ImageDraw, ImageFont
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from . import (
+    address,
+    browser_pool,
+    captcha_channel,
+    captcha_queue,
+    captcha_solver,
+    captcha_store,
+    capture,
+    exports,
+    gazetteer,
+    ingest,
+    jobs,
+    normalize,
+    paginator,
+    portal_session,
+    retention,
+    scraper,
+    sharding,
+    status_feed,
+    waits,
+)
+from .captcha_queue import CaptchaSubmitError
+from .models import Place, PortalSession, ScrapedRecord, ScrapingJob, ScrapingRun, ScrapingStatus
+from .scraper import ScrapeError
+
+TESTDATA = Path(__file__).resolve().parent / "testdata"
+
+SECTION_PATHS = {
+    "registration_details": "registrationDetails",
+    "seller_details": "partyFrom",
+    "buyer_details": "partyTo",
+    "property_details": "propertyDetails",
+    "khasra_details": "khasraDetails",
+}
+
+
+def _log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+class NetworkCaptureTests(SimpleTestCase):
+    """
+    Replays recorded portal responses from a local stand-in server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        handler = partial(_QuietHandler, directory=str(TESTDATA))
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def _captured(self, url, pattern=r"record_detail"):
+        entries = [
+            _log_entry("Network.responseReceived", requestId="7", response={"url": url, "mimeType": "application/json"}),
+            _log_entry("Network.responseReceived", requestId="8", response={"url": self.base_url + "/app.js", "mimeType": "text/javascript"}),
+            _log_entry("Network.loadingFinished", requestId="8"),
+            _log_entry("Network.loadingFinished", requestId="7"),
+        ]
+        return list(capture.responses_from_log(entries, pattern, lambda request_id, u: urlopen(u).read()))
+
+    def test_only_matching_json_responses_are_read(self):
+        url = self.base_url + "/record_detail.json"
+        responses = self._captured(url)
+        self.assertEqual([u for u, _ in responses], [url])
+
+    def test_recorded_detail_maps_to_five_sections(self):
+        _url, payload = self._captured(self.base_url + "/record_detail.json")[0]
+        records = capture.records_from_payload(payload, section_paths=SECTION_PATHS)
+        self.assertEqual(len(records), 1)
+
+        sections = capture.sections_from_payload(records[0], SECTION_PATHS, headings={"registrationNo": "Registration No."})
+        registration, sellers, buyers, prop, khasra = sections
+        self.assertEqual(registration[0], ["Registration No.", "Registration Date", "Deed Type"])
+        self.assertEqual(registration[1][0], "MP123452024A1001")
+        # Rows are flattened like the modal's tbody cells
+        self.assertEqual(sellers, (["Name", "Father Name"], ["Ramesh Kumar", "Suresh Kumar", "Sita Devi", "Mohan Lal"]))
+        self.assertEqual(buyers[1], ["Anil Sharma", "Vijay Sharma"])
+        self.assertIn("Address", prop[0])
+        self.assertEqual(khasra, (["Khasra No", "Area"], ["12/3", "0.05"]))
+
+    def test_listing_payload_yields_each_record(self):
+        with open(TESTDATA / "record_detail.json") as fh:
+            record = json.load(fh)
+        listing = {"data": {"items": [record, record]}}
+        records = capture.records_from_payload(listing, "data.items", SECTION_PATHS)
+        self.assertEqual(len(records), 2)
+
+
+class RebaseTests(SimpleTestCase):
+    """
+    Checkpoint positions carried across page sizes.
+    """
+
+    def test_same_or_unknown_size_is_unchanged(self):
+        self.assertEqual(paginator.rebase(3, 4, 10, 10), (3, 4))
+        self.assertEqual(paginator.rebase(3, 4, None, 25), (3, 4))
+        self.assertEqual(paginator.rebase(3, 4, 10, None), (3, 4))
+
+    def test_page_boundary_maps_to_the_record_before(self):
+        # 30 records done at size 10 -> page 1 of size 25 with its first 5 done
+        self.assertEqual(paginator.rebase(3, -1, 10, 25), (1, 4))
+        self.assertEqual(paginator.rebase(2, 4, 10, 25), (1, -1))
+        self.assertEqual(paginator.rebase(0, -1, 10, 25), (0, -1))
+
+    def test_round_trip(self):
+        for page, record in [(0, 0), (4, 7), (12, 8)]:
+            moved = paginator.rebase(page, record, 10, 50)
+            self.assertEqual(paginator.rebase(*moved, 50, 10), (page, record))
+
+
+class DateShardTests(SimpleTestCase):
+    """
+    Splitting a search window into shards.
+    """
+
+    def test_split_covers_window_without_gaps(self):
+        shards = sharding.split_date_range(date(2024, 1, 1), date(2024, 1, 10), 4)
+        self.assertEqual(shards, [
+            (date(2024, 1, 1), date(2024, 1, 4)),
+            (date(2024, 1, 5), date(2024, 1, 8)),
+            (date(2024, 1, 9), date(2024, 1, 10)),
+        ])
+
+    def test_split_single_day_and_minimum_size(self):
+        day = date(2024, 2, 29)
+        self.assertEqual(sharding.split_date_range(day, day, 30), [(day, day)])
+        self.assertEqual(len(sharding.split_date_range(date(2024, 3, 1), date(2024, 3, 3), 0)), 3)
+        self.assertEqual(sharding.split_date_range(date(2024, 3, 2), date(2024, 3, 1), 5), [])
+
+    def test_halve(self):
+        self.assertEqual(sharding.halve_date_range(date(2024, 1, 1), date(2024, 1, 10)), [
+            (date(2024, 1, 1), date(2024, 1, 5)),
+            (date(2024, 1, 6), date(2024, 1, 10)),
+        ])
+        self.assertEqual(sharding.halve_date_range(date(2024, 1, 1), date(2024, 1, 2)), [
+            (date(2024, 1, 1), date(2024, 1, 1)),
+            (date(2024, 1, 2), date(2024, 1, 2)),
+        ])
+
+
+def _sections(registration_no, market_value="1,00,000"):
+    return [
+        (["Registration No.", "Market Value"], [registration_no, market_value]),
+        (["Name"], ["Ramesh Kumar"]),
+        (["Name"], ["Anil Sharma"]),
+        (["District", "Tehsil/Locality", "Village"], ["Indore", "", ""]),
+        (["Khasra No"], ["12/3"]),
+    ]
+
+
+class RecordWriterTests(TestCase):
+    """
+    Batched upserts keyed on the registration number.
+    """
+
+    def setUp(self):
+        self.first_run = ScrapingRun.objects.create()
+        self.second_run = ScrapingRun.objects.create()
+
+    def test_batches_are_written_when_full(self):
+        writer = ingest.RecordWriter(self.first_run, batch_size=2)
+        self.assertFalse(writer.add(_sections("MP-1")))
+        self.assertEqual(ScrapedRecord.objects.count(), 0)
+        self.assertTrue(writer.add(_sections("MP-2")))
+        self.assertEqual(ScrapedRecord.objects.count(), 2)
+        writer.add(_sections("MP-3"))
+        self.assertEqual(writer.pending, 1)
+        writer.flush()
+        self.assertEqual((writer.created, writer.pending), (3, 0))
+
+    def test_rescrape_updates_changed_and_moves_unchanged(self):
+        with ingest.RecordWriter(self.first_run) as writer:
+            writer.add(_sections("MP-1"))
+            writer.add(_sections("MP-2"))
+
+        with ingest.RecordWriter(self.second_run) as writer:
+            writer.add(_sections(" mp-1 ", "2,00,000"))
+            writer.add(_sections("MP-2"))
+        self.assertEqual((writer.created, writer.updated, writer.unchanged), (0, 1, 1))
+
+        records = {r.registration_no: r for r in ScrapedRecord.objects.all()}
+        self.assertEqual(sorted(records), ["MP-1", "MP-2"])
+        self.assertEqual(records["MP-1"].market_value, Decimal("200000.00"))
+        # Both now belong to the newest run that saw them
+        self.assertEqual({r.run_id for r in records.values()}, {self.second_run.id})
+        self.assertIsNotNone(ScrapingRun.objects.get(id=self.first_run.id).records_changed_at)
+
+
+class SkipKnownTests(TestCase):
+    """
+    Rows already stored are recognised by registration number and adopted by the new run.
+    """
+
+    def test_known_numbers_are_normalized(self):
+        run = ScrapingRun.objects.create()
+        with ingest.RecordWriter(run) as writer:
+            writer.add(_sections("MP-1"))
+        self.assertEqual(ingest.known_registration_numbers([" mp-1", "MP-2", "", None]), {"MP-1"})
+        self.assertEqual(ingest.known_registration_numbers([]), set())
+
+    def test_adopt_moves_skipped_records(self):
+        old_run, new_run = ScrapingRun.objects.create(), ScrapingRun.objects.create()
+        with ingest.RecordWriter(old_run) as writer:
+            writer.add(_sections("MP-1"))
+            writer.add(_sections("MP-2"))
+        writer = ingest.RecordWriter(new_run)
+        self.assertEqual(writer.adopt(["mp-1", "MP-9"]), 1)
+        self.assertEqual(writer.adopt(["MP-1"]), 0)
+        self.assertEqual(
+            dict(ScrapedRecord.objects.values_list("registration_no", "run_id")),
+            {"MP-1": new_run.id, "MP-2": old_run.id},
+        )
+
+
+class TypedFieldTests(TestCase):
+    """
+    Typed columns parsed from the stored JSON sections.
+    """
+
+    def test_parse_amount(self):
+        self.assertEqual(normalize.parse_amount("\u20b9 12,50,000/-"), Decimal("1250000.00"))
+        self.assertEqual(normalize.parse_amount("Rs. 1250000.5"), Decimal("1250000.50"))
+        self.assertIsNone(normalize.parse_amount("Nil"))
+        self.assertIsNone(normalize.parse_amount(None))
+        self.assertIsNone(normalize.parse_amount("1" * 20))
+
+    def test_parse_date(self):
+        self.assertEqual(normalize.parse_date("05-01-2024"), date(2024, 1, 5))
+        self.assertEqual(normalize.parse_date("05/01/2024 11:30 AM"), date(2024, 1, 5))
+        self.assertEqual(normalize.parse_date("2024-01-05"), date(2024, 1, 5))
+        self.assertEqual(normalize.parse_date("05-Jan-2024"), date(2024, 1, 5))
+        self.assertIsNone(normalize.parse_date("31-02-2024"))
+        self.assertIsNone(normalize.parse_date(""))
+
+    def test_typed_fields(self):
+        typed = normalize.typed_fields({
+            "registration_details": {
+                "Registration No.": "MP-1",
+                "Date of Registration": "05/01/2024",
+                "Deed Type": "  Sale   Deed ",
+            },
+            "property_details": {
+                "Market Value (Rs.)": "12,50,000",
+                "District": "Indore",
+                "Tehsil/Locality": "Indore",
+                "Village": "",
+            },
+            "khasra_details": {"Consideration": "Rs. 9,00,000"},
+        })
+        self.assertEqual(typed["registration_date"], date(2024, 1, 5))
+        self.assertEqual(typed["market_value"], Decimal("1250000.00"))
+        self.assertEqual(typed["consideration"], Decimal("900000.00"))
+        self.assertEqual(typed["deed_type"], "Sale Deed")
+        self.assertEqual((typed["district"], typed["village"]), ("Indore", ""))
+        self.assertEqual(set(typed), set(normalize.NORMALIZED_FIELDS))
+
+    def test_missing_sections(self):
+        typed = normalize.typed_fields({})
+        self.assertIsNone(typed["registration_date"])
+        self.assertIsNone(typed["market_value"])
+        self.assertEqual(typed["deed_type"], "")
+
+
+class ExportColumnTests(TestCase):
+    """
+    The SectionHeading catalog behind every export's columns.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+        with ingest.RecordWriter(self.run) as writer:
+            writer.add(_sections("MP-1"))
+            sections = _sections("MP-2")
+            sections[0] = (["Registration No.", "Deed Type"], ["MP-2", "Sale"])
+            writer.add(sections)
+
+    def test_section_order_then_first_seen(self):
+        self.assertEqual(exports.export_columns(self.run), [
+            ("registration_details", "Registration No."),
+            ("registration_details", "Market Value"),
+            ("registration_details", "Deed Type"),
+            ("seller_details", "Name"),
+            ("buyer_details", "Name"),
+            ("property_details", "District"),
+            ("property_details", "Tehsil/Locality"),
+            ("property_details", "Village"),
+            ("khasra_details", "Khasra No"),
+        ])
+        self.assertEqual(exports.export_columns(None), [])
+
+    def test_all_runs_merges_catalogs(self):
+        other = ScrapingRun.objects.create()
+        with ingest.RecordWriter(other) as writer:
+            sections = _sections("MP-3")
+            sections[4] = (["Khasra No", "Area"], ["1/1", "0.5"])
+            writer.add(sections)
+        columns = exports.export_columns(exports.ALL_RUNS)
+        self.assertEqual(len(columns), len(set(columns)))
+        self.assertEqual(columns[-2:], [("khasra_details", "Khasra No"), ("khasra_details", "Area")])
+        self.assertNotIn(("khasra_details", "Area"), exports.export_columns(self.run))
+
+
+class ExportFormatTests(TestCase):
+    """
+    Every export format carries the same columns and values in the same order.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+        with ingest.RecordWriter(self.run) as writer:
+            writer.add(_sections("MP-1"))
+            sections = _sections("MP-2")
+            sections[0] = (["Registration No.", "Deed Type"], ["MP-2", "Sale"])
+            writer.add(sections)
+        self.records = exports.records_for_export({"run": str(self.run.id)})
+        self.columns = exports.export_columns(self.run)
+        self.headings = [heading for _field, heading in self.columns]
+        self.rows = [
+            ["MP-1", "1,00,000", "", "Ramesh Kumar", "Anil Sharma", "Indore", "", "", "12/3"],
+            ["MP-2", "", "Sale", "Ramesh Kumar", "Anil Sharma", "Indore", "", "", "12/3"],
+        ]
+
+    def _written(self, fmt):
+        buffer = BytesIO()
+        exports.EXPORT_WRITERS[fmt][1](self.records, self.columns, buffer)
+        buffer.seek(0)
+        return buffer
+
+    def test_xlsx(self):
+        sheet = load_workbook(self._written("xlsx")).active
+        rows = [[value or "" for value in row] for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows, [self.headings] + self.rows)
+
+    def test_csv(self):
+        rows = list(csv.reader(StringIO(self._written("csv").read().decode())))
+        self.assertEqual(rows, [self.headings] + self.rows)
+        self.assertEqual("".join(exports.iter_csv(self.records, self.columns)), self._written("csv").read().decode())
+
+    def test_ndjson(self):
+        keys = exports.column_keys(self.columns)
+        lines = self._written("ndjson").read().decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [dict(zip(keys, row)) for row in self.rows])
+        # Keys stay unique where headings repeat across sections
+        self.assertIn("seller_details.Name", keys)
+        self.assertIn("buyer_details.Name", keys)
+
+    def test_parquet(self):
+        table = pq.read_table(self._written("parquet"))
+        self.assertEqual(table.column_names, exports.column_keys(self.columns))
+        self.assertEqual([list(row.values()) for row in table.to_pylist()], self.rows)
+
+
+class StatusSnapshotTests(TestCase):
+    """
+    Cursor handling of the status API.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+        shard = ScrapingRun.objects.create(parent=self.run)
+        start = timezone.now() - timedelta(minutes=10)
+        self.statuses = [
+            ScrapingStatus.objects.create(run=self.run if i % 2 else shard, message=f"step {i}", created_at=start + timedelta(minutes=i))
+            for i in range(5)
+        ]
+        self.statuses[3].captcha_key = "abc"
+        self.statuses[3].save()
+
+    def _ids(self, snapshot):
+        return [status["id"] for status in snapshot["statuses"]]
+
+    def test_id_cursor_pages_through_shards_too(self):
+        ids = [status.id for status in self.statuses]
+        first = status_feed.status_snapshot(self.run, None, limit=3)
+        self.assertEqual((self._ids(first), first["more"]), (ids[:3], True))
+        self.assertEqual(first["cursor"], str(ids[2]))
+
+        rest = status_feed.status_snapshot(self.run, first["cursor"], limit=3)
+        self.assertEqual((self._ids(rest), rest["more"]), (ids[3:], False))
+        self.assertEqual(rest["captcha"]["captcha_key"], "abc")
+
+        # Nothing new keeps the cursor where it was
+        idle = status_feed.status_snapshot(self.run, rest["cursor"])
+        self.assertEqual((idle["statuses"], idle["cursor"]), ([], rest["cursor"]))
+
+    def test_timestamp_cursor(self):
+        since = self.statuses[1].created_at.isoformat()
+        snapshot = status_feed.status_snapshot(self.run, since)
+        self.assertEqual(self._ids(snapshot), [status.id for status in self.statuses[2:]])
+        # A "+" offset arrives as a space when the query string is not encoded
+        self.assertEqual(self._ids(status_feed.status_snapshot(self.run, since.replace("+", " "))), self._ids(snapshot))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(status_feed.CursorError):
+            status_feed.status_snapshot(self.run, "yesterday")
+
+
+@patch("scraper_app.captcha_queue.get_channel")
+class SubmitAnswerTests(TestCase):
+    """
+    Each CAPTCHA prompt takes exactly one operator answer.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+        self.prompt = ScrapingStatus.objects.create(run=self.run, message="Solve", captcha_key="k1")
+
+    def test_first_answer_wins(self, get_channel):
+        status = captcha_queue.submit_answer("k1", " 4F7K ")
+        self.assertEqual(status.id, self.prompt.id)
+        get_channel.return_value.publish.assert_called_once_with(self.run.id, "k1", "4F7K")
+
+        with self.assertRaises(CaptchaSubmitError) as raised:
+            captcha_queue.submit_answer("k1", "XXXX")
+        self.assertEqual(raised.exception.http_status, 409)
+        self.assertEqual(get_channel.return_value.publish.call_count, 1)
+
+    def test_expired_prompt(self, get_channel):
+        ScrapingStatus.objects.filter(id=self.prompt.id).update(
+            created_at=timezone.now() - timedelta(seconds=captcha_queue.CAPTCHA_WAIT_SECONDS + 1),
+        )
+        with self.assertRaises(CaptchaSubmitError) as raised:
+            captcha_queue.submit_answer("k1", "4F7K")
+        self.assertEqual(raised.exception.http_status, 409)
+        self.assertIsNone(ScrapingStatus.objects.get(id=self.prompt.id).answered_at)
+        get_channel.return_value.publish.assert_not_called()
+
+    def test_unknown_or_empty(self, get_channel):
+        for key, value, http_status in [("nope", "4F7K", 404), ("", "4F7K", 404), ("k1", "  ", 400)]:
+            with self.assertRaises(CaptchaSubmitError) as raised:
+                captcha_queue.submit_answer(key, value)
+            self.assertEqual(raised.exception.http_status, http_status)
+        get_channel.return_value.publish.assert_not_called()
+
+
+class ClaimJobTests(TestCase):
+    """
+    Workers claim queued jobs one at a time, highest priority first.
+    """
+
+    def test_priority_then_age(self):
+        low = jobs.enqueue_scrape({"district": "Indore"})
+        high = jobs.enqueue_scrape({"district": "Bhopal"}, priority=5)
+        later = jobs.enqueue_scrape({"district": "Sagar"})
+        claimed = [jobs.claim_next_job(f"w{i}") for i in range(4)]
+        self.assertEqual([job.id if job else None for job in claimed], [high.id, low.id, later.id, None])
+        self.assertEqual(ScrapingJob.objects.get(id=high.id).worker, "w0")
+        self.assertEqual(ScrapingJob.objects.filter(state=ScrapingJob.RUNNING, attempts=1).count(), 3)
+
+    def test_password_leaves_the_row_on_claim(self):
+        queued = jobs.enqueue_scrape({"username": "clerk", "password": "s3cret"})
+        stored = ScrapingJob.objects.get(id=queued.id).params
+        self.assertNotIn("password", stored)
+        self.assertNotIn("s3cret", json.dumps(stored))
+
+        job = jobs.claim_next_job("w0")
+        self.assertEqual(job.params, {"username": "clerk", "password": "s3cret"})
+        self.assertEqual(ScrapingJob.objects.get(id=job.id).params, {"username": "clerk"})
+
+
+class PruneRunsTests(TestCase):
+    """
+    Retention removes old runs but not records a newer run still covers.
+    """
+
+    def setUp(self):
+        old = timezone.now() - timedelta(days=40)
+        self.old_run = ScrapingRun.objects.create(started_at=old)
+        shard = ScrapingRun.objects.create(parent=self.old_run, started_at=old)
+        ScrapingStatus.objects.create(run=self.old_run, message="done")
+        ScrapingStatus.objects.create(run=shard, message="shard done")
+        with ingest.RecordWriter(self.old_run) as writer:
+            for number in ("MP-1", "MP-2", "MP-3"):
+                writer.add(_sections(number))
+        self.new_run = ScrapingRun.objects.create()
+        ingest.RecordWriter(self.new_run).adopt(["MP-2"])
+
+    def test_retention_is_off_unless_configured(self):
+        self.assertEqual(retention.RETENTION_DAYS, 0)
+        self.assertEqual(retention.prune_runs()["runs"], 0)
+        self.assertEqual(ScrapedRecord.objects.count(), 3)
+
+    def test_old_run_goes_with_records_no_newer_run_found(self):
+        counts = retention.prune_runs(days=30, chunk_size=2)
+        self.assertEqual(counts, {"runs": 1, "records": 2, "statuses": 2})
+        self.assertEqual(list(ScrapingRun.objects.values_list("id", flat=True)), [self.new_run.id])
+        self.assertEqual(list(ScrapedRecord.objects.values_list("registration_no", "run_id")), [("MP-2", self.new_run.id)])
+
+    def test_active_and_recent_runs_are_kept(self):
+        ScrapingJob.objects.create(run=self.old_run, state=ScrapingJob.RUNNING)
+        self.assertEqual(retention.prune_runs(days=30)["runs"], 0)
+        self.assertEqual(retention.prune_runs(days=0)["runs"], 0)
+        self.assertEqual(ScrapedRecord.objects.count(), 3)
+
+
+class GazetteerTests(SimpleTestCase):
+    """
+    Resolving captured place names against a small index.
+    """
+
+    def setUp(self):
+        self.index = gazetteer.GazetteerIndex([
+            (1, Place.DISTRICT, "Sagar", None),
+            (2, Place.DISTRICT, "Indore", None),
+            (3, Place.DISTRICT, "Narmadapuram", None),
+            (10, Place.TEHSIL, "Rehli", 1),
+            (11, Place.TEHSIL, "Indore", 2),
+            (20, Place.VILLAGE, "Sagarpur", 10),
+            (21, Place.VILLAGE, "Pipariya", 11),
+        ])
+
+    def _ids(self, *names):
+        return tuple(self.index.resolve(*names).values())
+
+    def test_exact_alias_and_spelling_variants(self):
+        self.assertEqual(self._ids("Sagar Distt.", "Rehli", "Sagarpur"), (1, 10, 20))
+        self.assertEqual(self._ids("Hoshangabad", "", ""), (3, None, None))
+        self.assertEqual(self._ids("INDORE", "indore", "Peepariya"), (2, 11, 21))
+
+    def test_prefixes(self):
+        # A cut-off capture, and a name followed by a qualifier
+        self.assertEqual(self._ids("Narmadapur")[0], 3)
+        self.assertEqual(self._ids("Indore Urban")[0], 2)
+        self.assertEqual(self._ids("Nar")[0], None)
+
+    def test_name_inside_a_longer_name_is_not_a_match(self):
+        # "sagarpur" starts with "sagar", but Sagarpur is a village, not Sagar district
+        self.assertEqual(self._ids("Sagarpur")[0], None)
+        self.assertEqual(self._ids("Indorekheda")[0], None)
+
+    def test_village_found_by_district_without_tehsil(self):
+        self.assertEqual(self._ids("Sagar", "", "Sagarpur"), (1, None, 20))
+        self.assertEqual(self._ids("Indore", "", "Sagarpur")[2], None)
+
+
+def _captcha(text):
+    image = Image.new("L", (20 * len(text) + 10, 36), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=22)
+    for i, char in enumerate(text):
+        draw.text((6 + 20 * i, 5), char, fill=0, font=font)
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TemplateSolverTests(SimpleTestCase):
+    """
+    Training the template model on a small synthetic set and reading unseen CAPTCHAs.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = random.Random(3)
+        answers = ["".join(rng.choice("A3K7PX") for _ in range(4)) for _ in range(12)]
+        samples = [(_captcha(answer), answer) for answer in answers]
+        # Unreadable images and empty answers are skipped
+        samples += [(b"not an image", "AB3K"), (_captcha("AK37"), "")]
+        cls.model, cls.used = captcha_solver.train_template_model(samples)
+
+    def test_unusable_samples_are_skipped(self):
+        self.assertEqual(self.used, 12)
+        self.assertEqual(captcha_solver.train_template_model([]), (None, 0))
+
+    def test_reads_new_combinations(self):
+        for answer in ("KPX3", "7AAX", "X3P7"):
+            text, confidence = self.model.read(_captcha(answer))
+            self.assertEqual(text, answer)
+            self.assertGreaterEqual(confidence, captcha_solver.SOLVER_CONFIDENCE)
+
+    def test_wrong_length_is_not_trusted(self):
+        reading = self.model.read(_captcha("A3"))
+        self.assertTrue(reading is None or reading[1] < captcha_solver.SOLVER_CONFIDENCE)
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "model.npz"
+            self.model.save(path)
+            loaded = captcha_solver.TemplateModel.load(path)
+        self.assertEqual(loaded.read(_captcha("PK7A"))[0], "PK7A")
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            captcha_solver.CaptchaSolver()
+
+
+def _legacy_parse_address(addr: str):
+    # parse_address() as it was in scraper.py before address.py replaced it
+    parsed = {}
+    patterns = {
+        "Ward/Colony": r"Ward Colony\s*-\s*([^,\.]+)",
+        "District": r"Distirct:?\s*([^,\.]+)",
+        "Village": r"Village:?\s*([^,\.]+)",
+        "Sub-Area/Road": r"Sub-Area\s*:?\s*([^,\.]+)",
+        "Tehsil/Locality": r"Tehsil:?\s*([^,\.]+)",
+        "PIN Code": r"pin-?(\d{6})",
+        "Landmark": r"(\d+\s*m\s+from\s+[^p]+)",
+    }
+    for key, pattern in patterns.items():
+        match = re.search(pattern, addr, re.IGNORECASE)
+        if match:
+            parsed[key] = match.group(1) if match.lastindex and match.lastindex >= 1 else ""
+        else:
+            parsed[key] = ""
+    parsed["State"] = "Madhya Pradesh" if "Madhya Pradesh" in addr else ""
+    parsed["Country"] = "India" if "India" in addr else ""
+    return parsed
+
+
+def _fuzzed_addresses(count, seed=23):
+    rng = random.Random(seed)
+    parts = [
+        lambda: f"Ward Colony{rng.choice(['-', ' - ', '  -'])}{rng.choice(['Ward 12', 'Shastri Nagar', 'Gandhi Chowk'])}",
+        lambda: f"{rng.choice(['Distirct', 'DISTIRCT', 'distirct:', 'District'])} {rng.choice(['Sagar', 'Indore', 'Bhopal'])}",
+        lambda: f"{rng.choice(['Village', 'village:', 'VILLAGE'])} {rng.choice(['Rehli', 'Sagarpur', 'Pipariya.x'])}",
+        lambda: f"Sub-Area{rng.choice([':', ' :', ''])} {rng.choice(['MG Road', 'Station Rd'])}",
+        lambda: f"{rng.choice(['Tehsil', 'tehsil:'])} {rng.choice(['Rehli', 'Huzur'])}",
+        lambda: f"{rng.choice(['pin-', 'PIN', 'pin-4'])}{rng.randint(0, 9999999):06d}",
+        lambda: f"{rng.randint(1, 900)}{rng.choice(['m', ' m'])} from {rng.choice(['temple', 'bus stand', 'post office'])}",
+        lambda: rng.choice(["Madhya Pradesh", "madhya pradesh", "India", "INDIA", "MP"]),
+        lambda: rng.choice(["", " ", "near school", "Plot 4/2"]),
+    ]
+    addresses = []
+    for _ in range(count):
+        chosen = rng.sample(parts, rng.randint(0, len(parts)))
+        addresses.append(rng.choice([", ", ". ", " ", ","]).join(part() for part in chosen))
+    # Repeats go through the memo
+    return addresses + addresses[: count // 4]
+
+
+class AddressParityTests(SimpleTestCase):
+    """
+    address.parse_address() and parse_addresses() give what the old scraper.parse_address() gave.
+    """
+
+    def setUp(self):
+        self.addresses = _fuzzed_addresses(2000)
+
+    def test_single_addresses(self):
+        for addr in self.addresses:
+            self.assertEqual(address.parse_address(addr), _legacy_parse_address(addr), addr)
+        self.assertEqual(list(address.parse_address("")), list(address.ADDRESS_FIELDS))
+
+    def test_series(self):
+        series = pd.Series(self.addresses, index=range(10, 10 + len(self.addresses)))
+        expected = pd.DataFrame(list(series.map(_legacy_parse_address)), index=series.index)
+        pd.testing.assert_frame_equal(address.parse_addresses(series), expected)
+        self.assertEqual(address.parse_addresses(self.addresses[:5]), [_legacy_parse_address(a) for a in self.addresses[:5]])
+
+    def test_empty_series(self):
+        parsed = address.parse_addresses(pd.Series([], dtype=object))
+        self.assertEqual(list(parsed.columns), list(address.ADDRESS_FIELDS))
+        self.assertEqual(len(parsed), 0)
+
+    def test_missing_address_reads_as_empty(self):
+        # The old function raised on None; a missing address now parses like ""
+        self.assertEqual(address.parse_address(None), _legacy_parse_address(""))
+        parsed = address.parse_addresses(pd.Series(["Distirct Sagar", None, float("nan")]))
+        self.assertEqual(list(parsed["District"]), ["Sagar", "", ""])
+        self.assertEqual(parsed.iloc[1].to_dict(), _legacy_parse_address(""))
+
+
+class _FakeElement:
+    def get_attribute(self, name):
+        return None
+
+
+class _FakeResultsDriver:
+    """
+    Stand-in for a results page with no record links and a next button. A click renders
+    the last page when `turns_page`, does nothing (so the wait times out) otherwise, or
+    raises `click_error`.
+    """
+
+    def __init__(self, turns_page=True, click_error=None):
+        self.turns_page = turns_page
+        self.click_error = click_error
+        self.signature = "row 1|1 - 10 of 20"
+        self.has_next = True
+
+    def find_elements(self, by, css):
+        return [_FakeElement()] if css == paginator.NAVIGATION_CSS["next"] and self.has_next else []
+
+    def execute_script(self, script, *args):
+        if script == waits.ROWS_SIGNATURE_JS:
+            return self.signature
+        if script == waits.ANGULAR_IDLE_JS:
+            return True
+        if self.click_error:
+            raise self.click_error
+        if self.turns_page:
+            self.signature, self.has_next = "row 11|11 - 20 of 20", False
+        return None
+
+
+class PageTurnTests(TestCase):
+    """
+    Only the last page ends the results walk; a failed page turn fails the run.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+
+    def _scrape(self, driver):
+        policy = waits.WaitPolicy(driver, ceilings={"default": 0.05}, poll_interval=0.01)
+        with ingest.RecordWriter(self.run) as writer:
+            return scraper._scrape_pages(driver, self.run, policy, writer, {"district": "Sagar"})
+
+    def test_walk_ends_at_the_last_page(self):
+        self.assertEqual(self._scrape(_FakeResultsDriver()), 0)
+        self.assertEqual(ScrapingRun.objects.get(id=self.run.id).checkpoint["page"], 1)
+
+    def test_page_turn_timeout_fails_the_run(self):
+        with self.assertRaises(ScrapeError):
+            self._scrape(_FakeResultsDriver(turns_page=False))
+        run = ScrapingRun.objects.get(id=self.run.id)
+        # Still on the first page, so a resume scrapes the rest
+        self.assertIsNone(run.checkpoint)
+        self.assertEqual(run.wait_stats["pagination"]["timeouts"], 1)
+        self.assertTrue(self.run.statuses.filter(message__startswith="Could not move past page 1").exists())
+
+    def test_browser_error_fails_the_run(self):
+        with self.assertRaises(ScrapeError):
+            self._scrape(_FakeResultsDriver(click_error=WebDriverException("tab crashed")))
+
+
+class CaptchaChannelTests(TestCase):
+    """
+    Publishing an answer and waiting on it, for the backends that need no server.
+    """
+
+    def setUp(self):
+        self.run = ScrapingRun.objects.create()
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.channels = [captcha_channel.DatabaseChannel(), captcha_channel.FileChannel(Path(tmp.name) / "answers")]
+
+    def test_answer_is_read_once(self):
+        for channel in self.channels:
+            with self.subTest(channel=type(channel).__name__):
+                channel.publish(self.run.id, "key-1", "4F7K")
+                self.assertEqual(channel.wait(self.run.id, "key-1", timeout=1), "4F7K")
+                # Consumed, so a retry of the same prompt never reuses it
+                self.assertIsNone(channel.wait(self.run.id, "key-1", timeout=0))
+
+    def test_latest_answer_wins(self):
+        for channel in self.channels:
+            with self.subTest(channel=type(channel).__name__):
+                channel.publish(self.run.id, "key-2", "AAAA")
+                channel.publish(self.run.id, "key-2", "BBBB")
+                self.assertEqual(channel.wait(self.run.id, "key-2", timeout=1), "BBBB")
+
+    def test_timeout_returns_none(self):
+        for channel in self.channels:
+            with self.subTest(channel=type(channel).__name__):
+                channel.publish(self.run.id, "other", "4F7K")
+                started = time.monotonic()
+                self.assertIsNone(channel.wait(self.run.id, "key-3", timeout=0.3))
+                self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            captcha_channel.CaptchaChannel()
+
+
+def _dated_sections(registration_no, registration_date):
+    sections = _sections(registration_no)
+    sections[0] = (["Registration No.", "Registration Date"], [registration_no, registration_date])
+    return sections
+
+
+class ExportCacheTests(TestCase):
+    """
+    Conditional GETs on the export views and the cache files behind them.
+    """
+
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name)
+        cache_patch = patch("scraper_app.exports.EXPORT_CACHE_DIR", self.cache_dir)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        self.run = ScrapingRun.objects.create()
+        with ingest.RecordWriter(self.run) as writer:
+            writer.add(_dated_sections("MP-1", "05-01-2024"))
+            writer.add(_dated_sections("MP-2", "20-02-2024"))
+
+    def _get(self, **params):
+        headers = {"HTTP_IF_NONE_MATCH": params.pop("etag")} if "etag" in params else {}
+        response = self.client.get(reverse("download_csv"), {"run": self.run.id, **params}, **headers)
+        body = b"".join(response.streaming_content) if response.status_code == 200 else b""
+        return response, body.decode()
+
+    def test_matching_etag_gets_304(self):
+        response, body = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("MP-2", body)
+        self.assertTrue(response["Last-Modified"])
+        self.assertEqual(self._get(etag=response["ETag"])[0].status_code, 304)
+        # Served from the cache file the first request wrote
+        cached, cached_body = self._get()
+        self.assertEqual((cached["ETag"], cached_body), (response["ETag"], body))
+
+    def test_new_records_change_the_etag_and_replace_the_file(self):
+        first, _body = self._get()
+        with ingest.RecordWriter(self.run) as writer:
+            writer.add(_dated_sections("MP-3", "01-03-2024"))
+        second, body = self._get(etag=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertIn("MP-3", body)
+        self.assertEqual(len(list(self.cache_dir.glob("*.csv"))), 1)
+
+    def test_date_filters_keep_their_own_files(self):
+        january, january_body = self._get(date_from="2024-01-01", date_to="2024-01-31")
+        february, february_body = self._get(date_from="2024-02-01")
+        self.assertNotEqual(january["ETag"], february["ETag"])
+        self.assertIn("MP-1", january_body)
+        self.assertNotIn("MP-2", january_body)
+        self.assertIn("MP-2", february_body)
+        self.assertNotIn("MP-1", february_body)
+        self.assertEqual(len(list(self.cache_dir.glob("*.csv"))), 2)
+        # Asked again, each filter is answered from its own file
+        self.assertEqual(self._get(date_from="2024-01-01", date_to="2024-01-31")[1], january_body)
+        self.assertEqual(len(list(self.cache_dir.glob("*.csv"))), 2)
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse("download_csv"), {"run": self.run.id, "date_from": "January"})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrphanRecoveryTests(TestCase):
+    """
+    RUNNING jobs whose heartbeat lease ran out are re-queued to resume.
+    """
+
+    def _running(self, heartbeat_age, attempts=1, **fields):
+        now = timezone.now()
+        return ScrapingJob.objects.create(
+            run=ScrapingRun.objects.create(),
+            state=ScrapingJob.RUNNING,
+            params={"district": "Sagar"},
+            attempts=attempts,
+            claimed_at=now - timedelta(hours=1),
+            heartbeat_at=None if heartbeat_age is None else now - timedelta(seconds=heartbeat_age),
+            **fields,
+        )
+
+    def test_stale_heartbeat_is_requeued_to_resume(self):
+        stale = self._running(jobs.LEASE_SECONDS + 5)
+        self.assertEqual(jobs.recover_orphaned_jobs(), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.state, ScrapingJob.QUEUED)
+        self.assertEqual(stale.params, {"district": "Sagar", "resume": True})
+        self.assertTrue(stale.run.statuses.filter(message__startswith="Worker restarted").exists())
+
+    def test_fresh_heartbeat_is_left_alone(self):
+        fresh = self._running(5, worker="other-host:12")
+        self.assertEqual(jobs.recover_orphaned_jobs(), 0)
+        fresh.refresh_from_db()
+        self.assertEqual((fresh.state, fresh.params), (ScrapingJob.RUNNING, {"district": "Sagar"}))
+
+    def test_job_claimed_before_heartbeats(self):
+        legacy = self._running(None)
+        self.assertEqual(list(jobs.orphaned_jobs()), [legacy])
+
+    def test_out_of_attempts_fails(self):
+        spent = self._running(jobs.LEASE_SECONDS + 5, attempts=jobs.MAX_ATTEMPTS)
+        self.assertEqual(jobs.recover_orphaned_jobs(), 1)
+        spent.refresh_from_db()
+        self.assertEqual(spent.state, ScrapingJob.FAILED)
+        self.assertIsNotNone(spent.finished_at)
+
+
+class ShardResumeTests(TransactionTestCase):
+    """
+    Resuming a sharded run scrapes only the shards that did not finish, from their checkpoints.
+    """
+
+    # Shards run in executor threads, which only see committed rows; one at a time,
+    # since the in-memory test database locks whole tables between connections
+    serialized_rollback = True
+
+    def test_only_unfinished_unsplit_shards_run_again(self):
+        run = ScrapingRun.objects.create()
+        days = [date(2024, 1, day) for day in range(1, 9)]
+        ScrapingRun.objects.create(parent=run, date_from=days[0], date_to=days[1], records_found=4)
+        ScrapingRun.objects.create(parent=run, date_from=days[2], date_to=days[5], checkpoint={"split": True})
+        halted = ScrapingRun.objects.create(parent=run, date_from=days[2], date_to=days[3], checkpoint={"page": 2, "record": 3})
+        unstarted = ScrapingRun.objects.create(parent=run, date_from=days[4], date_to=days[5])
+        calls = []
+
+        def scrape_range(shard, params, date_from, date_to, record_run=None, split_above=None, checkpoint=None):
+            calls.append((shard.id, checkpoint))
+            return 0
+
+        params = {"date_from": "2024-01-01", "date_to": "2024-01-08", "resume": True}
+        with patch("scraper_app.sharding.scrape_range", scrape_range), patch("scraper_app.sharding.SHARD_CONCURRENCY", 1):
+            sharding.run_sharded(run, params)
+        self.assertEqual(sorted(calls), [(halted.id, {"page": 2, "record": 3}), (unstarted.id, None)])
+        self.assertEqual(run.shards.count(), 4)
+
+
+class _FakeSessionDriver:
+    def __init__(self, url="https://portal.example/dashboard"):
+        self.current_url = url
+        self.cookies = [{"name": "sid", "value": "abc123", "domain": "portal.example", "path": "/", "size": 9}]
+        self.storage = {"local": {"token": "t-1"}, "session": {}}
+        self.added, self.loaded, self.visited = [], [], []
+
+    def get_cookies(self):
+        return self.cookies
+
+    def add_cookie(self, cookie):
+        self.added.append(cookie)
+
+    def execute_script(self, script, *args):
+        if script == portal_session.STORAGE_DUMP_JS:
+            return self.storage
+        if script == portal_session.STORAGE_LOAD_JS:
+            self.loaded.append(args[0])
+        return None
+
+    def get(self, url):
+        self.visited.append(url)
+        self.current_url = url
+
+    def delete_all_cookies(self):
+        self.cookies = []
+
+
+class _FakeWaits:
+    def __init__(self, logged_in=True):
+        self.logged_in = logged_in
+
+    def elements(self, step, css, count=1):
+        if not self.logged_in:
+            raise TimeoutException(step)
+        return [_FakeElement()]
+
+
+class PortalSessionTests(TestCase):
+    """
+    Encrypted portal sessions and secrets.
+    """
+
+    def test_secret_round_trip(self):
+        token = portal_session.encrypt_secret("s3cret")
+        self.assertNotIn("s3cret", token)
+        self.assertEqual(portal_session.decrypt_secret(token), "s3cret")
+        with self.settings(SCRAPER_SESSION_KEY="another key"):
+            self.assertEqual(portal_session.decrypt_secret(token), "")
+        self.assertEqual(portal_session.decrypt_secret("not a token"), "")
+
+    def test_session_round_trip(self):
+        portal_session.save_session("clerk", _FakeSessionDriver())
+        stored = PortalSession.objects.get(username="clerk")
+        self.assertNotIn("abc123", stored.payload)
+        data = portal_session.load_session("clerk")
+        self.assertEqual(data["url"], "https://portal.example/dashboard")
+        self.assertEqual(data["cookies"][0]["value"], "abc123")
+        self.assertEqual(data["local"], {"token": "t-1"})
+        self.assertIsNone(portal_session.load_session("someone else"))
+
+    def test_session_expires(self):
+        portal_session.save_session("clerk", _FakeSessionDriver())
+        PortalSession.objects.update(updated_at=timezone.now() - timedelta(hours=portal_session.SESSION_MAX_AGE_HOURS, minutes=1))
+        self.assertIsNone(portal_session.load_session("clerk"))
+
+    def test_undecryptable_session_is_dropped(self):
+        portal_session.save_session("clerk", _FakeSessionDriver())
+        with self.settings(SCRAPER_SESSION_KEY="another key"):
+            self.assertIsNone(portal_session.load_session("clerk"))
+        self.assertFalse(PortalSession.objects.exists())
+
+    def test_restore(self):
+        portal_session.save_session("clerk", _FakeSessionDriver())
+        driver = _FakeSessionDriver(url="about:blank")
+        self.assertTrue(portal_session.restore_session(driver, "clerk", "https://portal.example", _FakeWaits()))
+        # Only the fields add_cookie accepts are replayed
+        self.assertEqual(driver.added, [{"name": "sid", "value": "abc123", "domain": "portal.example", "path": "/"}])
+        self.assertEqual(driver.loaded[0]["local"], {"token": "t-1"})
+        self.assertEqual(driver.visited, ["https://portal.example", "https://portal.example/dashboard"])
+
+    def test_rejected_session_is_forgotten(self):
+        portal_session.save_session("clerk", _FakeSessionDriver())
+        driver = _FakeSessionDriver(url="https://portal.example")
+        self.assertFalse(portal_session.restore_session(driver, "clerk", "https://portal.example", _FakeWaits(logged_in=False)))
+        self.assertFalse(PortalSession.objects.exists())
+        self.assertEqual(driver.current_url, "https://portal.example")
+
+
+class _FakeBrowser:
+    def execute_script(self, script):
+        return "complete"
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+class BrowserPoolTests(SimpleTestCase):
+    """
+    Leasing drivers from a pool whose launches can fail.
+    """
+
+    def test_failed_launch_wakes_a_waiter(self):
+        started = threading.Event()
+        fail = threading.Event()
+
+        def factory():
+            started.set()
+            fail.wait(5)
+            raise WebDriverException("chrome did not start")
+
+        pool = browser_pool.BrowserPool(factory, max_size=1)
+        failures, leased = [], []
+
+        def first():
+            try:
+                pool.acquire()
+            except WebDriverException as e:
+                failures.append(e)
+
+        # Daemons, so a waiter that is never woken fails the test instead of hanging the run
+        failing = threading.Thread(target=first, daemon=True)
+        failing.start()
+        self.assertTrue(started.wait(5))
+        # The only slot is taken by the failing launch, so this one waits on it
+        pool.factory = _FakeBrowser
+        waiting = threading.Thread(target=lambda: leased.append(pool.acquire()), daemon=True)
+        waiting.start()
+        waiting.join(0.1)
+        self.assertTrue(waiting.is_alive())
+
+        fail.set()
+        failing.join(5)
+        waiting.join(5)
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(len(failures), 1)
+        self.assertIsInstance(leased[0], _FakeBrowser)
+
+    def test_timeout_when_exhausted(self):
+        pool = browser_pool.BrowserPool(_FakeBrowser, max_size=1)
+        driver = pool.acquire()
+        with self.assertRaises(browser_pool.BrowserPoolExhausted):
+            pool.acquire(timeout=0.05)
+        pool.release(driver)
+        self.assertIs(pool.acquire(timeout=0.05), driver)
+
+
+class _FakePageDriver:
+    def __init__(self, idle=True):
+        self.idle = idle
+
+    def execute_script(self, script, *args):
+        return self.idle
+
+
+class WaitPolicyTests(TestCase):
+    """
+    Condition waits with per-step ceilings, timed into telemetry.
+    """
+
+    def _policy(self, driver=None):
+        return waits.WaitPolicy(driver or _FakePageDriver(), ceilings={"default": 0.1, "record_modal": 0.2}, poll_interval=0.01)
+
+    def test_ceilings_per_step(self):
+        policy = self._policy()
+        self.assertEqual(policy.ceiling("record_modal"), 0.2)
+        self.assertEqual(policy.ceiling("pagination"), 0.1)
+
+    def test_timeout_is_recorded(self):
+        policy = self._policy()
+        self.assertEqual(policy.until("results_rows", lambda driver: "rows"), "rows")
+        with self.assertRaises(TimeoutException):
+            policy.until("results_rows", lambda driver: False)
+        stats = policy.telemetry.as_dict()["results_rows"]
+        self.assertEqual((stats["count"], stats["timeouts"]), (2, 1))
+        self.assertGreaterEqual(stats["max"], 0.1)
+
+    def test_settle_gives_up_at_its_ceiling(self):
+        self.assertTrue(self._policy().settle())
+        busy = self._policy(_FakePageDriver(idle=False))
+        self.assertFalse(busy.settle())
+        self.assertEqual(busy.telemetry.as_dict()["page_settle"]["timeouts"], 1)
+
+    def test_wait_stats_are_saved_per_step(self):
+        run = ScrapingRun.objects.create()
+        telemetry = waits.WaitTelemetry()
+        for step, elapsed in [("pagination", 1.0), ("pagination", 3.0), ("record_modal", 0.5)]:
+            telemetry.record(step, elapsed)
+        telemetry.record("record_modal", 2.0, timed_out=True)
+        scraper._save_wait_stats(run, waits.WaitPolicy(_FakePageDriver(), telemetry=telemetry))
+        self.assertEqual(ScrapingRun.objects.get(id=run.id).wait_stats, {
+            "pagination": {"count": 2, "total": 4.0, "avg": 2.0, "max": 3.0, "timeouts": 0},
+            "record_modal": {"count": 2, "total": 2.5, "avg": 1.25, "max": 2.0, "timeouts": 1},
+        })
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-default"},
+    "captchas": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests-captchas"},
+})
+class CaptchaImageTests(TestCase):
+    """
+    CAPTCHA prompt images: read from the page as data URIs, kept in the TTL cache, and
+    served from the legacy media file for older statuses.
+    """
+
+    png = _captcha("AB")
+
+    def test_data_uri(self):
+        encoded = base64.b64encode(self.png).decode()
+        self.assertEqual(captcha_store.image_from_data_uri(f"data:image/png;base64,{encoded}"), (self.png, "image/png"))
+        self.assertEqual(captcha_store.image_from_data_uri(f"data:image/jpeg;base64,{encoded}")[1], "image/jpeg")
+        self.assertEqual(captcha_store.image_from_data_uri(f"data:;base64,{encoded}")[1], "image/png")
+        for src in (None, "", "https://portal.example/captcha.png", "data:image/svg+xml,<svg/>", "data:image/png;base64,@@@"):
+            self.assertIsNone(captcha_store.image_from_data_uri(src), src)
+
+    def test_served_from_cache_until_it_expires(self):
+        with patch("scraper_app.captcha_store.CAPTCHA_IMAGE_TTL_SECONDS", 0.3):
+            captcha_store.store_image("k1", self.png, "image/png")
+        response = self.client.get(reverse("captcha_image", args=["k1"]))
+        self.assertEqual((response.status_code, response["Content-Type"], response.content), (200, "image/png", self.png))
+        time.sleep(0.4)
+        self.assertIsNone(captcha_store.load_image("k1"))
+        self.assertEqual(self.client.get(reverse("captcha_image", args=["k1"])).status_code, 404)
+
+    def test_legacy_media_file(self):
+        with TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            status = ScrapingStatus.objects.create(run=ScrapingRun.objects.create(), captcha_key="old")
+            status.captcha_image.save("old.png", ContentFile(self.png))
+            response = self.client.get(reverse("captcha_image", args=["old"]))
+            self.assertEqual((response.status_code, b"".join(response.streaming_content)), (200, self.png))
+            response.close()
+            # The file was cleaned up since
+            status.captcha_image.delete(save=False)
+            self.assertEqual(self.client.get(reverse("captcha_image", args=["old"])).status_code, 404)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
@@ -9,7 +9,17 @@ urlpatterns = [
     path('', views.trigger_scrape, name='trigger_scrape'),
     path("get-status/", views.get_status, name="get_status"),
     path("clear-logs/", views.clear_logs, name="clear_logs"),
+    path("runs/<int:run_id>/resume/", views.resume_scrape, name="resume_scrape"),
+    path("runs/<int:run_id>/events/", views.status_events, name="status_events"),
+    path("api/runs/<int:run_id>/statuses/", views.status_api, name="status_api"),
+    path("captchas/<str:captcha_key>/", views.captcha_image, name="captcha_image"),
+    path("captcha-queue/", views.captcha_queue, name="captcha_queue"),
+    path("api/captchas/", views.captcha_queue_api, name="captcha_queue_api"),
+    path("api/captchas/<str:captcha_key>/", views.submit_captcha, name="submit_captcha"),
     path('download/', views.download_excel, name='download_excel'),
+    path('download/csv/', views.download_csv, name='download_csv'),
+    path('download/ndjson/', views.download_ndjson, name='download_ndjson'),
+    path('download/parquet/', views.download_parquet, name='download_parquet'),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,document_root=settings.MEDIA_ROOT)
@@ -1,73 +1,61 @@
-import os
-import re
-import time
-import logging
-from io import BytesIO
+import hashlib
+import json
 from datetime import datetime
-import shutil
-import uuid
-from django.conf import settings
-from django.core.cache import cache
-from django.core.files.base import ContentFile
-from django.db import transaction
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import render
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.views.decorators.http import condition, require_POST
 import traceback
-from PIL import Image
-from openpyxl import Workbook
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import Select, WebDriverWait
-from .models import ScrapedRecord,ScrapingRun,ScrapingStatus
+from .exports import (
+    CSV_CONTENT_TYPE,
+    NDJSON_CONTENT_TYPE,
+    PARQUET_CONTENT_TYPE,
+    XLSX_CONTENT_TYPE,
+    ExportFilterError,
+    cached_export,
+    export_version,
+)
+from .jobs import ResumeError, enqueue_scrape, resume_run
+from .models import ScrapingRun,ScrapingStatus
+from .captcha_queue import CaptchaSubmitError, pending_prompts, serialize_prompt, submit_answer
+from .captcha_store import load_image
+from .status_feed import CursorError, live_streams_enabled, open_status_stream, run_statuses, status_snapshot, status_version
 
 
-driver = None
-# Configurable constants
-DEFAULT_WAIT = int(getattr(settings, "SELENIUM_DEFAULT_WAIT",500))
-CAPTCHA_WAIT_SECONDS = int(getattr(settings, "CAPTCHA_WAIT_SECONDS", 180))
-# Cache key template for per-run CAPTCHA values
-CAPTCHA_CACHE_KEY = "captcha:run:{run_id}:{captcha_key}"
-
-timestamp_2 = datetime.now().strftime("%Y%m%d_%H%M%S")
-ScrapedRecord.objects.all().delete()
-
 def get_status(request):
-    global driver
     """
     Renders current scraping status for the latest run.
     Accepts POST with 'captcha_value' + 'captcha_key' to feed the scraping flow.
     """
-    latest_run = ScrapingRun.objects.order_by("-started_at").first()
+    latest_run = ScrapingRun.objects.filter(parent__isnull=True).order_by("-started_at").first()
     if latest_run:
-        statuses = latest_run.statuses.order_by("created_at")
-        # latest status that has a captcha image for this run
+        # Shard runs report under their own run; show them with the parent
+        statuses_qs = run_statuses(latest_run)
+        statuses = list(statuses_qs.order_by("created_at"))
+        # latest status that carries a captcha prompt for this run
         captcha_status = (
-            latest_run.statuses.filter(captcha_image__isnull=False)
+            statuses_qs.exclude(captcha_key="").filter(captcha_key__isnull=False)
             .order_by("-created_at")
             .first()
         )
     else:
         statuses = []
         captcha_status = None
+    # The page's event stream continues after the newest status rendered here
+    last_status_id = max((st.id for st in statuses), default=0)
 
     latest_status = ScrapingStatus.objects.order_by("-created_at").first()
 
     captcha_value = None
     if request.method == "POST":
         captcha_value = (request.POST.get("captcha_value") or "").strip()
-        captcha_key = (request.POST.get("captcha_key") or "").strip()
-        if captcha_value and latest_run and captcha_key:
-            cache.set(CAPTCHA_CACHE_KEY.format(run_id=latest_run.id, captcha_key=captcha_key), captcha_value, timeout=300)
-        elif not captcha_value:
+        try:
+            submit_answer(request.POST.get("captcha_key"), captcha_value)
+        except CaptchaSubmitError:
             print("Exception occurred:")
             traceback.print_exc()
 
-    timestamp = int(time.time())
     return render(
         request,
         "scraper_app/status.html",
@@ -77,432 +65,168 @@ def get_status(request):
             "status": latest_status,
             "captcha_status": captcha_status,
             "captcha_value": captcha_value,
-            "timestamp": timestamp,
+            "last_status_id": last_status_id,
+            "live_stream": live_streams_enabled(),
         },
     )
 
 
-def parse_address(addr: str):
-    global driver
-    parsed = {}
-    patterns = {
-        "Ward/Colony": r"Ward Colony\s*-\s*([^,\.]+)",
-        "District": r"Distirct:?\s*([^,\.]+)",
-        "Village": r"Village:?\s*([^,\.]+)",
-        "Sub-Area/Road": r"Sub-Area\s*:?\s*([^,\.]+)",
-        "Tehsil/Locality": r"Tehsil:?\s*([^,\.]+)",
-        "PIN Code": r"pin-?(\d{6})",
-        "Landmark": r"(\d+\s*m\s+from\s+[^p]+)",
-    }
+def status_events(request, run_id):
+    """
+    Server-Sent Events stream of a run's new statuses and CAPTCHA prompts.
+    Resumes after the Last-Event-ID header (sent by EventSource on reconnect) or ?since=.
+    Answers 503 when streams are off or all slots are busy; the page then polls status_api.
+    """
+    run = get_object_or_404(ScrapingRun, id=run_id)
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.GET.get("since") or 0)
+    except ValueError:
+        last_id = 0
+    stream = open_status_stream(run, last_id)
+    if stream is None:
+        response = JsonResponse({"message": "Live updates are unavailable; poll the status API instead."}, status=503)
+        response["Retry-After"] = "60"
+        return response
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
-    for key, pattern in patterns.items():
-        match = re.search(pattern, addr, re.IGNORECASE)
-        if match:
-            parsed[key] = match.group(1) if match.lastindex and match.lastindex >= 1 else ""
-        else:
-            parsed[key] = ""
 
-    parsed["State"] = "Madhya Pradesh" if "Madhya Pradesh" in addr else ""
-    parsed["Country"] = "India" if "India" in addr else ""
-    return parsed
+def _status_run(request, run_id):
+    if not hasattr(request, "_status_run"):
+        request._status_run = get_object_or_404(ScrapingRun.objects.select_related("job"), id=run_id)
+    return request._status_run
 
 
-def _create_status(run: ScrapingRun, message: str, pil_image: Image.Image | None = None, captcha_key: str | None = None) -> ScrapingStatus:
-    global driver
-    """
-    Create a ScrapingStatus row with optional image stored in captcha_image.
-    If captcha_key is provided, it is stored on the status to tie UI input to the right wait.
-    """
-    status = ScrapingStatus.objects.create(run=run, message=message, captcha_key=captcha_key)
-    if pil_image is not None:
-        buffer = BytesIO()
-        pil_image.save(buffer, format="PNG")
-        buffer.seek(0)
-        status.captcha_image.save(f"captcha_{int(time.time())}.png", ContentFile(buffer.read()), save=True)
-    return status
-
-
-def _driver_from_config():
-    global driver
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.binary_location = os.environ.get("CHROME_BIN")
-    service = Service(os.environ.get("CHROMEDRIVER_PATH"))
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
-
-
-def _screenshot_element(driver: webdriver.Chrome, element) -> Image.Image:
+def _status_etag(request, run_id):
+    version = status_version(_status_run(request, run_id), request.GET.get("since"))
+    return hashlib.sha1(version.encode()).hexdigest()[:20]
+
+
+@condition(etag_func=_status_etag)
+def status_api(request, run_id):
     """
-    Take a full-page screenshot and crop the given element accurately using devicePixelRatio.
+    JSON statuses of a run (and its shards) newer than ?since= (a status id or ISO
+    timestamp), plus the current CAPTCHA prompt. Pass the returned "cursor" as the
+    next ?since=; If-None-Match gets a 304 while nothing changed.
     """
-    # Ensure visibility
-    driver.execute_script("arguments[0].scrollIntoView(true);", element)
-    time.sleep(0.5)
+    run = _status_run(request, run_id)
+    try:
+        body = status_snapshot(run, request.GET.get("since"))
+    except CursorError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+    response = JsonResponse(body)
+    response["Cache-Control"] = "no-cache"
+    return response
 
-    dpr = driver.execute_script("return window.devicePixelRatio") or 1
-    png = driver.get_screenshot_as_png()
-    image = Image.open(BytesIO(png))
-    img_width, img_height = image.size
 
-    location = element.location_once_scrolled_into_view
-    size = element.size
+def captcha_queue(request):
+    """
+    One page listing every pending CAPTCHA prompt across runs, answered in place.
+    """
+    return render(request, "scraper_app/captcha_queue.html")
 
-    left = max(0, int(location["x"] * dpr))
-    top = max(0, int(location["y"] * dpr))
-    right = min(img_width, int((location["x"] + size["width"]) * dpr))
-    bottom = min(img_height, int((location["y"] + size["height"]) * dpr))
 
-    cropped = image.crop((left, top, right, bottom))
-    return cropped
+def captcha_queue_api(request):
+    """
+    JSON list of pending CAPTCHA prompts across all running jobs, highest priority
+    first, then soonest deadline.
+    """
+    now = timezone.now()
+    response = JsonResponse({"prompts": [serialize_prompt(status, now) for status in pending_prompts(now)]})
+    response["Cache-Control"] = "no-cache"
+    return response
 
 
-def _wait_for_captcha_value(run_id: int, captcha_key: str, timeout: int = CAPTCHA_WAIT_SECONDS, poll_interval: float = 1.0) -> str | None:
-    global driver
+@require_POST
+def submit_captcha(request, captcha_key):
     """
-    Poll cache for a per-run + per-captcha-key value set via get_status POST.
+    Answer one CAPTCHA prompt: a JSON body {"value": "..."} or a form field "value".
     """
-    key = CAPTCHA_CACHE_KEY.format(run_id=run_id, captcha_key=captcha_key)
-    waited = 0
-    while waited < timeout:
-        value = cache.get(key)
-        if value:
-            # Clear it so subsequent steps don't reuse stale values
-            cache.delete(key)
-            return value
-        time.sleep(poll_interval)
-        waited += poll_interval
-    return None
-
-
-def save_to_db(all_sections):
-    global driver
+    if request.content_type == "application/json":
+        try:
+            value = (json.loads(request.body or b"{}") or {}).get("value")
+        except (ValueError, AttributeError):
+            return JsonResponse({"message": "Invalid JSON body."}, status=400)
+    else:
+        value = request.POST.get("value")
+    try:
+        status = submit_answer(captcha_key, str(value or ""))
+    except CaptchaSubmitError as e:
+        return JsonResponse({"message": str(e)}, status=e.http_status)
+    return JsonResponse({"message": "Answer sent.", "captcha_key": captcha_key, "run_id": status.run_id}, status=202)
+
+
+def captcha_image(request, captcha_key):
     """
-    Persist scraped sections into ScrapedRecord with robust handling.
+    Image of a CAPTCHA prompt from the CAPTCHA image store. Statuses from before the
+    store kept the image in media, so fall back to that; expired prompts are a 404.
     """
+    image = load_image(captcha_key)
+    if image is not None:
+        data, content_type = image
+        response = HttpResponse(data, content_type=content_type)
+        response["Cache-Control"] = "private, max-age=300"
+        return response
+    status = ScrapingStatus.objects.filter(captcha_key=captcha_key).exclude(captcha_image="").first()
+    if status is None or not status.captcha_image:
+        raise Http404("CAPTCHA image expired")
     try:
-        data = {}
-        for headings, data_texts in all_sections:
-            for heading, value in zip(headings, data_texts):
-                data[heading] = value
-
-        ScrapedRecord.objects.create(
-            registration_details = dict(zip(all_sections[0][0], all_sections[0][1])),
-            seller_details = dict(zip(all_sections[1][0], all_sections[1][1])),
-            buyer_details = dict(zip(all_sections[2][0], all_sections[2][1])),
-            property_details = dict(zip(all_sections[3][0], all_sections[3][1])),
-            khasra_details = dict(zip(all_sections[4][0], all_sections[4][1])),
-        )
-    except Exception as e:
-        print("Exception occurred:")
-        traceback.print_exc()
+        return FileResponse(status.captcha_image.open("rb"))
+    except FileNotFoundError:
+        raise Http404("CAPTCHA image expired")
 
 
 def trigger_scrape(request):
-    global driver
     """
-    Launch the scraping process. For production, consider moving this to a background worker (Celery/RQ).
+    Validate the scrape form and enqueue a job for the worker pool.
+    Returns the run id at once; progress is reported through get_status.
     """
-    new_run = ScrapingRun.objects.create()
     if request.method != "POST":
         return render(request, "scraper_app/scrape_form.html")
 
-    username = (request.POST.get("username") or "").strip()
-    password = (request.POST.get("password") or "").strip()
-    district = (request.POST.get("district") or "").strip()
-    deed_type = (request.POST.get("deed_type") or "").strip()
-    date_too = request.POST.get("date_to")
-    date_from = request.POST.get("date_from")
+    params = {
+        "username": (request.POST.get("username") or "").strip(),
+        "password": (request.POST.get("password") or "").strip(),
+        "district": (request.POST.get("district") or "").strip(),
+        "deed_type": (request.POST.get("deed_type") or "").strip(),
+        "date_from": request.POST.get("date_from"),
+        "date_to": request.POST.get("date_to"),
+        "shard_days": (request.POST.get("shard_days") or "").strip(),
+    }
 
     try:
-        date_from_fmt = datetime.strptime(date_from, "%Y-%m-%d").strftime("%d-%m-%Y")
-        date_to_fmt = datetime.strptime(date_too, "%Y-%m-%d").strftime("%d-%m-%Y")
-        print(date_from_fmt)
+        datetime.strptime(params["date_from"], "%Y-%m-%d")
+        datetime.strptime(params["date_to"], "%Y-%m-%d")
     except Exception:
-        _create_status(new_run, "Invalid date format. Expected YYYY-MM-DD.")
         return JsonResponse({"message": "Invalid date format. Expected YYYY-MM-DD."}, status=400)
 
-    
     try:
-        driver = _driver_from_config()
-        driver.get("https://sampada.mpigr.gov.in/#/clogin")
-        time.sleep(20)
-        english_to = driver.find_elements(By.CSS_SELECTOR,'div.ng-star-inserted>a')
-        english_to[2].click()
-        _create_status(new_run, "CLICKED ON ENGLISH")
-        # Login loop with CAPTCHA #1
-        max_attempts = 10
-        login_success = False
-        _create_status(new_run, "Filling Username And Password To login")
-        for attempt in range(max_attempts):
-            try:
-                driver.refresh()
-                WebDriverWait(driver, DEFAULT_WAIT).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "input#username"))
-                )
-
-                username_input = driver.find_element(By.CSS_SELECTOR, "input#username")
-                username_input.send_keys(username)
-
-                password_input = driver.find_element(By.CSS_SELECTOR, "input#password")
-                password_input.send_keys(password)
-
-                # CAPTCHA image
-                elem = WebDriverWait(driver, DEFAULT_WAIT).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, "div.input-group>img"))
-                )
-
-                # Screenshot and ask user to solve
-                captcha_img_1 = _screenshot_element(driver, elem)
-                captcha_key_1 = f"c1-{uuid.uuid4().hex[:8]}"
-                _create_status(new_run, "Please solve CAPTCHA #1 in the UI", pil_image=captcha_img_1, captcha_key=captcha_key_1)
-
-                captcha_value = _wait_for_captcha_value(new_run.id, captcha_key_1, timeout=CAPTCHA_WAIT_SECONDS)
-                if not captcha_value:
-                    _create_status(new_run, "CAPTCHA #1 timed out waiting for input. Retrying...")
-                    continue
-
-                captcha_inputs = driver.find_elements(By.CSS_SELECTOR, "div.input-group>input")
-                if len(captcha_inputs) < 3:
-                    raise RuntimeError("CAPTCHA input box not found for login form.")
-
-                captcha_inputs[2].click()
-                captcha_inputs[2].send_keys(captcha_value)
-
-                # Click login and wait for navigation
-                login_button = driver.find_elements(By.CSS_SELECTOR, "button.mat-focus-indicator")
-                before_url = driver.current_url
-                if len(login_button) >= 2:
-                    driver.execute_script("arguments[0].click();", login_button[1])
-                else:
-                    raise RuntimeError("Login button not found.")
-
-                WebDriverWait(driver, DEFAULT_WAIT).until(EC.url_changes(before_url))
-                time.sleep(1.5)  # brief render settle
-                after_url = driver.current_url
-                if after_url != before_url:
-                    login_success = True
-                    _create_status(new_run, "Captcha #1 solved successfully; logged in.")
-                    break
-            except Exception as e:
-                print("Exception occurred:")
-                traceback.print_exc()
-                continue
-
-        if not login_success:
-            _create_status(new_run, "Login CAPTCHA solving failed after multiple attempts. Try again.")
-            if driver:
-                driver.quit()
-            return JsonResponse({"message": "Login CAPTCHA solving failed after multiple attempts."}, status=500)
-        
-        # Navigate to search
-        WebDriverWait(driver, DEFAULT_WAIT).until(EC.presence_of_element_located((By.CSS_SELECTOR, "h5.my-0")))
-        search_certified = driver.find_elements(By.CSS_SELECTOR, "li.ng-star-inserted>a")
-        if len(search_certified) > 2:
-            driver.execute_script("arguments[0].click();", search_certified[2])
-        else:
-            if driver:
-                driver.quit()
-            return JsonResponse({"message": "Scraping failed: Initial elements not found."}, status=500)
-
-        time.sleep(20)
-      
-        try:
-            driver.refresh()
-            time.sleep(10) 
-            other_details = driver.find_elements(By.CSS_SELECTOR, 'div.apex-item-option')
-            if len(other_details) > 2:
-                    other_details[2].click()
-            else:
-                driver.quit()
-                return JsonResponse({"message": "Scraping failed: Other details elements not found."}, status=500)
-                
-            WebDriverWait(driver, 600).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'input#P2000_FROM_DATE')))
-            period_from= driver.find_element(By.CSS_SELECTOR,"input#P2000_FROM_DATE")
-            period_from.click()
-            period_from.send_keys(date_from_fmt)
-            period_to= driver.find_element(By.CSS_SELECTOR,"input#P2000_TO_DATE")
-            period_to.send_keys(date_to_fmt)
-            time.sleep(5)
-            WebDriverWait(driver, 600).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'select#P2000_DISTRICT')))
-            element = driver.find_element(By.CSS_SELECTOR, 'select#P2000_DISTRICT')
-            select_districts = Select(element)
-            # Wait until options are actually populated (more than 1 option means loaded)
-            WebDriverWait(driver, 200).until(lambda d: len(select_districts.options) > 1)
-            # Debug: print options so you know what’s available
-            print([opt.text for opt in select_districts.options])
-            # Now safely select by visible text
-            select_districts.select_by_visible_text(district)
-                
-            time.sleep(5)
-            input_box = driver.find_element(By.XPATH, "//input[@aria-autocomplete='list']")
-            time.sleep(5)
-            input_box.send_keys(deed_type)
-            time.sleep(5)
-            input_box.send_keys(Keys.ENTER)
-            time.sleep(5)
-            captcha_imgs = driver.find_elements(By.CSS_SELECTOR, "div.input-group>img")
-            if len(captcha_imgs) < 2:
-                raise RuntimeError("CAPTCHA #2 image not found.")
-            captcha_img_el = captcha_imgs[1]
-            captcha_img_2 = _screenshot_element(driver, captcha_img_el)
-            captcha_key_2 = f"c2-{uuid.uuid4().hex[:8]}"
-            _create_status(new_run, "Please solve CAPTCHA #2 in the UI", pil_image=captcha_img_2, captcha_key=captcha_key_2)
-            time.sleep(10)
-            captcha_value_2 = _wait_for_captcha_value(new_run.id, captcha_key_2, timeout=CAPTCHA_WAIT_SECONDS)
-            if not captcha_value_2:
-                _create_status(new_run, "CAPTCHA #2 timed out waiting for input. Retrying...")
-            time.sleep(10)
-            captcha_inputs = driver.find_elements(By.CSS_SELECTOR, "div.input-group>input")
-            if len(captcha_inputs) < 2:
-                raise RuntimeError("CAPTCHA #2 input not found.")
-            captcha_inputs[1].click()
-            print(captcha_value_2)
-            time.sleep(5)
-            captcha_inputs[1].send_keys(captcha_value_2)
-            _create_status(new_run, "captcha has been filld",)
-            time.sleep(5)
-            search_button = driver.find_elements(By.CSS_SELECTOR,'div>button.btn')
-            search_button[4].click() 
-            _create_status(new_run, "search button clicked")   
-            time.sleep(100)
-            _create_status(new_run, "CAPTCHA #2 solved successfully.")
-            
-        except Exception as e:
-                print("Exception occurred:")
-                traceback.print_exc()
-                
-        while True:  # Keep looping through all pages until no next button
-                    _create_status(new_run, "Fetch all record links on current page")
-                    max_retries = 5   # how many times to retry if nothing found
-                    retries = 0
-                    while retries < max_retries:
-                        try:
-                            time.sleep(10)  # let the page settle (can replace with WebDriverWait)
-                            data_elements_2 = driver.find_elements(By.CSS_SELECTOR, 'td.mat-cell>span.link')
-
-                            if len(data_elements_2) == 0:
-                                raise ValueError("No records found")  # trigger except block
-
-                            print(f"Found {len(data_elements_2)} records --------------")
-                            break   # ✅ exit loop if elements are found
-
-                        except Exception as e:
-                            print(f"Attempt {retries+1}: Failed to fetch records ({e})")
-                            retries += 1
-                            if retries < max_retries:
-                                print("Retrying...")
-                                time.sleep(5)  # wait before trying again
-                            else:
-                                print("Max retries reached. Moving on or exiting...")
-
-
-                    for i in range(len(data_elements_2)):
-                        # Re-fetch elements each time (important after navigation/closing modal)
-                        data_elements_2 = driver.find_elements(By.CSS_SELECTOR,'td.mat-cell>span.link')
-
-                        if i >= len(data_elements_2):
-                            break
-                        span = data_elements_2[i]
-                        driver.execute_script("arguments[0].click();", span)  # safer than normal click
-                        time.sleep(20)
-                        Registration_details_data = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Registration Details')]]/div/table/tbody/tr/td")
-                        Registration_details_heading = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Registration Details')]]/div/table/thead/tr/th")
-                        headings = [th.text.strip() for th in Registration_details_heading]
-                        data_texts = [td.text.strip() for td in Registration_details_data]
-
-                        # Extract Seller
-                        seller_data = driver.find_elements(By.XPATH, '//fieldset[legend[contains(text(), "Party From")]]/div/table/tbody/tr/td')
-                        seller_heading = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Party From')]]/div/table/thead/tr/th")
-                        headings_2 = [th.text.strip() for th in seller_heading]
-                        data_texts_2 = [td.text.strip() for td in seller_data]
-
-                        # Extract Buyer
-                        buyer_data = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Party To')]]/div/table/tbody/tr/td")
-                        buyer_heading = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Party To')]]/div/table/thead/tr/th")
-                        headings_3 = [th.text.strip() for th in buyer_heading]
-                        data_texts_3 = [td.text.strip() for td in buyer_data]
-
-                        # Extract Property Details
-                        property_details = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Property Details')]]/div/table/tbody/tr/td")
-                        property_heading = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Property Details')]]/div/table/thead/tr/th")
-                        headings_4 = [th.text.strip() for th in property_heading]
-                        data_texts_4 = [td.text.strip() for td in property_details]
-
-                        # Extract Khasra/Building/Plot Details
-                        khasra_building_plot_details = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Khasra/Building/Plot Details')]]/div/table/tbody/tr/td")
-                        khasra_heading = driver.find_elements(By.XPATH, "//fieldset[legend[contains(text(), 'Khasra/Building/Plot Details')]]/div/table/thead/tr/th")
-                        headings_5 = [th.text.strip() for th in khasra_heading]
-                        data_texts_5 = [td.text.strip() for td in khasra_building_plot_details]
-
-                        # Parse address inside property details
-                        final_data_texts_4 = []
-                        for heading_100, data in zip(headings_4, data_texts_4):
-                            if "address" in heading_100.lower():
-                                parsed_addr = parse_address(data)
-                                for k, v in parsed_addr.items():
-                                    final_data_texts_4.append((k, v))
-                            else:
-                                final_data_texts_4.append((heading_100, data))
-
-                        headings_4_parsed = [h for h, v in final_data_texts_4]
-                        data_texts_4_parsed = [v for h, v in final_data_texts_4]
-                        
-                        print(headings, data_texts,headings_2, data_texts_2,headings_3, data_texts_3,headings_4_parsed, data_texts_4_parsed,headings_5, data_texts_5)
-                        
-                        all_sections = [
-                            (headings, data_texts),
-                            (headings_2, data_texts_2),
-                            (headings_3, data_texts_3),
-                            (headings_4_parsed, data_texts_4_parsed),
-                            (headings_5, data_texts_5),
-                        ]
-
-                        # Save to Excel
-                        save_to_db(all_sections)
-
-                        # Close popup
-                        try:
-                            data_elements_200 = driver.find_elements(By.CSS_SELECTOR, 'button.colsebtn')
-                            print(data_elements_200)
-                            if len(data_elements_200) > 1:
-                                data_elements_200[1].click()
-                            else:
-                                data_elements_200[0].click()
-                            time.sleep(3)
-                        except:
-                            print("Close button not found")
-                    
-                    time.sleep(10)
-                    # --- Pagination Part ---
-                    try:
-                        next_button = driver.find_element(By.CSS_SELECTOR, "button.mat-paginator-navigation-next")
-                        time.sleep(20)
-                        if "disabled" in next_button.get_attribute("class"):
-                            break
-                        else:
-                            driver.execute_script("arguments[0].click();", next_button)
-                            time.sleep(5)
-                    except:
-                        break
-                    
-
-        _create_status(new_run,"Scraping completed successfully! Go to /get-status/ to review and download from /download-excel/",)
-        return JsonResponse({"message": f"Scraping completed successfully! {timestamp_2}"})
-
-    except Exception as e:
-        print("Exception occurred:")
-        traceback.print_exc()
-        _create_status(new_run, "Scraping failed due to an error. Please check logs and try again.")
-        return JsonResponse({"message": f"Scraping failed: {e}"}, status=500)
-    finally:
-        if driver:
-            driver.quit()
+        priority = int((request.POST.get("priority") or "0").strip())
+    except ValueError:
+        return JsonResponse({"message": "Invalid priority. Expected a whole number."}, status=400)
+
+    job = enqueue_scrape(params, priority=priority)
+    return JsonResponse(
+        {"message": f"Scrape queued as run #{job.run_id}. Check live status for updates.", "run_id": job.run_id},
+        status=202,
+    )
+
+
+@require_POST
+def resume_scrape(request, run_id):
+    """
+    Re-queue a failed run; the worker logs in, re-applies the search and continues
+    from the run's checkpoint.
+    """
+    run = get_object_or_404(ScrapingRun, id=run_id, parent__isnull=True)
+    try:
+        resume_run(run, (request.POST.get("password") or "").strip())
+    except ResumeError as e:
+        return JsonResponse({"message": str(e)}, status=409)
+    return JsonResponse({"message": f"Run #{run.id} queued to resume.", "run_id": run.id}, status=202)
 
 
 def clear_logs(request):
@@ -510,39 +234,77 @@ def clear_logs(request):
     return JsonResponse({"message": "Logs cleared"})
 
 
+def _export_version(request):
+    # Computed once per request for both the ETag and Last-Modified checks
+    if not hasattr(request, "_export_version"):
+        request._export_version = export_version(request.GET)
+    return request._export_version
+
+
+def _export_etag(fmt: str):
+    def etag(request, *args, **kwargs):
+        try:
+            return f"{fmt}-{_export_version(request)[0]}"
+        except ExportFilterError:
+            return None
+    return etag
+
+
+def _export_last_modified(request, *args, **kwargs):
+    try:
+        return _export_version(request)[1]
+    except ExportFilterError:
+        return None
+
+
+def _serve_export(request, fmt: str, filename: str, content_type: str):
+    """
+    Serve the cached export file for this request's filters, or build it if the
+    records changed since it was last built (CSV and NDJSON stream while building).
+    Conditional GETs are answered by the @condition decorator on each view before this runs.
+    """
+    try:
+        content = cached_export(request.GET, fmt)
+    except ExportFilterError as e:
+        return JsonResponse({"message": str(e)}, status=400)
+    if hasattr(content, "read"):
+        return FileResponse(content, as_attachment=True, filename=filename, content_type=content_type)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@condition(etag_func=_export_etag("xlsx"), last_modified_func=_export_last_modified)
 def download_excel(request):
-    global driver
     """
-    Export ScrapedRecord to Excel. Handles None JSON fields gracefully.
+    Export records to Excel, filtered by ?run= (latest run by default, or "all")
+    and ?date_from= / ?date_to= on the registration date.
     """
-    records = ScrapedRecord.objects.all()
-    wb = Workbook()
-    ws = wb.active
-
-    if records.exists():
-        first = records.first()
-        registration = first.registration_details or {}
-        seller = first.seller_details or {}
-        buyer = first.buyer_details or {}
-        prop = first.property_details or {}
-        khasra = first.khasra_details or {}
-
-        headers = list(registration.keys()) + list(seller.keys()) + list(buyer.keys()) + list(prop.keys()) + list(khasra.keys())
-        ws.append(headers)
-
-        for r in records:
-            row = list((r.registration_details or {}).values()) + \
-                  list((r.seller_details or {}).values()) + \
-                  list((r.buyer_details or {}).values()) + \
-                  list((r.property_details or {}).values()) + \
-                  list((r.khasra_details or {}).values())
-            ws.append(row)
-    else:
-        ws.append(["No data"])
+    return _serve_export(request, "xlsx", "scraped_data.xlsx", XLSX_CONTENT_TYPE)
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="scraped_data.xlsx"'
-    wb.save(response)
-    return response
+
+@condition(etag_func=_export_etag("csv"), last_modified_func=_export_last_modified)
+def download_csv(request):
+    """
+    Export records as CSV, with the same filters, header and rows as download_excel.
+    """
+    return _serve_export(request, "csv", "scraped_data.csv", CSV_CONTENT_TYPE)
+
+
+@condition(etag_func=_export_etag("ndjson"), last_modified_func=_export_last_modified)
+def download_ndjson(request):
+    """
+    Export records as newline-delimited JSON, one object per record keyed "section.heading".
+    """
+    return _serve_export(request, "ndjson", "scraped_data.ndjson", NDJSON_CONTENT_TYPE)
+
+
+@condition(etag_func=_export_etag("parquet"), last_modified_func=_export_last_modified)
+def download_parquet(request):
+    """
+    Export records as Parquet, one column per "section.heading". Needs pyarrow.
+    """
+    try:
+        return _serve_export(request, "parquet", "scraped_data.parquet", PARQUET_CONTENT_TYPE)
+    except ImportError:
+        return JsonResponse({"message": "Parquet export needs pyarrow installed."}, status=501)
@@ -0,0 +1,160 @@
+import logging
+import time
+
+from django.conf import settings
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CEILINGS = {"default": 30}
+
+# True when every Angular zone reports stable; falls back to readyState outside Angular
+ANGULAR_IDLE_JS = """
+if (document.readyState !== 'complete') { return false; }
+if (window.getAllAngularTestabilities) {
+    return window.getAllAngularTestabilities().every(function (t) { return t.isStable(); });
+}
+return true;
+"""
+
+# Text of the first data row plus the paginator label; changes when a new page renders
+ROWS_SIGNATURE_JS = """
+var row = document.querySelector('tr.mat-row');
+var label = document.querySelector('.mat-paginator-range-label');
+return (row ? row.innerText : '') + '|' + (label ? label.innerText : '');
+"""
+
+FIELDSETS_READY_JS = """
+var legends = arguments[0];
+var sets = Array.prototype.slice.call(document.querySelectorAll('fieldset'));
+return legends.every(function (legend) {
+    return sets.some(function (fs) {
+        var lg = fs.querySelector('legend');
+        return lg && lg.textContent.indexOf(legend) !== -1 && fs.querySelector('thead th');
+    });
+});
+"""
+
+
+# -- conditions -----------------------------------------------------------------
+# Each returns a callable for WebDriverWait.until: falsy to keep waiting.
+
+def dom_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def angular_idle(driver):
+    return driver.execute_script(ANGULAR_IDLE_JS)
+
+
+def count_at_least(locator, count: int = 1):
+    def _condition(driver):
+        elements = driver.find_elements(*locator)
+        return elements if len(elements) >= count else False
+    return _condition
+
+
+def element_absent(locator):
+    def _condition(driver):
+        return not driver.find_elements(*locator)
+    return _condition
+
+
+def fieldsets_ready(legends):
+    def _condition(driver):
+        return driver.execute_script(FIELDSETS_READY_JS, list(legends)) and angular_idle(driver)
+    return _condition
+
+
+def rows_signature(driver) -> str:
+    try:
+        return driver.execute_script(ROWS_SIGNATURE_JS) or ""
+    except StaleElementReferenceException:
+        return ""
+
+
+def rows_changed(previous_signature: str):
+    def _condition(driver):
+        signature = rows_signature(driver)
+        return signature and signature != previous_signature and angular_idle(driver)
+    return _condition
+
+
+# -- policy ---------------------------------------------------------------------
+
+class WaitTelemetry:
+    """
+    Aggregates how long each named wait actually took within one run.
+    """
+
+    def __init__(self):
+        self.steps: dict[str, dict] = {}
+
+    def record(self, step: str, elapsed: float, timed_out: bool = False) -> None:
+        stats = self.steps.setdefault(step, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if timed_out:
+            stats["timeouts"] += 1
+        logger.debug("wait %s took %.2fs%s", step, elapsed, " (timed out)" if timed_out else "")
+
+    def as_dict(self) -> dict:
+        return {
+            step: {
+                "count": s["count"],
+                "total": round(s["total"], 3),
+                "avg": round(s["total"] / s["count"], 3),
+                "max": round(s["max"], 3),
+                "timeouts": s["timeouts"],
+            }
+            for step, s in self.steps.items()
+        }
+
+
+class WaitPolicy:
+    """
+    Condition-based waits with a per-step ceiling from settings.SCRAPER_WAIT_CEILINGS.
+    Every wait is timed into `telemetry`, including the ones that time out.
+    """
+
+    def __init__(self, driver, ceilings: dict | None = None, poll_interval: float | None = None, telemetry: WaitTelemetry | None = None):
+        self.driver = driver
+        self.ceilings = ceilings or getattr(settings, "SCRAPER_WAIT_CEILINGS", DEFAULT_CEILINGS)
+        if poll_interval is None:
+            poll_interval = getattr(settings, "SCRAPER_WAIT_POLL_MS", 250) / 1000
+        self.poll_interval = poll_interval
+        self.telemetry = telemetry or WaitTelemetry()
+
+    def ceiling(self, step: str) -> float:
+        return self.ceilings.get(step, self.ceilings.get("default", DEFAULT_CEILINGS["default"]))
+
+    def until(self, step: str, condition, ceiling: float | None = None):
+        timeout = ceiling if ceiling is not None else self.ceiling(step)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll_interval,
+                ignored_exceptions=(StaleElementReferenceException,),
+            ).until(condition, f"wait '{step}' exceeded {timeout}s")
+        except TimeoutException:
+            self.telemetry.record(step, time.monotonic() - started, timed_out=True)
+            raise
+        self.telemetry.record(step, time.monotonic() - started)
+        return result
+
+    def settle(self, step: str = "page_settle") -> bool:
+        """
+        Wait for Angular to go idle. Like the fixed sleep it replaced, this never fails:
+        at the ceiling it gives up (the timeout is in telemetry) and returns False.
+        """
+        try:
+            return self.until(step, angular_idle)
+        except TimeoutException:
+            logger.warning("wait %s reached its ceiling; continuing", step)
+            return False
+
+    def elements(self, step: str, css: str, count: int = 1):
+        return self.until(step, count_at_least((By.CSS_SELECTOR, css), count))
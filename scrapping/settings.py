@@ -183,7 +183,14 @@ if REDIS_URL:
             "LOCATION": REDIS_URL,
             "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
             "TIMEOUT": env_int("CACHE_DEFAULT_TIMEOUT", 300),
-        }
+        },
+        # CAPTCHA prompt images, shared by the web and worker processes
+        "captchas": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+            "KEY_PREFIX": "captchas",
+        },
     }
 else:
     # Local memory cache (OK for dev, not shared across processes)
@@ -192,7 +199,13 @@ else:
             "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
             "LOCATION": "unique-dev-cache",
             "TIMEOUT": env_int("CACHE_DEFAULT_TIMEOUT", 300),
-        }
+        },
+        # CAPTCHA prompt images: on disk so worker processes and the web process share them
+        "captchas": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "captcha_cache",
+            "OPTIONS": {"MAX_ENTRIES": 500},
+        },
     }
 
 
@@ -233,10 +246,143 @@ CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
 # Optional: custom Chrome binary path (e.g., in containers)
 CHROME_BINARY = os.getenv("CHROME_BIN") or os.getenv("CHROME_BINARY")
 
+# Saved portal logins: encrypted with this key (defaults to SECRET_KEY), reused for this long
+SCRAPER_SESSION_KEY = os.getenv("SCRAPER_SESSION_KEY", "")
+SCRAPER_SESSION_MAX_AGE_HOURS = env_int("SCRAPER_SESSION_MAX_AGE_HOURS", 12)
+
 # Other scraper knobs
 SCRAPER_MAX_LOGIN_ATTEMPTS = env_int("SCRAPER_MAX_LOGIN_ATTEMPTS", 10)
 SCRAPER_MAX_CAPTCHA_ATTEMPTS = env_int("SCRAPER_MAX_CAPTCHA_ATTEMPTS", 10)
 
+# Background scrape workers (python manage.py scrape_worker)
+SCRAPER_WORKER_PROCESSES = env_int("SCRAPER_WORKER_PROCESSES", 2)
+SCRAPER_WORKER_POLL_SECONDS = env_int("SCRAPER_WORKER_POLL_SECONDS", 2)
+# A job orphaned by a worker restart is resumed from its checkpoint up to this many attempts
+SCRAPER_JOB_MAX_ATTEMPTS = env_int("SCRAPER_JOB_MAX_ATTEMPTS", 3)
+# A running job's worker refreshes ScrapingJob.heartbeat_at this often
+SCRAPER_JOB_HEARTBEAT_SECONDS = env_int("SCRAPER_JOB_HEARTBEAT_SECONDS", 30)
+# A running job without a heartbeat for this long is orphaned, whichever host ran it
+SCRAPER_JOB_LEASE_SECONDS = env_int("SCRAPER_JOB_LEASE_SECONDS", 300)
+
+# Portal entry point; point it at a local stand-in server for offline testing
+SCRAPER_PORTAL_URL = os.getenv("SCRAPER_PORTAL_URL", "https://sampada.mpigr.gov.in/#/clogin")
+
+# Warm Chrome pool, one per worker process
+SCRAPER_BROWSER_POOL_SIZE = env_int("SCRAPER_BROWSER_POOL_SIZE", 1)
+SCRAPER_BROWSER_POOL_WARM = env_int("SCRAPER_BROWSER_POOL_WARM", 1)
+SCRAPER_BROWSER_MAX_USES = env_int("SCRAPER_BROWSER_MAX_USES", 20)
+SCRAPER_BROWSER_LEASE_TIMEOUT = env_int("SCRAPER_BROWSER_LEASE_TIMEOUT", 600)
+# Delay between worker processes launching their browsers, to spread CPU load
+SCRAPER_BROWSER_WARM_STAGGER_SECONDS = env_int("SCRAPER_BROWSER_WARM_STAGGER_SECONDS", 5)
+
+# Upper bounds (seconds) for each condition-based wait in the scrape flow.
+# Waits return as soon as the page is ready; these only cap a stuck page.
+SCRAPER_WAIT_CEILINGS = {
+    "default": SELENIUM_DEFAULT_WAIT,
+    "page_load": env_int("SCRAPER_WAIT_PAGE_LOAD", 60),
+    "page_settle": env_int("SCRAPER_WAIT_PAGE_SETTLE", 30),
+    "login": env_int("SCRAPER_WAIT_LOGIN", 30),
+    "session_check": env_int("SCRAPER_WAIT_SESSION_CHECK", 15),
+    "form_load": env_int("SCRAPER_WAIT_FORM_LOAD", 120),
+    "form_field": env_int("SCRAPER_WAIT_FORM_FIELD", 60),
+    "search_results": env_int("SCRAPER_WAIT_SEARCH_RESULTS", 180),
+    "results_rows": env_int("SCRAPER_WAIT_RESULTS_ROWS", 60),
+    "record_modal": env_int("SCRAPER_WAIT_RECORD_MODAL", 60),
+    "capture_response": env_int("SCRAPER_WAIT_CAPTURE_RESPONSE", 20),
+    "modal_close": env_int("SCRAPER_WAIT_MODAL_CLOSE", 15),
+    "pagination": env_int("SCRAPER_WAIT_PAGINATION", 90),
+}
+SCRAPER_WAIT_POLL_MS = env_int("SCRAPER_WAIT_POLL_MS", 250)
+# Results per page: the largest size the portal's paginator offers, capped at this (0 = no cap)
+SCRAPER_PAGE_SIZE = env_int("SCRAPER_PAGE_SIZE", 0)
+
+# Record extraction: "dom" reads the detail modal tables, "network" reads the JSON the
+# portal fetches over XHR (captured from Chrome's DevTools performance log)
+SCRAPER_EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "dom")
+# Responses whose URL matches this regex are treated as record data
+SCRAPER_CAPTURE_URL_PATTERN = os.getenv("SCRAPER_CAPTURE_URL_PATTERN", r"/api/.*[Dd]etail")
+# Dotted path to the record list inside a listing response; empty = click each record
+SCRAPER_CAPTURE_RECORDS_PATH = os.getenv("SCRAPER_CAPTURE_RECORDS_PATH", "")
+# Dotted path to each ScrapedRecord section inside one record's JSON
+SCRAPER_CAPTURE_SECTIONS = {
+    "registration_details": os.getenv("SCRAPER_CAPTURE_REGISTRATION_PATH", "registrationDetails"),
+    "seller_details": os.getenv("SCRAPER_CAPTURE_SELLER_PATH", "partyFrom"),
+    "buyer_details": os.getenv("SCRAPER_CAPTURE_BUYER_PATH", "partyTo"),
+    "property_details": os.getenv("SCRAPER_CAPTURE_PROPERTY_PATH", "propertyDetails"),
+    "khasra_details": os.getenv("SCRAPER_CAPTURE_KHASRA_PATH", "khasraDetails"),
+}
+# Optional JSON key -> column heading overrides; other keys are humanized ("regNo" -> "Reg No")
+SCRAPER_CAPTURE_HEADINGS = {}
+
+# Date-range sharding: split a run into windows of this many days (0 = off; the form can override)
+SCRAPER_SHARD_DAYS = env_int("SCRAPER_SHARD_DAYS", 0)
+# Shards scraped at the same time by one worker, each in its own browser
+SCRAPER_SHARD_CONCURRENCY = env_int("SCRAPER_SHARD_CONCURRENCY", 3)
+# Split a shard in half when its search returns more results than this (0 = never)
+SCRAPER_SHARD_MAX_RESULTS = env_int("SCRAPER_SHARD_MAX_RESULTS", 500)
+
+# Incremental scraping: skip result rows whose registration number is already stored
+SCRAPER_SKIP_KNOWN_RECORDS = env_bool("SCRAPER_SKIP_KNOWN_RECORDS", True)
+# Records written per transaction; the scraper also flushes at the end of every results page
+SCRAPER_INGEST_BATCH_SIZE = env_int("SCRAPER_INGEST_BATCH_SIZE", 50)
+# On PostgreSQL, load each batch with COPY instead of a multi-row INSERT
+SCRAPER_INGEST_COPY = env_bool("SCRAPER_INGEST_COPY", True)
+# Further attempts at a batch that hit a locked database before the run is stopped
+SCRAPER_INGEST_RETRIES = env_int("SCRAPER_INGEST_RETRIES", 3)
+
+# Retention is opt-in: when set, runs older than this many days are deleted WITH their
+# records by the first scrape worker and by prune_runs. 0 (the default) keeps everything
+SCRAPER_RUN_RETENTION_DAYS = env_int("SCRAPER_RUN_RETENTION_DAYS", 0)
+# How often the first scrape worker prunes, between jobs
+SCRAPER_PRUNE_INTERVAL_MINUTES = env_int("SCRAPER_PRUNE_INTERVAL_MINUTES", 60)
+# Rows deleted per statement while pruning
+SCRAPER_PRUNE_CHUNK_SIZE = env_int("SCRAPER_PRUNE_CHUNK_SIZE", 1000)
+
+# Exports: records fetched per database round trip while streaming a download
+SCRAPER_EXPORT_CHUNK_SIZE = env_int("SCRAPER_EXPORT_CHUNK_SIZE", 2000)
+# Built export files, one per run, date filter and format, reused until the records change
+SCRAPER_EXPORT_CACHE_DIR = Path(os.getenv("SCRAPER_EXPORT_CACHE_DIR", BASE_DIR / "export_cache"))
+# Cached export files not rebuilt for this many hours are removed
+SCRAPER_EXPORT_CACHE_MAX_AGE_HOURS = env_int("SCRAPER_EXPORT_CACHE_MAX_AGE_HOURS", 24)
+
+# Live status stream (Server-Sent Events): check for new statuses this often
+SCRAPER_SSE_POLL_SECONDS = env_int("SCRAPER_SSE_POLL_SECONDS", 1)
+# Comment line sent when idle so proxies keep the connection open
+SCRAPER_SSE_KEEPALIVE_SECONDS = env_int("SCRAPER_SSE_KEEPALIVE_SECONDS", 15)
+# Close each stream after this long; browsers reconnect and resume from the last event
+SCRAPER_SSE_MAX_SECONDS = env_int("SCRAPER_SSE_MAX_SECONDS", 300)
+# Streams each web process serves at once (each holds a thread); others poll the status API.
+# Streams also need a shared default cache (REDIS_URL); without one every page polls (0 = never stream)
+SCRAPER_SSE_MAX_STREAMS = env_int("SCRAPER_SSE_MAX_STREAMS", 4)
+# Most statuses one status API response returns; the client follows the cursor for the rest
+SCRAPER_STATUS_API_LIMIT = env_int("SCRAPER_STATUS_API_LIMIT", 200)
+
+# How operator CAPTCHA answers reach the waiting scraper: "db", "file" or "redis"
+SCRAPER_CAPTCHA_CHANNEL = os.getenv("SCRAPER_CAPTCHA_CHANNEL", "db")
+# "db" and "file" channels: check for an answer this often
+SCRAPER_CAPTCHA_POLL_MS = env_int("SCRAPER_CAPTCHA_POLL_MS", 250)
+# "file" channel: directory shared by the web and worker processes
+SCRAPER_CAPTCHA_CHANNEL_DIR = Path(os.getenv("SCRAPER_CAPTCHA_CHANNEL_DIR", BASE_DIR / "captcha_answers"))
+# "redis" channel: server URL (defaults to the cache's REDIS_URL)
+SCRAPER_CAPTCHA_REDIS_URL = os.getenv("SCRAPER_CAPTCHA_REDIS_URL", REDIS_URL or "redis://localhost:6379/0")
+# Answers nobody picked up are discarded after this long
+SCRAPER_CAPTCHA_ANSWER_TTL_SECONDS = env_int("SCRAPER_CAPTCHA_ANSWER_TTL_SECONDS", 600)
+# CAPTCHA prompt images live in the "captchas" cache for this long, never in media
+SCRAPER_CAPTCHA_IMAGE_TTL_SECONDS = env_int("SCRAPER_CAPTCHA_IMAGE_TTL_SECONDS", 900)
+# Distinct addresses parse_address() remembers; scraped addresses repeat a lot
+SCRAPER_ADDRESS_CACHE_SIZE = env_int("SCRAPER_ADDRESS_CACHE_SIZE", 65536)
+# Gazetteer (districts, tehsils, villages): smallest trigram similarity accepted as a match
+SCRAPER_GAZETTEER_MATCH_THRESHOLD = float(os.getenv("SCRAPER_GAZETTEER_MATCH_THRESHOLD", "0.75"))
+# Processes pick up a newly loaded gazetteer within this long
+SCRAPER_GAZETTEER_REFRESH_SECONDS = env_int("SCRAPER_GAZETTEER_REFRESH_SECONDS", 300)
+# Offline CAPTCHA solver: "template" (model built by train_captcha_solver) or "none"
+SCRAPER_CAPTCHA_SOLVER = os.getenv("SCRAPER_CAPTCHA_SOLVER", "template")
+SCRAPER_CAPTCHA_MODEL_PATH = Path(os.getenv("SCRAPER_CAPTCHA_MODEL_PATH", BASE_DIR / "captcha_model.npz"))
+# Readings below this confidence (0-1) are sent to the operator instead
+SCRAPER_CAPTCHA_SOLVER_CONFIDENCE = float(os.getenv("SCRAPER_CAPTCHA_SOLVER_CONFIDENCE", "0.85"))
+# Login attempts that try the solver before falling back to the operator every time
+SCRAPER_CAPTCHA_SOLVER_ATTEMPTS = env_int("SCRAPER_CAPTCHA_SOLVER_ATTEMPTS", 3)
+
 
 # ------------------------------------------------------------------------------
 # Default primary key field type